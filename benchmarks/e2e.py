@@ -0,0 +1,295 @@
+"""
+End to end benchmarks against in-process emulated devices.
+
+Usage::
+
+    python -m benchmarks.e2e --output e2e.json
+    python -m benchmarks.e2e --compare baseline.json --output e2e.json
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from typing import List, Optional
+
+from benchmarks.runner import (
+    BenchmarkResult,
+    load_fixture,
+    measure_async,
+    write_results,
+    compare_results,
+)
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import DeviceEmulator, start_emulators, stop_emulators
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapodevice import TapoDevice
+from plugp100.new.tapohub import TapoHub
+from plugp100.protocol.traffic_capture import (
+    ReplayProtocol,
+    TrafficRecorder,
+    load_traffic,
+)
+
+CREDENTIALS = AuthCredential("benchmark@example.com", "benchmark")
+
+# hub update alone measures the hub itself: children are listed by the first update only
+UPDATE_FIXTURES = {
+    "plug": "p100.json",
+    "bulb": "l530.json",
+    "hub": "h100_lot_devices.json",
+    "power_strip": "p300.json",
+}
+
+HUB_CHILDREN_FIXTURE = "h100_lot_devices.json"
+
+
+def _config(
+    emulator: DeviceEmulator, guess_protocol: bool = False
+) -> DeviceConnectConfiguration:
+    if guess_protocol:
+        return DeviceConnectConfiguration(emulator.host, emulator.port, CREDENTIALS)
+    return DeviceConnectConfiguration(
+        emulator.host,
+        emulator.port,
+        CREDENTIALS,
+        device_type=emulator.device.device_info.get("type"),
+        encryption_type=emulator.encryption_type,
+        encryption_version=emulator.encryption_version,
+    )
+
+
+async def _connected(emulator: DeviceEmulator) -> TapoDevice:
+    device = await connect(_config(emulator))
+    await device.update()
+    return device
+
+
+async def bench_connect(encryption_type: str, iterations: int) -> List[BenchmarkResult]:
+    results = []
+    async with DeviceEmulator(
+        load_fixture("p100.json"), CREDENTIALS, encryption_type=encryption_type
+    ) as emulator:
+        for guess_protocol in [False, True]:
+
+            async def _cold_connect():
+                device = await connect(_config(emulator, guess_protocol))
+                await device.update()
+                await device.client.close()
+
+            name = (
+                "connect.guess_protocol" if guess_protocol else "connect.known_protocol"
+            )
+            results.append(
+                await measure_async(
+                    f"{name}.{encryption_type}",
+                    _cold_connect,
+                    iterations,
+                    params={"encryption": encryption_type},
+                )
+            )
+    return results
+
+
+async def bench_update(encryption_type: str, iterations: int) -> List[BenchmarkResult]:
+    results = []
+    for kind, fixture in UPDATE_FIXTURES.items():
+        async with DeviceEmulator(
+            load_fixture(fixture), CREDENTIALS, encryption_type=encryption_type
+        ) as emulator:
+            device = await _connected(emulator)
+            results.append(
+                await measure_async(
+                    f"update.{kind}.{encryption_type}",
+                    device.update,
+                    iterations,
+                    params={"fixture": fixture, "encryption": encryption_type},
+                )
+            )
+            await device.client.close()
+    return results
+
+
+async def _list_children(hub: TapoHub):
+    (await hub.client.get_child_device_list(all_pages=True)).get_or_raise()
+
+
+async def _update_with_children(hub: TapoHub):
+    await hub.update()
+    for child in hub.children:
+        await child.update()
+
+
+async def bench_hub_children(
+    encryption_type: str, iterations: int
+) -> List[BenchmarkResult]:
+    """
+    Paths which scale with the number of hub children: listing all the pages of children
+    and the update of the hub followed by the update of each child.
+    """
+    async with DeviceEmulator(
+        load_fixture(HUB_CHILDREN_FIXTURE), CREDENTIALS, encryption_type=encryption_type
+    ) as emulator:
+        hub = await _connected(emulator)
+        params = {
+            "fixture": HUB_CHILDREN_FIXTURE,
+            "encryption": encryption_type,
+            "children": len(hub.children),
+        }
+        results = [
+            await measure_async(
+                f"hub.child_device_list.{encryption_type}",
+                lambda: _list_children(hub),
+                iterations,
+                params=params,
+            ),
+            await measure_async(
+                f"hub.update_with_children.{encryption_type}",
+                lambda: _update_with_children(hub),
+                iterations,
+                params=params,
+            ),
+        ]
+        await hub.client.close()
+    return results
+
+
+async def bench_commands(encryption_type: str, iterations: int) -> List[BenchmarkResult]:
+    async with DeviceEmulator(
+        load_fixture("p100.json"), CREDENTIALS, encryption_type=encryption_type
+    ) as emulator:
+        device = await _connected(emulator)
+
+        async def _toggle():
+            await device.turn_on()
+            await device.turn_off()
+
+        result = await measure_async(
+            f"command.turn_on_off.{encryption_type}",
+            _toggle,
+            iterations,
+            operations_per_iteration=2,
+            params={"encryption": encryption_type},
+        )
+        await device.client.close()
+    return [result]
+
+
+async def bench_fleet(
+    encryption_type: str, sizes: List[int], iterations: int
+) -> List[BenchmarkResult]:
+    results = []
+    for size in sizes:
+        emulators = await start_emulators(
+            load_fixture("p100.json"), CREDENTIALS, size, encryption_type=encryption_type
+        )
+        devices = await asyncio.gather(*[_connected(emulator) for emulator in emulators])
+
+        async def _poll_fleet():
+            await asyncio.gather(*[device.update() for device in devices])
+
+        results.append(
+            await measure_async(
+                f"fleet.poll.{size}.{encryption_type}",
+                _poll_fleet,
+                iterations,
+                warmup=1,
+                operations_per_iteration=size,
+                params={"devices": size, "encryption": encryption_type},
+            )
+        )
+        await asyncio.gather(*[device.client.close() for device in devices])
+        await stop_emulators(emulators)
+    return results
+
+
+async def bench_replay(iterations: int) -> List[BenchmarkResult]:
+    """
+    Update of devices replaying recorded traffic without latency: the cpu cost of the
+    library alone, without network nor encryption.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, fixture in UPDATE_FIXTURES.items():
+            path = os.path.join(directory, f"{kind}.jsonl")
+            recorder = TrafficRecorder(path)
+            async with DeviceEmulator(load_fixture(fixture), CREDENTIALS) as emulator:
+                device = await connect(_config(emulator), traffic_recorder=recorder)
+                await device.update()
+                await device.update()
+                await device.client.close()
+            replayed = type(device)(
+                device.host,
+                device.port,
+                TapoClient(
+                    CREDENTIALS, "", ReplayProtocol(load_traffic(path), latency_scale=0)
+                ),
+            )
+            results.append(
+                await measure_async(
+                    f"replay.update.{kind}",
+                    replayed.update,
+                    iterations,
+                    params={"fixture": fixture},
+                )
+            )
+            if fixture == HUB_CHILDREN_FIXTURE:
+                results.append(
+                    await measure_async(
+                        "replay.hub.update_with_children",
+                        lambda: _update_with_children(replayed),
+                        iterations,
+                        params={"fixture": fixture, "children": len(replayed.children)},
+                    )
+                )
+    return results
+
+
+async def run(
+    iterations: int,
+    fleet_sizes: List[int],
+    fleet_iterations: int,
+    encryption_types: List[str],
+) -> List[BenchmarkResult]:
+    results = []
+    for encryption_type in encryption_types:
+        for benchmark in [
+            bench_connect(encryption_type, iterations),
+            bench_update(encryption_type, iterations),
+            bench_hub_children(encryption_type, iterations),
+            bench_commands(encryption_type, iterations),
+            bench_fleet(encryption_type, fleet_sizes, fleet_iterations),
+        ]:
+            for result in await benchmark:
+                print(result)
+                results.append(result)
+    for result in await bench_replay(iterations):
+        print(result)
+        results.append(result)
+    return results
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="plugp100 end to end benchmarks")
+    parser.add_argument("--output", default="benchmark-e2e.json")
+    parser.add_argument("--compare", help="previous results to compare with")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--fleet-sizes", default="10,100,1000")
+    parser.add_argument("--fleet-iterations", type=int, default=5)
+    parser.add_argument("--encryption", default="klap,aes")
+    options = parser.parse_args(args)
+    results = asyncio.run(
+        run(
+            options.iterations,
+            [int(size) for size in options.fleet_sizes.split(",") if size],
+            options.fleet_iterations,
+            options.encryption.split(","),
+        )
+    )
+    write_results(options.output, "e2e", results)
+    if options.compare:
+        print("\n".join(compare_results(options.compare, options.output)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Memory footprint of device models: bytes retained by each updated device of a fleet,
+measured with tracemalloc. Devices share a single client replaying recorded traffic, so
+only models are measured, not sessions nor encryption.
+
+Usage::
+
+    python -m benchmarks.memory --devices 10000 --output memory.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import gc
+import json
+import math
+import os
+import tempfile
+import tracemalloc
+from typing import List, Optional, Dict, Any
+
+from benchmarks.runner import load_fixture, write_results
+from plugp100.api.requests.tapo_request import TapoRequest
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Try
+from plugp100.emulator import DeviceEmulator
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapodevice import TapoDevice
+from plugp100.protocol.traffic_capture import (
+    ReplayProtocol,
+    TrafficRecorder,
+    load_traffic,
+)
+from plugp100.responses.tapo_response import TapoResponse
+
+CREDENTIALS = AuthCredential("benchmark@example.com", "benchmark")
+
+MEMORY_FIXTURES = {
+    "plug": "p100.json",
+    "bulb": "l530.json",
+    "hub_many_children": "h100_lot_devices.json",
+}
+
+
+@dataclasses.dataclass
+class MemoryResult:
+    name: str
+    devices: int
+    total_bytes: int
+    bytes_per_device: float
+    params: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    def __str__(self):
+        return (
+            f"{self.name:<48} {self.devices:>7} devices  "
+            f"{self.total_bytes / 2**20:9.1f} MiB  {self.bytes_per_device:9.0f} B/device"
+        )
+
+
+class _DecodingReplayProtocol(ReplayProtocol):
+    """Answer each request with its own decoded copy of the response, as devices do."""
+
+    async def send_request(
+        self, request: TapoRequest, retry: int = 3
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        return (await super().send_request(request, retry)).map(
+            lambda response: dataclasses.replace(
+                response, result=json.loads(json.dumps(response.result))
+            )
+        )
+
+
+async def _record(fixture: str, path: str) -> TapoDevice:
+    recorder = TrafficRecorder(path)
+    async with DeviceEmulator(load_fixture(fixture), CREDENTIALS) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                CREDENTIALS,
+                device_type=emulator.device.device_info.get("type"),
+                encryption_type=emulator.encryption_type,
+                encryption_version=emulator.encryption_version,
+            ),
+            traffic_recorder=recorder,
+        )
+        await device.update()
+        await device.update()
+        await device.client.close()
+    return device
+
+
+def _device_count(device: TapoDevice) -> int:
+    return 1 + len(getattr(device, "children", []))
+
+
+async def bench_fleet_memory(
+    kind: str, fixture: str, devices: int, directory: str, keep_raw_state: bool = True
+) -> MemoryResult:
+    """
+    @param devices: number of devices to build, hub children included
+    @param keep_raw_state: whether devices keep the state received by updates
+    """
+    path = os.path.join(directory, f"{kind}.jsonl")
+    recorded = await _record(fixture, path)
+    client = TapoClient(
+        CREDENTIALS, "", _DecodingReplayProtocol(load_traffic(path), latency_scale=0)
+    )
+
+    async def _updated() -> TapoDevice:
+        device = type(recorded)(recorded.host, recorded.port, client)
+        device.keep_raw_state = keep_raw_state
+        await device.update()
+        return device
+
+    # first update fills caches shared by all the devices
+    per_fleet_device = _device_count(await _updated())
+    fleet = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(math.ceil(devices / per_fleet_device)):
+            fleet.append(await _updated())
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    count = len(fleet) * per_fleet_device
+    return MemoryResult(
+        name=f"memory.fleet.{kind}" + ("" if keep_raw_state else ".no_raw_state"),
+        devices=count,
+        total_bytes=retained,
+        bytes_per_device=retained / count,
+        params={"fixture": fixture, "keep_raw_state": keep_raw_state},
+    )
+
+
+async def run(devices: int) -> List[MemoryResult]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, fixture in MEMORY_FIXTURES.items():
+            for keep_raw_state in [True, False]:
+                result = await bench_fleet_memory(
+                    kind, fixture, devices, directory, keep_raw_state
+                )
+                print(result)
+                results.append(result)
+    return results
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="plugp100 memory benchmarks")
+    parser.add_argument("--output", default="benchmark-memory.json")
+    parser.add_argument("--devices", type=int, default=10_000)
+    options = parser.parse_args(args)
+    results = asyncio.run(run(options.devices))
+    write_results(options.output, "memory", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Micro benchmarks of the per request cpu costs: encryption, request serialization and
+response parsing, with payloads of the sizes found in fixtures.
+
+Usage::
+
+    python -m benchmarks.micro --output micro.json
+"""
+import argparse
+import json
+import time
+from typing import List, Optional, Dict, Any, Tuple
+
+import jsons
+
+from benchmarks.runner import (
+    BenchmarkResult,
+    load_fixture,
+    measure,
+    write_results,
+    compare_results,
+)
+from plugp100.api.requests.tapo_request import TapoRequest, MultipleRequestParams
+from plugp100.discovery.rsa_session import RSASession
+from plugp100.encryption.key_pair import KeyPair
+from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+from plugp100.protocol.klap.klap_protocol import KlapChiper
+from plugp100.responses.child_device_list import ChildDeviceList
+from plugp100.responses.device_state import DeviceInfo
+from plugp100.responses.hub_childs.s200b_device_state import parse_s200b_event
+from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
+
+# seeds are fixed so runs are reproducible
+_LOCAL_SEED = bytes(range(16))
+_REMOTE_SEED = bytes(range(16, 32))
+_USER_HASH = bytes(range(32))
+
+DEVICE_INFO_FIXTURES = ["p100.json", "l530.json", "p300.json", "h100.json"]
+
+
+def _payloads() -> Dict[str, str]:
+    """
+    Response payloads, from small to large: device info of a plug, trigger logs of a
+    button, a page of children of a hub with many children.
+    """
+    hub = load_fixture("h100_lot_devices.json")
+    button = load_fixture("hub_children/s200.json")
+    trigger_logs = next(v for k, v in button.items() if k.startswith("get_trigger_logs"))
+    return {
+        "device_info": json.dumps(
+            {"error_code": 0, "result": load_fixture("p100.json")["get_device_info"]}
+        ),
+        "trigger_logs": json.dumps({"error_code": 0, "result": trigger_logs}),
+        "child_list_page": json.dumps(
+            {"error_code": 0, "result": hub["get_child_device_list_0"]}
+        ),
+    }
+
+
+def bench_crypto(iterations: int) -> List[BenchmarkResult]:
+    results = []
+    aes = TpLinkCipherCryptography(_USER_HASH[:16], _USER_HASH[16:])
+    for name, payload in _payloads().items():
+        params = {"payload": name, "bytes": len(payload)}
+        klap = KlapChiper(_LOCAL_SEED, _REMOTE_SEED, _USER_HASH)
+        encrypted, seq = klap.encrypt(payload)
+        results.append(
+            measure(
+                f"crypto.klap.encrypt.{name}",
+                lambda: klap.encrypt(payload),
+                iterations,
+                params=params,
+            )
+        )
+        klap._seq = seq
+        results.append(
+            measure(
+                f"crypto.klap.decrypt.{name}",
+                lambda: klap.decrypt(encrypted),
+                iterations,
+                params=params,
+            )
+        )
+        aes_encrypted = aes.encrypt(payload)
+        results.append(
+            measure(
+                f"crypto.aes.encrypt.{name}",
+                lambda: aes.encrypt(payload),
+                iterations,
+                params=params,
+            )
+        )
+        results.append(
+            measure(
+                f"crypto.aes.decrypt.{name}",
+                lambda: aes.decrypt(aes_encrypted),
+                iterations,
+                params=params,
+            )
+        )
+    key_iterations = max(1, iterations // 100)
+    results.append(
+        measure(
+            "crypto.key_pair.create", KeyPair.create_key_pair, key_iterations, warmup=1
+        )
+    )
+    results.append(
+        measure("crypto.rsa_session.create", RSASession, key_iterations, warmup=1)
+    )
+    return results
+
+
+def _requests() -> Dict[str, TapoRequest]:
+    device_info = load_fixture("p100.json")["get_device_info"]
+    hub = load_fixture("h100_lot_devices.json")
+    child_ids = [
+        child["device_id"]
+        for child in hub["get_child_device_list_0"]["child_device_list"]
+    ]
+    return {
+        "get_device_info": TapoRequest.get_device_info(),
+        "set_device_info": TapoRequest.set_device_info(
+            {"device_on": True, "nickname": device_info["nickname"]}
+        ),
+        "control_child": TapoRequest.control_child(
+            child_ids[0],
+            TapoRequest.multiple_request(
+                MultipleRequestParams([TapoRequest.get_device_info()])
+            ).with_request_time_millis(round(time.time() * 1000)),
+        ),
+        "multiple_control_child": TapoRequest.multiple_request(
+            MultipleRequestParams(
+                [
+                    TapoRequest.control_child(
+                        child_id,
+                        TapoRequest.multiple_request(
+                            MultipleRequestParams([TapoRequest.get_device_info()])
+                        ),
+                    )
+                    for child_id in child_ids
+                ]
+            )
+        ),
+    }
+
+
+def bench_codec(iterations: int) -> List[BenchmarkResult]:
+    results = []
+    for name, request in _requests().items():
+        size = len(jsons.dumps(request))
+        results.append(
+            measure(
+                f"codec.jsons_dumps.{name}",
+                lambda: jsons.dumps(request),
+                iterations,
+                params={"bytes": size},
+            )
+        )
+    return results
+
+
+def _parsers() -> List[Tuple[str, Any, Dict[str, Any]]]:
+    parsers = []
+    for fixture in DEVICE_INFO_FIXTURES:
+        state = load_fixture(fixture)["get_device_info"]
+        parsers.append(
+            (
+                f"parse.device_info.{fixture.removesuffix('.json')}",
+                lambda state=state: DeviceInfo(**state),
+                {"bytes": len(json.dumps(state))},
+            )
+        )
+    page = load_fixture("h100_lot_devices.json")["get_child_device_list_0"]
+    parsers.append(
+        (
+            "parse.child_device_list.h100_lot_devices",
+            lambda: ChildDeviceList.try_from_json(**page).get_children_base_info(),
+            {"bytes": len(json.dumps(page)), "children": len(page["child_device_list"])},
+        )
+    )
+    button = load_fixture("hub_children/s200.json")
+    logs = next(v for k, v in button.items() if k.startswith("get_trigger_logs"))
+    parsers.append(
+        (
+            "parse.trigger_logs.s200",
+            lambda: TriggerLogResponse.try_from_json(
+                logs, parse_s200b_event
+            ).get_or_raise(),
+            {"bytes": len(json.dumps(logs)), "events": len(logs["logs"])},
+        )
+    )
+    return parsers
+
+
+def bench_parsing(iterations: int) -> List[BenchmarkResult]:
+    return [
+        measure(name, parse, iterations, params=params)
+        for name, parse, params in _parsers()
+    ]
+
+
+def run(iterations: int) -> List[BenchmarkResult]:
+    results = []
+    for benchmark in [bench_crypto, bench_codec, bench_parsing]:
+        for result in benchmark(iterations):
+            print(result)
+            results.append(result)
+    return results
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="plugp100 micro benchmarks")
+    parser.add_argument("--output", default="benchmark-micro.json")
+    parser.add_argument("--compare", help="previous results to compare with")
+    parser.add_argument("--iterations", type=int, default=2000)
+    options = parser.parse_args(args)
+    results = run(options.iterations)
+    write_results(options.output, "micro", results)
+    if options.compare:
+        print("\n".join(compare_results(options.compare, options.output)))
+
+
+if __name__ == "__main__":
+    main()
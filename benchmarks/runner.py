@@ -0,0 +1,146 @@
+import dataclasses
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Awaitable, Any, List, Optional, Dict
+
+import plugp100
+
+FIXTURES_PATH = Path(__file__).parent.parent / "tests" / "fixtures"
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    total_seconds: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    min_ms: float
+    max_ms: float
+    ops_per_second: float
+    params: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    @staticmethod
+    def from_samples(
+        name: str,
+        samples: List[float],
+        operations: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> "BenchmarkResult":
+        """
+        @param samples: duration in seconds of each iteration
+        @param operations: operations done by all iterations, by default one per iteration
+        """
+        total = sum(samples)
+        millis = sorted(sample * 1000 for sample in samples)
+        return BenchmarkResult(
+            name=name,
+            iterations=len(samples),
+            total_seconds=total,
+            mean_ms=statistics.fmean(millis),
+            p50_ms=_percentile(millis, 50),
+            p95_ms=_percentile(millis, 95),
+            p99_ms=_percentile(millis, 99),
+            min_ms=millis[0],
+            max_ms=millis[-1],
+            ops_per_second=(operations or len(samples)) / total if total > 0 else 0,
+            params=params or {},
+        )
+
+    def __str__(self):
+        return (
+            f"{self.name:<48} {self.iterations:>7} it  mean {self.mean_ms:9.3f} ms  "
+            f"p95 {self.p95_ms:9.3f} ms  {self.ops_per_second:12.1f} op/s"
+        )
+
+
+def load_fixture(name: str) -> Dict[str, Any]:
+    with open(FIXTURES_PATH / name) as f:
+        return json.load(f)
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    iterations: int,
+    warmup: int = 10,
+    params: Optional[Dict[str, Any]] = None,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return BenchmarkResult.from_samples(name, samples, params=params)
+
+
+async def measure_async(
+    name: str,
+    func: Callable[[], Awaitable[Any]],
+    iterations: int,
+    warmup: int = 3,
+    operations_per_iteration: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        await func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return BenchmarkResult.from_samples(
+        name, samples, operations=iterations * operations_per_iteration, params=params
+    )
+
+
+def write_results(path: str, suite: str, results: List[BenchmarkResult]):
+    """
+    Write results as json, together with the environment they were measured on,
+    so runs of different versions can be compared.
+    """
+    report = {
+        "suite": suite,
+        "plugp100_version": plugp100.__version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.time(),
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_results(baseline_path: str, current_path: str) -> List[str]:
+    """
+    @return: a line for each benchmark found in both files, with the change of mean time
+    """
+    with open(baseline_path) as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = json.load(f)["results"]
+    lines = []
+    for result in current:
+        if previous := baseline.get(result["name"], None):
+            change = (result["mean_ms"] - previous["mean_ms"]) / previous["mean_ms"] * 100
+            lines.append(
+                f"{result['name']:<48} {previous['mean_ms']:9.3f} ms -> "
+                f"{result['mean_ms']:9.3f} ms ({change:+.1f}%)"
+            )
+    return lines
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    index = min(
+        len(sorted_values) - 1, round(percentile / 100 * (len(sorted_values) - 1))
+    )
+    return sorted_values[index]
@@ -1,7 +1,7 @@
 import logging
 from enum import Enum
 from time import time
-from typing import Optional, Any, cast
+from typing import Optional, Any, cast, List, Tuple
 
 import aiohttp
 
@@ -10,6 +10,7 @@ from plugp100.api.requests.tapo_request import TapoRequest, MultipleRequestParam
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try, Failure, Success
 from plugp100.common.utils.json_utils import Json, dataclass_encode_json
+from plugp100.instrumentation.profiler import PROFILER
 from plugp100.protocol.klap import klap_handshake_v2
 from plugp100.protocol.klap.klap_protocol import KlapProtocol
 from plugp100.protocol.passthrough_protocol import PassthroughProtocol
@@ -50,7 +51,8 @@ class TapoClient:
         await self._protocol.close()
 
     async def execute_raw_request(self, request: "TapoRequest") -> Try[Json]:
-        return (await self._protocol.send_request(request)).map(lambda x: x.result)
+        async with PROFILER.sample(f"TapoClient.{request.method}"):
+            return (await self._protocol.send_request(request)).map(lambda x: x.result)
 
     async def get_component_negotiation(self) -> Try[Components]:
         return (await self.execute_raw_request(TapoRequest.component_negotiation())).map(
@@ -164,22 +166,66 @@ class TapoClient:
             MultipleRequestParams([request])
         ).with_request_time_millis(round(time() * 1000))
         request = TapoRequest.control_child(child_id, multiple_request)
-        response = await self._protocol.send_request(request)
+        async with PROFILER.sample("TapoClient.control_child"):
+            response = await self._protocol.send_request(request)
         if response.is_success():
-            try:
-                responses = response.get().result["responseData"]["result"]["responses"]
-                if len(responses) > 0:
-                    return (
-                        Success(responses[0]["result"])
-                        if "result" in responses[0]
-                        else Success(responses[0])
-                    )
-                else:
-                    return Failure(Exception("Empty responses from child"))
-            except Exception as e:
-                return Failure(e)
+            return self._parse_control_child_result(response.get().result)
         return cast(Failure, response)
 
+    async def control_children(
+        self, requests: List[Tuple[str, TapoRequest]]
+    ) -> Try[List[Try[Json]]]:
+        """
+        The function `control_children` sends a request to many child devices at once, by wrapping every
+        `control_child` request into a single `multipleRequest`.
+
+        @param requests: a list of pairs of child device id and the request to be sent to it
+        @type requests: List[Tuple[str, TapoRequest]]
+        @return: an instance of the `Either` class, which can contain either the list of responses, in the same order of
+        requests, or an `Exception`.
+        """
+        request_time_millis = round(time() * 1000)
+        child_requests = [
+            TapoRequest.control_child(
+                child_id,
+                TapoRequest.multiple_request(
+                    MultipleRequestParams([request])
+                ).with_request_time_millis(request_time_millis),
+            )
+            for child_id, request in requests
+        ]
+        response = await self.execute_raw_request(
+            TapoRequest.multiple_request(MultipleRequestParams(child_requests))
+        )
+        return response.flat_map(
+            lambda x: Try.of(
+                lambda: [
+                    self._parse_multiple_request_item(item) for item in x["responses"]
+                ]
+            )
+        )
+
+    def _parse_multiple_request_item(self, item: Json) -> Try[Json]:
+        if item.get("error_code", 0) != 0:
+            return Failure(
+                TapoException.from_error_code(item["error_code"], item.get("msg", ""))
+            )
+        return self._parse_control_child_result(item.get("result", {}))
+
+    def _parse_control_child_result(self, result: Json) -> Try[Json]:
+        try:
+            responses = result["responseData"]["result"]["responses"]
+            if len(responses) > 0:
+                return (
+                    Success(responses[0]["result"])
+                    if "result" in responses[0]
+                    else Success(responses[0])
+                )
+            else:
+                return Failure(Exception("Empty responses from child"))
+        except Exception as e:
+            return Failure(e)
+
     async def _set_device_info(self, device_info: Json) -> Try[bool]:
         response = await self.execute_raw_request(
             TapoRequest.set_device_info(device_info)
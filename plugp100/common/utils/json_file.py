@@ -0,0 +1,45 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict
+
+_LOGGER = logging.getLogger("JsonFile")
+
+
+class JsonFile:
+    """
+    A json object persisted into a file. Reads and writes run outside the event loop and
+    writes are atomic: content is written into a temporary file which replaces the
+    previous one, so a crash never leaves a truncated file behind.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger = None):
+        self.path = path
+        self._logger = logger if logger is not None else _LOGGER
+
+    async def read(self) -> Dict[str, Any]:
+        """
+        @return: the json object of the file, empty when missing or unreadable
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self._read)
+
+    async def write(self, content: Dict[str, Any]):
+        snapshot = dict(content)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            self._logger.warning(f"Ignoring unreadable json file {self.path}, {e}")
+            return {}
+
+    def _write(self, content: Dict[str, Any]):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(content, f)
+        os.replace(temp_path, self.path)
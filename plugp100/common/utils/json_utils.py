@@ -1,8 +1,17 @@
 import dataclasses
-from typing import Any
+import sys
+from typing import Any, Optional
 
 Json = dict[str, Any]
 
 
 def dataclass_encode_json(obj):
     return {k: v for k, v in dataclasses.asdict(obj).items() if v is not None}
+
+
+def intern_str(value: Optional[str]) -> Optional[str]:
+    """
+    @return: the interned value, so a string repeated by many devices, e.g. a model or a
+    firmware version, is stored once
+    """
+    return sys.intern(value) if isinstance(value, str) else value
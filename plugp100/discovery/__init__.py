@@ -1,4 +1,25 @@
 from .discovered_device import DiscoveredDevice, EncryptionSchema
-from .tapo_discovery import TapoDiscovery
+from .discovery_cache import DiscoveryCache
+from .discovery_monitor import (
+    DiscoveryMonitor,
+    DiscoveredDeviceAdded,
+    DiscoveredDeviceRemoved,
+    DiscoveredDeviceIpChanged,
+)
+from .network_interfaces import DiscoveryTarget
+from .rsa_session import RSASessionProvider
+from .tapo_discovery import TapoDiscovery, DiscoveryStats
 
-__all__ = ["TapoDiscovery", "DiscoveredDevice", "EncryptionSchema"]
+__all__ = [
+    "TapoDiscovery",
+    "DiscoveredDevice",
+    "EncryptionSchema",
+    "RSASessionProvider",
+    "DiscoveryTarget",
+    "DiscoveryStats",
+    "DiscoveryCache",
+    "DiscoveryMonitor",
+    "DiscoveredDeviceAdded",
+    "DiscoveredDeviceRemoved",
+    "DiscoveredDeviceIpChanged",
+]
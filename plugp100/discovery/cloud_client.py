@@ -1,31 +1,141 @@
+import asyncio
+import hashlib
+import logging
+import time
 import uuid
 from dataclasses import dataclass
-from typing import List, Optional, Any, cast
+from typing import List, Optional, Any, cast, Callable, Awaitable, Dict
 
 import aiohttp
 
-from plugp100.common.functional.tri import Try, Failure
-from plugp100.common.utils.http_client import AsyncHttp
+from plugp100.common.functional.tri import Try, Failure, Success
+from plugp100.discovery.discovered_device import DiscoveredDevice
+from plugp100.discovery.tapo_discovery import TapoDiscovery
 from plugp100.responses.tapo_response import TapoResponse
 
 _TAPO_CLOUD_URL = "https://wap.tplinkcloud.com"
+_TOKEN_EXPIRED_ERROR_CODE = -20651
+
+_LOGGER = logging.getLogger("CloudClient")
+
+DiscoveryScan = Callable[[], Awaitable[List[DiscoveredDevice]]]
+
+
+@dataclass
+class _CloudToken:
+    credentials_key: str
+    token: str
+    expire_at: float
 
 
 class CloudClient:
+    """
+    Client of tapo cloud. The login token is cached, and reused across calls with the
+    same credentials until `token_lifetime_seconds` are elapsed or the cloud rejects it
+    as expired.
+    Requests reuse the given http session, with its connections and cookies.
+
+    @param url: cloud endpoint, can point to a local stand-in
+    @param terminal_uuid: identifier of this client, generated once when not given
+    """
+
+    def __init__(
+        self,
+        url: str = _TAPO_CLOUD_URL,
+        terminal_uuid: Optional[str] = None,
+        token_lifetime_seconds: float = 3600,
+    ):
+        self._url = url
+        self._terminal_uuid = terminal_uuid or str(uuid.uuid4())
+        self._token_lifetime_seconds = token_lifetime_seconds
+        self._token: Optional[_CloudToken] = None
+        self._login_lock = asyncio.Lock()
+        self._headers = {
+            "Content-Type": "application/json",
+            "requestByApp": "true",
+            "Accept": "application/json",
+        }
+
     async def get_devices(
         self, username: str, password: str, http_session: aiohttp.ClientSession
     ) -> Try[List["CloudDeviceInfo"]]:
-        http_client = AsyncHttp(http_session)
-        token = await self._login_cloud(
-            http_client, username, password, str(uuid.uuid4())
+        token = await self._get_token(http_session, username, password)
+        if token.is_failure():
+            return token.map(lambda _: [])
+        devices = await self._get_cloud_devices(http_session, token.value)
+        if _is_token_expired(devices):
+            self.invalidate_token()
+            token = await self._get_token(http_session, username, password)
+            if token.is_failure():
+                return token.map(lambda _: [])
+            devices = await self._get_cloud_devices(http_session, token.value)
+        return devices
+
+    async def get_devices_with_local_address(
+        self,
+        username: str,
+        password: str,
+        http_session: aiohttp.ClientSession,
+        scan: Optional[DiscoveryScan] = None,
+    ) -> Try[List["CloudDeviceInfo"]]:
+        """
+        Get cloud devices while a local discovery is running, then fill the ipAddress of
+        the cloud devices found locally, matching them by MAC. When the discovery fails,
+        cloud devices are returned without ipAddress.
+        @param scan: local discovery to run, by default `TapoDiscovery.scan_networks`
+        """
+        cloud_devices, discovered_devices = await asyncio.gather(
+            self.get_devices(username, password, http_session),
+            (scan if scan is not None else TapoDiscovery.scan_networks)(),
+            return_exceptions=True,
         )
-        if token.is_success():
-            return await self._get_cloud_devices(http_client, token.value)
+        if isinstance(cloud_devices, Exception):
+            return Failure(cloud_devices)
+        if isinstance(discovered_devices, Exception):
+            _LOGGER.warning(
+                f"Local discovery failed, devices have no address: {discovered_devices}"
+            )
+            discovered_devices = []
+        return cloud_devices.map(
+            lambda devices: merge_cloud_devices(devices, discovered_devices)
+        )
+
+    def invalidate_token(self):
+        self._token = None
+
+    async def _get_token(
+        self, http_session: aiohttp.ClientSession, username: str, password: str
+    ) -> Try[str]:
+        credentials_key = _credentials_key(username, password)
+        async with self._login_lock:
+            token = self._token
+            if (
+                token is not None
+                and token.credentials_key == credentials_key
+                and time.monotonic() < token.expire_at
+            ):
+                return Success(token.token)
+            login = await self._login_cloud(
+                http_session, username, password, self._terminal_uuid
+            )
+            if login.is_success():
+                self._token = _CloudToken(
+                    credentials_key,
+                    login.value,
+                    time.monotonic() + self._token_lifetime_seconds,
+                )
+            return login
 
-        return token.map(lambda _: [])
+    async def _post(self, http_session: aiohttp.ClientSession, url: str, json: Any):
+        async with http_session.post(url, json=json, headers=self._headers) as response:
+            return await response.json(content_type=None)
 
     async def _login_cloud(
-        self, http: AsyncHttp, username: str, password: str, terminal_uuid: str
+        self,
+        http_session: aiohttp.ClientSession,
+        username: str,
+        password: str,
+        terminal_uuid: str,
     ) -> Try[str]:
         try:
             login_request = {
@@ -38,23 +148,25 @@ class CloudClient:
                 },
             }
 
-            response = await http.async_make_post(_TAPO_CLOUD_URL, login_request)
-            json = await response.json(content_type=None)
+            json = await self._post(http_session, self._url, login_request)
             if json and json.get("error_code", -1) == 0:
                 return Try.of(json.get("result").get("token"))
             elif json and "msg" in json:
                 return Failure(Exception(json.get("msg")))
+            return Failure(Exception(f"Unexpected cloud login response {json}"))
         except Exception as e:
-            return Try.of(e)
+            return Failure(e)
 
     async def _get_cloud_devices(
-        self, http: AsyncHttp, auth_token: str
+        self, http_session: aiohttp.ClientSession, auth_token: str
     ) -> Try[List["CloudDeviceInfo"]]:
         request = {"method": "getDeviceList"}
-        response = await http.async_make_post(
-            f"{_TAPO_CLOUD_URL}?token={auth_token}", request
-        )
-        json = await response.json(content_type=None)
+        try:
+            json = await self._post(
+                http_session, f"{self._url}?token={auth_token}", request
+            )
+        except Exception as e:
+            return Failure(e)
         device_list = TapoResponse.try_from_json(json).map(
             lambda x: x.result["deviceList"]
         )
@@ -71,6 +183,40 @@ class CloudClient:
         return device_list.map(lambda _: [])
 
 
+def merge_cloud_devices(
+    cloud_devices: List["CloudDeviceInfo"], discovered_devices: List[DiscoveredDevice]
+) -> List["CloudDeviceInfo"]:
+    """
+    Fill the ipAddress of cloud devices with the address of the discovered device
+    having the same MAC. Devices not found locally are left untouched.
+    """
+    addresses: Dict[str, str] = {
+        _normalize_mac(device.mac): device.ip
+        for device in discovered_devices
+        if device.mac
+    }
+    for device in cloud_devices:
+        if device.deviceMac and (ip := addresses.get(_normalize_mac(device.deviceMac))):
+            device.update_ip_address(ip)
+    return cloud_devices
+
+
+def _credentials_key(username: str, password: str) -> str:
+    # the password is not kept in memory, only a digest of it
+    return hashlib.sha256(f"{username}\0{password}".encode("utf-8")).hexdigest()
+
+
+def _normalize_mac(mac: str) -> str:
+    return mac.replace(":", "").replace("-", "").upper()
+
+
+def _is_token_expired(response: Try[Any]) -> bool:
+    return (
+        response.is_failure()
+        and getattr(response.error(), "error_code", None) == _TOKEN_EXPIRED_ERROR_CODE
+    )
+
+
 @dataclass
 class CloudDeviceInfo:
     deviceType: str
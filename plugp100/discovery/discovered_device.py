@@ -55,6 +55,7 @@ class DiscoveredDevice:
             "owner": self.owner,
             "hw_ver": self.hw_ver,
             "is_support_iot_cloud": self.is_support_iot_cloud,
+            "obd_src": self.obd_src,
             "factory_default": self.factory_default,
             "mgt_encrypt_schm": {
                 "is_support_https": self.mgt_encrypt_schm.is_support_https,
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, List, Callable, Awaitable, Iterable, Any
+
+from plugp100.common.utils.json_file import JsonFile
+from plugp100.discovery.discovered_device import DiscoveredDevice
+from plugp100.discovery.tapo_discovery import TapoDiscovery, _device_key
+
+_LOGGER = logging.getLogger("DiscoveryCache")
+
+DiscoveryScan = Callable[[], Awaitable[List[DiscoveredDevice]]]
+
+
+class DiscoveryCache:
+    """
+    Discovered devices indexed by MAC, with the time they were last seen. Entries older
+    than `ttl_seconds` are expired. When a path is given the cache is persisted into a json
+    file, so devices can be connected at startup from cached data while a scan, e.g.
+    `refresh` run in background, confirms them.
+
+    Usage::
+
+        cache = DiscoveryCache("discovery.json")
+        for device in await cache.load():
+            ...  # connect from cached data
+        asyncio.create_task(cache.refresh())
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+        logger: logging.Logger = None,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = asyncio.Lock()
+        self._logger = logger if logger is not None else _LOGGER
+        self._file = JsonFile(path, self._logger) if path is not None else None
+
+    async def load(self) -> List[DiscoveredDevice]:
+        """
+        @return: devices seen within ttl, read from file on first call
+        """
+        return [device for device, _ in await self._valid_entries()]
+
+    async def get(self, mac: str) -> Optional[DiscoveredDevice]:
+        key = mac.replace("-", ":").upper()
+        return next(
+            (
+                device
+                for device, _ in await self._valid_entries()
+                if _device_key(device) == key
+            ),
+            None,
+        )
+
+    async def get_last_seen(self, mac: str) -> Optional[float]:
+        entry = (await self._load()).get(mac.replace("-", ":").upper(), None)
+        return entry["last_seen"] if entry is not None else None
+
+    async def update(self, devices: Iterable[DiscoveredDevice]):
+        """
+        Store devices as seen now, refreshing their data, and persist the cache.
+        """
+        async with self._lock:
+            entries = await self._load()
+            now = self._clock()
+            for device in devices:
+                entries[_device_key(device)] = {
+                    "device": device.as_dict,
+                    "last_seen": now,
+                }
+            self._expire(entries)
+            if self._file is not None:
+                await self._file.write(entries)
+
+    async def refresh(
+        self, scan: Optional[DiscoveryScan] = None
+    ) -> List[DiscoveredDevice]:
+        """
+        Run a discovery scan and update the cache with its results.
+        @param scan: scan to run, by default `TapoDiscovery.scan_networks`
+        @return: the devices found by the scan
+        """
+        devices = await (scan if scan is not None else TapoDiscovery.scan_networks)()
+        await self.update(devices)
+        return devices
+
+    async def _valid_entries(self) -> List[tuple[DiscoveredDevice, float]]:
+        expire_before = self._clock() - self._ttl_seconds
+        return [
+            (DiscoveredDevice.from_dict(entry["device"]), entry["last_seen"])
+            for entry in (await self._load()).values()
+            if entry["last_seen"] >= expire_before
+        ]
+
+    def _expire(self, entries: Dict[str, Dict[str, Any]]):
+        expire_before = self._clock() - self._ttl_seconds
+        for key in [k for k, v in entries.items() if v["last_seen"] < expire_before]:
+            del entries[key]
+
+    async def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = await self._file.read() if self._file is not None else {}
+        return self._entries
@@ -0,0 +1,114 @@
+import dataclasses
+import logging
+from logging import Logger
+from typing import Union, Dict, Optional, List, Callable, Awaitable, Any
+
+from plugp100.discovery.discovered_device import DiscoveredDevice
+from plugp100.discovery.tapo_discovery import TapoDiscovery, _device_key
+from plugp100.new.event_polling.change_stream import ChangeStream
+from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
+from plugp100.new.event_polling.state_tracker import StateTracker
+
+_LOGGER = logging.getLogger("DiscoveryMonitor")
+
+DiscoveryScan = Callable[[], Awaitable[List[DiscoveredDevice]]]
+
+
+@dataclasses.dataclass
+class DiscoveredDeviceAdded:
+    device: DiscoveredDevice
+
+
+@dataclasses.dataclass
+class DiscoveredDeviceRemoved:
+    device: DiscoveredDevice
+
+
+@dataclasses.dataclass
+class DiscoveredDeviceIpChanged:
+    device: DiscoveredDevice
+    old_ip: str
+
+
+DiscoveryEvent = Union[
+    DiscoveredDeviceAdded, DiscoveredDeviceRemoved, DiscoveredDeviceIpChanged
+]
+
+
+class DiscoveredDevicesTracker(StateTracker[Dict[str, DiscoveredDevice], DiscoveryEvent]):
+    def __init__(self, logger: Logger = None):
+        super().__init__({}, logger)
+
+    def _compute_state_changes(
+        self,
+        new_state: Dict[str, DiscoveredDevice],
+        last_state: Optional[Dict[str, DiscoveredDevice]],
+    ) -> List[DiscoveryEvent]:
+        last_state = last_state or {}
+        changes = []
+        for key, device in new_state.items():
+            if key not in last_state:
+                changes.append(DiscoveredDeviceAdded(device))
+            elif last_state[key].ip != device.ip:
+                changes.append(DiscoveredDeviceIpChanged(device, last_state[key].ip))
+        for key, device in last_state.items():
+            if key not in new_state:
+                changes.append(DiscoveredDeviceRemoved(device))
+        return changes
+
+
+class DiscoveryMonitor:
+    """
+    Periodically rescan the network keeping an index of devices by MAC,
+    and notify subscribers about added, removed or moved devices.
+    A device is removed only after missing `missed_scans_before_removal` consecutive scans.
+    """
+
+    def __init__(
+        self,
+        scan: Optional[DiscoveryScan] = None,
+        interval_millis: int = 60_000,
+        missed_scans_before_removal: int = 2,
+        logger: Logger = None,
+    ):
+        self._scan = scan if scan is not None else TapoDiscovery.scan_networks
+        self._missed_scans_before_removal = missed_scans_before_removal
+        self._missed_scans: Dict[str, int] = {}
+        self._logger = logger if logger is not None else _LOGGER
+        self._tracker = DiscoveredDevicesTracker(self._logger)
+        self._poll_tracker = PollTracker(
+            state_provider=self._rescan,
+            state_tracker=self._tracker,
+            interval_millis=interval_millis,
+            logger=self._logger,
+        )
+
+    @property
+    def devices(self) -> Dict[str, DiscoveredDevice]:
+        return dict(self._tracker.get_last_state() or {})
+
+    def subscribe(self, callback: Callable[[DiscoveryEvent], Any]) -> PollSubscription:
+        return self._poll_tracker.subscribe(callback)
+
+    def changes(self, max_buffer_size: int = 100) -> ChangeStream[DiscoveryEvent]:
+        return ChangeStream(self.subscribe, max_buffer_size, self._logger)
+
+    async def _rescan(
+        self, last_state: Optional[Dict[str, DiscoveredDevice]]
+    ) -> Optional[Dict[str, DiscoveredDevice]]:
+        try:
+            found = {_device_key(device): device for device in await self._scan()}
+        except Exception as e:
+            self._logger.warning(f"Discovery scan failed: {e}")
+            return None
+        new_state = dict(found)
+        for key, device in (last_state or {}).items():
+            if key in found:
+                self._missed_scans.pop(key, None)
+                continue
+            self._missed_scans[key] = self._missed_scans.get(key, 0) + 1
+            if self._missed_scans[key] < self._missed_scans_before_removal:
+                new_state[key] = device
+            else:
+                del self._missed_scans[key]
+        return new_state
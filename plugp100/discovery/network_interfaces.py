@@ -0,0 +1,39 @@
+import dataclasses
+import ipaddress
+import logging
+from typing import Optional, List
+
+logger = logging.getLogger(__name__)
+
+_MULTICAST_NETWORK = ipaddress.IPv4Network("224.0.0.0/4")
+
+
+@dataclasses.dataclass(frozen=True)
+class DiscoveryTarget:
+    broadcast: str
+    local_address: Optional[str] = None
+
+
+def get_local_broadcast_targets() -> List[DiscoveryTarget]:
+    """
+    Enumerate the IPv4 subnets directly attached to local interfaces, from the routing table.
+    Loopback, multicast and host routes are skipped.
+    """
+    try:
+        import scapy.route  # noqa: F401, populates conf.route
+        from scapy.config import conf
+    except Exception as e:
+        logger.warning(f"Failed to read routing table, {e}")
+        return []
+
+    targets = []
+    for net, mask, gateway, _, local_address, _ in conf.route.routes:
+        if gateway != "0.0.0.0" or mask in (0, 0xFFFFFFFF):
+            continue
+        network = ipaddress.IPv4Network((net, bin(mask).count("1")), strict=False)
+        if network.is_loopback or network.subnet_of(_MULTICAST_NETWORK):
+            continue
+        target = DiscoveryTarget(str(network.broadcast_address), local_address)
+        if target not in targets:
+            targets.append(target)
+    return targets
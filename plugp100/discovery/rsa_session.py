@@ -1,7 +1,10 @@
+import asyncio
 import json
 import logging
 import struct
+import time
 import zlib
+from typing import Optional
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives import serialization
@@ -36,6 +39,48 @@ class RSASession:
         )
 
 
+class RSASessionProvider:
+    """
+    Lazily generate a single RSASession, off the event loop, and reuse it
+    for lifetime_seconds across discovery scans.
+    """
+
+    def __init__(self, lifetime_seconds: float = 3600):
+        self.lifetime_seconds = lifetime_seconds
+        self._session: Optional[RSASession] = None
+        self._created_at: float = 0
+        self._pending: Optional[asyncio.Future] = None
+
+    async def get_session(self) -> RSASession:
+        if self._session is not None and not self._is_expired():
+            return self._session
+        loop = asyncio.get_running_loop()
+        if self._pending is None or self._pending.get_loop() is not loop:
+            logger.debug("Generating discovery RSA session")
+            self._pending = loop.run_in_executor(None, RSASession)
+        pending = self._pending
+        try:
+            session = await asyncio.shield(pending)
+        except Exception:
+            # a failed generation is not reused, the next call tries again
+            if self._pending is pending:
+                self._pending = None
+            raise
+        if self._pending is pending:
+            self._session, self._created_at = session, time.monotonic()
+            self._pending = None
+        return session
+
+    def invalidate(self):
+        self._session = None
+
+    def _is_expired(self) -> bool:
+        return time.monotonic() - self._created_at >= self.lifetime_seconds
+
+
+DEFAULT_RSA_SESSION_PROVIDER = RSASessionProvider()
+
+
 def _build_packet_for_payload(payload, pkt_type, pkt_id=b"\x01\x02\x03\x04"):
     len_bytes = struct.pack(">h", len(payload))
     skeleton = (
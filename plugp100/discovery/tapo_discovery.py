@@ -1,75 +1,265 @@
 import asyncio
 import base64
+import dataclasses
+import ipaddress
 import json
 import logging
 import socket
-import time
-from typing import Optional, Generator
+from typing import (
+    Optional,
+    Callable,
+    Any,
+    Tuple,
+    AsyncIterator,
+    List,
+    Union,
+    Iterable,
+)
 
-import select
+import aiohttp
 
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Try, Success, Failure
 from plugp100.discovery.discovered_device import DiscoveredDevice
+from plugp100.instrumentation.loop_monitor import task_name, DISCOVERY
+from plugp100.discovery.network_interfaces import (
+    DiscoveryTarget,
+    get_local_broadcast_targets,
+)
 from plugp100.discovery.rsa_session import (
     RSASession,
+    RSASessionProvider,
+    DEFAULT_RSA_SESSION_PROVIDER,
     _build_packet_for_payload_json,
     _extract_payload_from_package_json,
 )
 from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+from plugp100.new.tapodevice import TapoDevice
 
 logger = logging.getLogger(__name__)
 
 PKT_ONBOARD_REQUEST = b"\x11\x00"
 PKT_ONBOARD_RESPONSE = b'"\x01'
 
+DiscoveryCallback = Callable[[dict[str, Any]], None]
+
+
+@dataclasses.dataclass
+class DiscoveryStats:
+    received: int = 0
+    decoded: int = 0
+    malformed: int = 0
+    dropped: int = 0
+    callback_errors: int = 0
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """
+    Receive path only enqueues raw packets, so the socket buffer is drained quickly,
+    decoding is done by workers. Packets exceeding the queue size are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        packets: asyncio.Queue,
+        stats: DiscoveryStats,
+        receive_buffer_size: Optional[int] = None,
+    ):
+        self._packets = packets
+        self._stats = stats
+        self._receive_buffer_size = receive_buffer_size
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, 5)
+            if self._receive_buffer_size:
+                try:
+                    sock.setsockopt(
+                        socket.SOL_SOCKET, socket.SO_RCVBUF, self._receive_buffer_size
+                    )
+                except OSError as e:
+                    logger.debug(f"Failed to set discovery receive buffer size {e}")
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        self._stats.received += 1
+        try:
+            self._packets.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            self._stats.dropped += 1
+
+    def error_received(self, exc: Exception):
+        logger.debug(f"Discovery socket error {exc}")
+
+
+def _decode_discovery_packet(
+    data: bytes, rsa_session: RSASession
+) -> Optional[dict[str, Any]]:
+    handshake_json = _extract_payload_from_package_json(data)
+    if handshake_json["error_code"]:
+        return None
+    result = handshake_json["result"]
+    # some devices (e.g. cams for sure) have this obfuscated block of json data under the encrypt_info node:
+    encrypt_info = result.get("encrypt_info")
+    if encrypt_info:
+        encrypted_session_key_bytes = base64.b64decode(encrypt_info["key"])
+        decrypted_session_key_bytes = rsa_session.decrypt(encrypted_session_key_bytes)
+        cipher = TpLinkCipherCryptography(
+            decrypted_session_key_bytes[0:16],
+            decrypted_session_key_bytes[16:32],
+        )
+        clear = cipher.decrypt(encrypt_info["data"])
+        result["encrypt_info_clear"] = json.loads(clear)
+    return result
+
+
+async def _send_paced(
+    transport: asyncio.DatagramTransport,
+    packet: bytes,
+    addresses: Iterable[str],
+    port: int,
+    packets_per_second: Optional[float],
+    completed: asyncio.Future,
+):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for sent, address in enumerate(addresses):
+        if completed.done():
+            return
+        if packets_per_second:
+            ahead = start + sent / packets_per_second - loop.time()
+            if ahead > 0.005:
+                await asyncio.sleep(ahead)
+        transport.sendto(packet, (address, port))
+
+
+def _network_hosts(network: ipaddress.IPv4Network) -> Iterable[ipaddress.IPv4Address]:
+    return network.hosts() if network.num_addresses > 1 else [network.network_address]
+
+
+def _device_key(device: DiscoveredDevice) -> str:
+    if device.mac:
+        return device.mac.replace("-", ":").upper()
+    return device.ip
+
 
 class TapoDiscovery:
-    def __init__(self, broadcast, port, timeout):
+    def __init__(
+        self,
+        broadcast,
+        port,
+        timeout,
+        rsa_session_provider: RSASessionProvider = DEFAULT_RSA_SESSION_PROVIDER,
+        local_address: Optional[str] = None,
+        workers: int = 4,
+        max_pending_packets: int = 512,
+        receive_buffer_size: Optional[int] = 1024 * 1024,
+    ):
         self.broadcast = broadcast
         self.port = port
         self.timeout = timeout
+        self.rsa_session_provider = rsa_session_provider
+        self.local_address = local_address
+        self.workers = workers
+        self.max_pending_packets = max_pending_packets
+        self.receive_buffer_size = receive_buffer_size
+        self.stats = DiscoveryStats()
+
+    async def discover(
+        self,
+        on_discovered: DiscoveryCallback,
+        max_responses: Optional[int] = None,
+        addresses: Optional[Iterable[str]] = None,
+        packets_per_second: Optional[float] = None,
+    ) -> DiscoveryStats:
+        """
+        Send the discovery packet and invoke on_discovered for each response, as soon as
+        it is received. Returns when timeout is elapsed or max_responses are received,
+        it can be cancelled at any time.
+        Responses are decoded by a pool of `workers`, outside the event loop, since
+        encrypted ones require an RSA decryption.
 
-    def _scan(self) -> Generator[dict[str, any], None, None]:
-        rsa_session = RSASession()
+        @param addresses: when given, the packet is sent from the same socket to each address
+        instead of broadcast address, and timeout starts after the last packet is sent.
+        @param packets_per_second: max rate of sent packets, None to send them at once.
+        @return: counters of received, decoded, malformed and dropped packets, and of
+        on_discovered errors, which are logged without stopping the discovery
+        """
+        loop = asyncio.get_running_loop()
+        rsa_session = await self.rsa_session_provider.get_session()
         packet = _build_packet_for_payload_json(
             {"params": {"rsa_key": rsa_session.public_key}}, PKT_ONBOARD_REQUEST
         )
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)  # UDP
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, 5)
-        sock.sendto(packet, (self.broadcast, self.port))
-        start = now = time.time()
-        while now - start <= self.timeout:
-            rlist, _, _ = select.select(
-                [sock], [], [], 0.1
-            )  # Check for readability without blocking
-            if sock in rlist:
+        completed = loop.create_future()
+        packets: asyncio.Queue = asyncio.Queue(self.max_pending_packets)
+        stats = self.stats = DiscoveryStats()
+        responses = 0
+
+        async def _decode_worker():
+            while True:
+                data, addr = await packets.get()
                 try:
-                    handshake_packet, addr = sock.recvfrom(2048)
-                    handshake_json = _extract_payload_from_package_json(handshake_packet)
-                    if handshake_json["error_code"]:
-                        continue
-                    result = handshake_json["result"]
-                    # some devices (e.g. cams for sure) have this obfuscated block of json data under the encrypt_info node:
-                    encrypt_info = result.get("encrypt_info")
-                    if encrypt_info:
-                        encrypted_session_key_bytes = base64.b64decode(
-                            encrypt_info["key"]
-                        )
-                        decrypted_session_key_bytes = rsa_session.decrypt(
-                            encrypted_session_key_bytes
+                    result = await loop.run_in_executor(
+                        None, _decode_discovery_packet, data, rsa_session
+                    )
+                except Exception as e:
+                    stats.malformed += 1
+                    logger.debug(
+                        f"Discarding malformed discovery response from {addr}: {e}"
+                    )
+                    continue
+                stats.decoded += 1
+                if result is not None and not completed.done():
+                    try:
+                        _on_discovered(result)
+                    except Exception as e:
+                        stats.callback_errors += 1
+                        logger.warning(
+                            f"Discovery callback failed for response from {addr}: {e}",
+                            exc_info=True,
                         )
-                        cipher = TpLinkCipherCryptography(
-                            decrypted_session_key_bytes[0:16],
-                            decrypted_session_key_bytes[16:32],
-                        )
-                        clear = cipher.decrypt(encrypt_info["data"])
-                        result["encrypt_info_clear"] = json.loads(clear)
-                    yield result
-                except:
-                    pass
-            now = time.time()
-        sock.close()
+
+        def _on_discovered(result: dict[str, Any]):
+            nonlocal responses
+            responses += 1
+            on_discovered(result)
+            if max_responses is not None and responses >= max_responses:
+                if not completed.done():
+                    completed.set_result(None)
+
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DiscoveryProtocol(packets, stats, self.receive_buffer_size),
+            family=socket.AF_INET,
+            allow_broadcast=True,
+            local_addr=(self.local_address, 0) if self.local_address else None,
+        )
+        decode_workers = [
+            asyncio.create_task(_decode_worker(), name=task_name(DISCOVERY, "decode"))
+            for _ in range(max(1, self.workers))
+        ]
+        try:
+            await _send_paced(
+                transport,
+                packet,
+                addresses if addresses is not None else [self.broadcast],
+                self.port,
+                packets_per_second,
+                completed,
+            )
+            await asyncio.wait_for(completed, self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            transport.close()
+            for worker in decode_workers:
+                worker.cancel()
+            await asyncio.gather(*decode_workers, return_exceptions=True)
+        if stats.dropped or stats.malformed:
+            logger.debug(
+                f"Discovery dropped {stats.dropped} and discarded {stats.malformed} "
+                f"malformed packets of {stats.received} received"
+            )
+        return stats
 
     @staticmethod
     async def scan(
@@ -77,11 +267,8 @@ class TapoDiscovery:
         broadcast: Optional[str] = "255.255.255.255",
         port: int = 20002,
     ) -> list[DiscoveredDevice]:
-        loop = asyncio.get_event_loop()
-        devices_found = await loop.run_in_executor(
-            None,
-            lambda: list(TapoDiscovery(broadcast, port, timeout)._scan()),
-        )
+        devices_found = []
+        await TapoDiscovery(broadcast, port, timeout).discover(devices_found.append)
         return [DiscoveredDevice.from_dict(x) for x in devices_found]
 
     @staticmethod
@@ -90,5 +277,179 @@ class TapoDiscovery:
         timeout: Optional[int] = 5,
         port: int = 20002,
     ) -> Optional[DiscoveredDevice]:
-        devices_found = await TapoDiscovery.scan(timeout, ip, port)
-        return devices_found[0] if len(devices_found) > 0 else None
+        devices_found = []
+        await TapoDiscovery(ip, port, timeout).discover(
+            devices_found.append, max_responses=1
+        )
+        return DiscoveredDevice.from_dict(devices_found[0]) if devices_found else None
+
+    @staticmethod
+    async def scan_networks(
+        timeout: Optional[int] = 5,
+        targets: Optional[List[Union[str, DiscoveryTarget]]] = None,
+        port: int = 20002,
+    ) -> list[DiscoveredDevice]:
+        """
+        Scan many subnets at once, concurrently, so the whole scan lasts a single timeout.
+        Devices answering on more than one subnet are reported once, deduplicated by MAC.
+
+        @param targets: broadcast addresses or targets to scan, when None the subnets
+        of local interfaces are used.
+        @return: the list of discovered devices
+        """
+        if targets is None:
+            targets = await asyncio.get_running_loop().run_in_executor(
+                None, get_local_broadcast_targets
+            )
+            if len(targets) == 0:
+                targets = [DiscoveryTarget("255.255.255.255")]
+        targets = [
+            DiscoveryTarget(target) if isinstance(target, str) else target
+            for target in targets
+        ]
+        devices_found: dict[str, DiscoveredDevice] = {}
+
+        def _on_discovered(result: dict[str, Any]):
+            device = DiscoveredDevice.from_dict(result)
+            devices_found.setdefault(_device_key(device), device)
+
+        await asyncio.gather(
+            *[
+                TapoDiscovery(
+                    target.broadcast, port, timeout, local_address=target.local_address
+                ).discover(_on_discovered)
+                for target in targets
+            ]
+        )
+        return list(devices_found.values())
+
+    @staticmethod
+    async def sweep(
+        networks: Union[str, List[str]],
+        timeout: Optional[int] = 2,
+        port: int = 20002,
+        packets_per_second: Optional[float] = 500,
+    ) -> list[DiscoveredDevice]:
+        """
+        Unicast discovery for networks where broadcast is blocked. The packet is sent to
+        every host of the given CIDR ranges or ip addresses from a single socket,
+        paced to packets_per_second, while responses are collected.
+
+        @param networks: CIDR range(s) or ip address(es), e.g. "192.168.1.0/22"
+        @return: the list of discovered devices, deduplicated by MAC
+        """
+        networks = [networks] if isinstance(networks, str) else networks
+        addresses = (
+            str(address)
+            for network in networks
+            for address in _network_hosts(ipaddress.ip_network(network, strict=False))
+        )
+        devices_found: dict[str, DiscoveredDevice] = {}
+
+        def _on_discovered(result: dict[str, Any]):
+            device = DiscoveredDevice.from_dict(result)
+            devices_found.setdefault(_device_key(device), device)
+
+        await TapoDiscovery(None, port, timeout).discover(
+            _on_discovered, addresses=addresses, packets_per_second=packets_per_second
+        )
+        return list(devices_found.values())
+
+    @staticmethod
+    async def stream(
+        timeout: Optional[int] = 5,
+        broadcast: Optional[str] = "255.255.255.255",
+        port: int = 20002,
+    ) -> AsyncIterator[DiscoveredDevice]:
+        """
+        Yield discovered devices as soon as they answer, until timeout is elapsed.
+        """
+        found: asyncio.Queue[Optional[dict[str, Any]]] = asyncio.Queue()
+
+        async def _discover():
+            try:
+                await TapoDiscovery(broadcast, port, timeout).discover(found.put_nowait)
+            finally:
+                found.put_nowait(None)
+
+        discovery_task = asyncio.create_task(
+            _discover(), name=task_name(DISCOVERY, "stream")
+        )
+        try:
+            while (result := await found.get()) is not None:
+                yield DiscoveredDevice.from_dict(result)
+            await discovery_task
+        finally:
+            discovery_task.cancel()
+            await asyncio.gather(discovery_task, return_exceptions=True)
+
+    @staticmethod
+    async def scan_and_connect(
+        credentials: AuthCredential,
+        timeout: Optional[int] = 5,
+        broadcast: Optional[str] = "255.255.255.255",
+        port: int = 20002,
+        max_concurrency: int = 10,
+        update_state: bool = True,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> AsyncIterator[Tuple[DiscoveredDevice, Try[TapoDevice]]]:
+        """
+        Connect to discovered devices as soon as they answer, while discovery is still running.
+        At most max_concurrency devices are connected at the same time.
+
+        @param credentials: credentials used to connect devices
+        @param max_concurrency: max number of concurrent connections
+        @param update_state: when True devices are also updated before being yielded
+        @return: Each discovered device together with the connected device or the error
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        connect_tasks: set[asyncio.Task] = set()
+
+        async def _connect(discovered: DiscoveredDevice):
+            async with semaphore:
+                device = None
+                try:
+                    device = await discovered.get_tapo_device(credentials, session)
+                    if update_state:
+                        await device.update()
+                    connected = Success(device)
+                except asyncio.CancelledError:
+                    if device is not None:
+                        await device.client.close()
+                    raise
+                except Exception as e:
+                    if device is not None:
+                        await device.client.close()
+                    connected = Failure(e)
+            results.put_nowait((discovered, connected))
+
+        async def _discover_and_connect():
+            try:
+                async for discovered in TapoDiscovery.stream(timeout, broadcast, port):
+                    connect_tasks.add(
+                        asyncio.create_task(
+                            _connect(discovered), name=task_name(DISCOVERY, "connect")
+                        )
+                    )
+                await asyncio.gather(*connect_tasks)
+            finally:
+                results.put_nowait(None)
+
+        pipeline_task = asyncio.create_task(
+            _discover_and_connect(), name=task_name(DISCOVERY, "pipeline")
+        )
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            await pipeline_task
+        finally:
+            pipeline_task.cancel()
+            for task in connect_tasks:
+                task.cancel()
+            await asyncio.gather(pipeline_task, *connect_tasks, return_exceptions=True)
+            # devices connected but not yielded, e.g. when consumer stops early
+            while not results.empty():
+                result = results.get_nowait()
+                if result is not None and result[1].is_success():
+                    await result[1].get().client.close()
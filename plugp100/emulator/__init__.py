@@ -0,0 +1,17 @@
+from .device_emulator import (
+    DeviceEmulator,
+    EmulatorFaults,
+    EmulatorStats,
+    start_emulators,
+    stop_emulators,
+)
+from .fixture_device import FixtureDevice
+
+__all__ = [
+    "DeviceEmulator",
+    "EmulatorFaults",
+    "EmulatorStats",
+    "FixtureDevice",
+    "start_emulators",
+    "stop_emulators",
+]
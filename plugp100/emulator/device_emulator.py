@@ -0,0 +1,319 @@
+import asyncio
+import base64
+import dataclasses
+import json
+import logging
+import random
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, List
+
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import padding as asymmetric_padding
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.utils.json_utils import Json
+from plugp100.emulator.fixture_device import FixtureDevice
+from plugp100.encryption import helpers
+from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+from plugp100.protocol.klap.klap_handshake_revision import (
+    klap_handshake_v1,
+    klap_handshake_v2,
+)
+from plugp100.protocol.klap.klap_protocol import KlapChiper, KlapProtocol
+from plugp100.responses.tapo_exception import TapoError
+
+_LOGGER = logging.getLogger("DeviceEmulator")
+
+_MAX_SESSIONS = 32
+
+
+@dataclasses.dataclass
+class EmulatorFaults:
+    """
+    Faults injected by an emulated device.
+
+    @param latency_seconds: delay added to every response
+    @param latency_jitter_seconds: max random delay added on top of latency_seconds
+    @param error_rate: probability, from 0 to 1, of answering a request with error_code
+    @param error_code: error code of injected errors
+    @param max_requests_per_second: requests above this rate are answered with
+    rate_limit_error_code, None to disable rate limit
+    """
+
+    latency_seconds: float = 0
+    latency_jitter_seconds: float = 0
+    error_rate: float = 0
+    error_code: int = TapoError.ERR_DEVICE.value
+    max_requests_per_second: Optional[float] = None
+    rate_limit_error_code: int = TapoError.ERR_DEVICE.value
+
+
+@dataclasses.dataclass
+class EmulatorStats:
+    handshakes: int = 0
+    requests: int = 0
+    injected_errors: int = 0
+    rate_limited: int = 0
+
+
+@dataclasses.dataclass
+class _Session:
+    session_id: str
+    local_seed: bytes = b""
+    remote_seed: bytes = b""
+    chiper: Optional[object] = None
+    token: Optional[str] = None
+
+
+class DeviceEmulator:
+    """
+    Emulate a device over http, speaking klap (v1 or v2) or aes securePassthrough,
+    with the real handshakes and encryption, and serving the state of a fixture.
+    Sessions are matched by their cookie only: requests with a missing or unknown
+    session cookie are answered with 403, as a restarted device does. Clients passing
+    their own http session need a cookie jar keeping cookies of ip hosts,
+    `aiohttp.CookieJar(unsafe=True)`.
+
+    Usage::
+
+        emulator = DeviceEmulator(load_fixture("p100.json"), credentials)
+        await emulator.start()
+        device = await connect(DeviceConnectConfiguration(emulator.host, emulator.port, credentials))
+        ...
+        await emulator.stop()
+
+    @param encryption_type: "klap" or "aes"
+    @param encryption_version: klap handshake version, 1 or 2
+    """
+
+    def __init__(
+        self,
+        fixture: Json,
+        credentials: AuthCredential,
+        encryption_type: str = "klap",
+        encryption_version: int = 2,
+        faults: Optional[EmulatorFaults] = None,
+        seed: Optional[int] = None,
+        session_timeout_seconds: int = 86400,
+    ):
+        self.device = FixtureDevice(fixture)
+        self.credentials = credentials
+        self.encryption_type = encryption_type.lower()
+        self.encryption_version = encryption_version
+        self.faults = faults if faults is not None else EmulatorFaults()
+        self.stats = EmulatorStats()
+        self.host: Optional[str] = None
+        self.port: Optional[int] = None
+        self._random = random.Random(seed)
+        self._session_timeout_seconds = session_timeout_seconds
+        self._klap_strategy = (
+            klap_handshake_v2() if encryption_version == 2 else klap_handshake_v1()
+        )
+        self._auth_hash = self._klap_strategy.generate_auth_hash(credentials)
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._rate_window_start = 0.0
+        self._rate_window_requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/app"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "DeviceEmulator":
+        app = web.Application()
+        app.router.add_post("/app", self._handle_passthrough)
+        app.router.add_post("/app/handshake1", self._handle_handshake1)
+        app.router.add_post("/app/handshake2", self._handle_handshake2)
+        app.router.add_post("/app/request", self._handle_klap_request)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.host, self.port = self._runner.addresses[0][:2]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        # as a rebooted device, a restarted emulator forgets its sessions
+        self._sessions.clear()
+
+    async def __aenter__(self) -> "DeviceEmulator":
+        return await self.start() if self._runner is None else self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _handle_handshake1(self, request: web.Request) -> web.Response:
+        if self.encryption_type != "klap":
+            return web.Response(status=404)
+        await self._apply_latency()
+        self.stats.handshakes += 1
+        session = self._new_session()
+        session.local_seed = await request.read()
+        session.remote_seed = secrets.token_bytes(16)
+        server_hash = self._klap_strategy.handshake1_seed_auth_hash(
+            session.local_seed, session.remote_seed, self._auth_hash
+        )
+        response = web.Response(body=session.remote_seed + server_hash)
+        self._set_session_cookies(response, session)
+        return response
+
+    async def _handle_handshake2(self, request: web.Request) -> web.Response:
+        session = self._get_session(request)
+        if self.encryption_type != "klap" or session is None:
+            return web.Response(status=403)
+        await self._apply_latency()
+        expected = self._klap_strategy.handshake2_seed_auth_hash(
+            session.local_seed, session.remote_seed, self._auth_hash
+        )
+        if await request.read() != expected:
+            return web.Response(status=403)
+        session.chiper = KlapChiper(
+            session.local_seed, session.remote_seed, self._auth_hash
+        )
+        return web.Response()
+
+    async def _handle_klap_request(self, request: web.Request) -> web.Response:
+        session = self._get_session(request)
+        if session is None or session.chiper is None:
+            return web.Response(status=403)
+        await self._apply_latency()
+        seq = int(request.query["seq"])
+        payload = await request.read()
+        chiper = session.chiper
+        # the chiper encrypts with the sequence number incremented by one
+        chiper._seq = seq
+        decrypted = json.loads(chiper.decrypt(payload))
+        response = json.dumps(self._handle_request(decrypted))
+        chiper._seq = seq - 1
+        encrypted, _ = chiper.encrypt(response)
+        return web.Response(body=encrypted)
+
+    async def _handle_passthrough(self, request: web.Request) -> web.Response:
+        if self.encryption_type != "aes":
+            return web.json_response({"error_code": TapoError.INVALID_REQUEST.value})
+        await self._apply_latency()
+        body = json.loads(await request.read())
+        if body.get("method") == "handshake":
+            return self._passthrough_handshake(body)
+        session = self._get_session(request)
+        if session is None:
+            return web.Response(status=403)
+        if body.get("method") != "securePassthrough":
+            return web.json_response({"error_code": TapoError.ERR_SESSION_PARAM.value})
+        inner_request = json.loads(session.chiper.decrypt(body["params"]["request"]))
+        if inner_request.get("method") == "login_device":
+            inner_response = self._passthrough_login(session, inner_request)
+        elif session.token is None or request.query.get("token") != session.token:
+            inner_response = {"error_code": TapoError.ERR_SESSION_TIMEOUT.value}
+        else:
+            inner_response = self._handle_request(inner_request)
+        return web.json_response(
+            {
+                "error_code": 0,
+                "result": {
+                    "response": session.chiper.encrypt(json.dumps(inner_response))
+                },
+            }
+        )
+
+    def _passthrough_handshake(self, body: Json) -> web.Response:
+        self.stats.handshakes += 1
+        public_key = serialization.load_pem_public_key(body["params"]["key"].encode())
+        key_and_iv = secrets.token_bytes(32)
+        encrypted_key = public_key.encrypt(key_and_iv, asymmetric_padding.PKCS1v15())
+        session = self._new_session()
+        session.chiper = TpLinkCipherCryptography(key_and_iv[:16], key_and_iv[16:])
+        response = web.json_response(
+            {"error_code": 0, "result": {"key": base64.b64encode(encrypted_key).decode()}}
+        )
+        self._set_session_cookies(response, session)
+        return response
+
+    def _passthrough_login(self, session: _Session, request: Json) -> Json:
+        params = request.get("params", {})
+        username = helpers.base64encode(helpers.sha1_from_str(self.credentials.username))
+        valid_passwords = [
+            params.get("password", None)
+            == helpers.base64encode(self.credentials.password),
+            params.get("password2", None)
+            == helpers.base64encode(helpers.sha1_from_str(self.credentials.password)),
+        ]
+        if params.get("username", None) != username or not any(valid_passwords):
+            return {"error_code": TapoError.INVALID_CREDENTIAL.value}
+        session.token = secrets.token_hex(16)
+        return {"error_code": 0, "result": {"token": session.token}}
+
+    def _handle_request(self, request: Json) -> Json:
+        self.stats.requests += 1
+        if self._is_rate_limited():
+            self.stats.rate_limited += 1
+            return {"error_code": self.faults.rate_limit_error_code}
+        if self.faults.error_rate and self._random.random() < self.faults.error_rate:
+            self.stats.injected_errors += 1
+            return {"error_code": self.faults.error_code}
+        return self.device.handle(request)
+
+    def _is_rate_limited(self) -> bool:
+        if not self.faults.max_requests_per_second:
+            return False
+        now = time.monotonic()
+        if now - self._rate_window_start >= 1:
+            self._rate_window_start = now
+            self._rate_window_requests = 0
+        self._rate_window_requests += 1
+        return self._rate_window_requests > self.faults.max_requests_per_second
+
+    async def _apply_latency(self):
+        delay = self.faults.latency_seconds
+        if self.faults.latency_jitter_seconds:
+            delay += self._random.uniform(0, self.faults.latency_jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _new_session(self) -> _Session:
+        session = _Session(session_id=secrets.token_hex(16))
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > _MAX_SESSIONS:
+            self._sessions.popitem(last=False)
+        return session
+
+    def _get_session(self, request: web.Request) -> Optional[_Session]:
+        session_id = request.cookies.get(KlapProtocol.TP_SESSION_COOKIE_NAME, None)
+        return self._sessions.get(session_id, None) if session_id is not None else None
+
+    def _set_session_cookies(self, response: web.Response, session: _Session):
+        response.set_cookie(KlapProtocol.TP_SESSION_COOKIE_NAME, session.session_id)
+        response.set_cookie(
+            KlapProtocol.TP_TIMEOUT_COOKIE_NAME, str(self._session_timeout_seconds)
+        )
+
+
+async def start_emulators(
+    fixture: Json,
+    credentials: AuthCredential,
+    count: int,
+    host: str = "127.0.0.1",
+    **kwargs,
+) -> List[DeviceEmulator]:
+    """
+    Start many emulated devices, each one with its own state on its own local port.
+    @param kwargs: arguments of DeviceEmulator, e.g. encryption_type or faults
+    """
+    return list(
+        await asyncio.gather(
+            *[
+                DeviceEmulator(fixture, credentials, **kwargs).start(host)
+                for _ in range(count)
+            ]
+        )
+    )
+
+
+async def stop_emulators(emulators: List[DeviceEmulator]):
+    await asyncio.gather(*[emulator.stop() for emulator in emulators])
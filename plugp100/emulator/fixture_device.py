@@ -0,0 +1,77 @@
+import copy
+from typing import Any, Optional
+
+from plugp100.common.utils.json_utils import Json
+
+
+class FixtureDevice:
+    """
+    State of an emulated device, backed by a fixture with the same layout of
+    `tests/fixtures/*.json`: the result of each method keyed by method name,
+    `get_child_device_list_<start_index>` for child pages and `<method>_<child_id>`
+    for requests to children. Set requests update the state of the matching get method.
+    """
+
+    def __init__(self, fixture: Json):
+        self._data = copy.deepcopy(fixture)
+
+    @property
+    def device_info(self) -> Json:
+        return self._data.get("get_device_info", {})
+
+    def handle(self, request: Json) -> Json:
+        """
+        @param request: a decrypted request, as sent by the client
+        @return: the response to be encrypted, with error_code and result
+        """
+        method = request.get("method", "")
+        params = request.get("params", None)
+        if method == "multipleRequest":
+            return _response_of({"responses": self._multiple_request(params)})
+        elif method == "control_child":
+            return self._control_child(params)
+        return _response_of(copy.deepcopy(self._call(method, params)))
+
+    def _call(self, method: str, params: Optional[Json]) -> Any:
+        if method.startswith("set_lighting_effect"):
+            self._data.setdefault("get_device_info", {})["lighting_effect"] = params
+            return {}
+        elif method.startswith("set_"):
+            self._data.setdefault(f"get_{method[4:]}", {}).update(params or {})
+            return {}
+        elif method.startswith("play_alarm"):
+            self.device_info["in_alarm"] = True
+            return {}
+        elif method.startswith("stop_alarm"):
+            self.device_info["in_alarm"] = False
+            return {}
+        elif method == "get_child_device_list":
+            start_index = (params or {}).get("start_index", 0)
+            return self._data.get(f"{method}_{start_index}", None)
+        return self._data.get(method, {})
+
+    def _multiple_request(self, params: Optional[Json]) -> list[Json]:
+        responses = []
+        for request in (params or {}).get("requests", []):
+            response = self.handle(request)
+            responses.append({"method": request.get("method"), **response})
+        return responses
+
+    def _control_child(self, params: Json) -> Json:
+        device_id = params["device_id"]
+        requests = params["requestData"].get("params", {}).get("requests", [])
+        responses = [
+            {
+                "method": request["method"],
+                "result": copy.deepcopy(
+                    self._call(f"{request['method']}_{device_id}", request.get("params"))
+                ),
+                "error_code": 0,
+            }
+            for request in requests
+        ]
+        return _response_of({"responseData": {"result": {"responses": responses}}})
+
+
+def _response_of(result: Any) -> Json:
+    return {"error_code": 0, "result": result}
@@ -0,0 +1,25 @@
+from .histogram import LatencyHistogram, RequestHistograms, RequestStats
+from .loop_monitor import LoopMonitor, LoopStall, task_name
+from .profiler import PROFILER, SampledProfile, SamplingProfiler
+from .request_instrumentation import (
+    INSTRUMENTATION,
+    RequestEvent,
+    RequestInstrumentation,
+    RequestTimer,
+)
+
+__all__ = [
+    "INSTRUMENTATION",
+    "LatencyHistogram",
+    "LoopMonitor",
+    "LoopStall",
+    "PROFILER",
+    "RequestEvent",
+    "RequestHistograms",
+    "RequestInstrumentation",
+    "RequestStats",
+    "RequestTimer",
+    "SampledProfile",
+    "SamplingProfiler",
+    "task_name",
+]
@@ -0,0 +1,157 @@
+import dataclasses
+import math
+from typing import Dict, Optional, Tuple, List
+
+from plugp100.instrumentation.request_instrumentation import (
+    RequestEvent,
+    RequestInstrumentation,
+    INSTRUMENTATION,
+)
+
+TOTAL = "total"
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram, like HDR histograms: values are counted into buckets whose
+    width grows with the value, so percentiles have a bounded relative error
+    (`relative_precision`) with a constant memory, whatever the number of values.
+    """
+
+    def __init__(self, relative_precision: float = 0.01):
+        self._log_base = math.log1p(relative_precision)
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value: float):
+        bucket = math.floor(math.log(value) / self._log_base) if value > 0 else -(2**31)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        for bucket, count in other._buckets.items():
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in [other.min, other.max]:
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count > 0 else None
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        @param percentile: from 0 to 100
+        @return: the value at percentile, with relative_precision, None when empty
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                value = (
+                    math.exp((bucket + 0.5) * self._log_base)
+                    if bucket > -(2**31)
+                    else 0
+                )
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+@dataclasses.dataclass
+class RequestStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+
+
+class RequestHistograms:
+    """
+    In memory aggregation of request events, with a latency histogram for each
+    device host, method and phase. `total` is the whole request duration.
+
+    Usage::
+
+        histograms = RequestHistograms().attach()
+        ...
+        p99 = histograms.get(method="get_device_info").percentile(99)
+    """
+
+    def __init__(self, relative_precision: float = 0.01):
+        self._relative_precision = relative_precision
+        self._histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self._stats: Dict[Tuple[str, str], RequestStats] = {}
+        self._unsubscribe = None
+
+    def attach(
+        self, instrumentation: RequestInstrumentation = INSTRUMENTATION
+    ) -> "RequestHistograms":
+        self.detach()
+        self._unsubscribe = instrumentation.subscribe(self.record)
+        return self
+
+    def detach(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def record(self, event: RequestEvent):
+        self._histogram(event.host, event.method, TOTAL).record(event.duration)
+        for phase, duration in event.phases.items():
+            self._histogram(event.host, event.method, phase).record(duration)
+        stats = self._stats.setdefault((event.host, event.method), RequestStats())
+        stats.requests += 1
+        stats.retries += event.retries
+        stats.errors += 0 if event.success else 1
+
+    def get(
+        self, host: Optional[str] = None, method: Optional[str] = None, phase: str = TOTAL
+    ) -> LatencyHistogram:
+        """
+        @return: latencies of requests matching host and method, all when None
+        """
+        merged = LatencyHistogram(self._relative_precision)
+        for (h, m, p), histogram in self._histograms.items():
+            if p == phase and host in (None, h) and method in (None, m):
+                merged.merge(histogram)
+        return merged
+
+    def get_stats(
+        self, host: Optional[str] = None, method: Optional[str] = None
+    ) -> RequestStats:
+        merged = RequestStats()
+        for (h, m), stats in self._stats.items():
+            if host in (None, h) and method in (None, m):
+                merged.requests += stats.requests
+                merged.errors += stats.errors
+                merged.retries += stats.retries
+        return merged
+
+    @property
+    def hosts(self) -> List[str]:
+        return sorted({host for host, _ in self._stats})
+
+    @property
+    def methods(self) -> List[str]:
+        return sorted({method for _, method in self._stats})
+
+    def reset(self):
+        self._histograms.clear()
+        self._stats.clear()
+
+    def _histogram(self, host: str, method: str, phase: str) -> LatencyHistogram:
+        key = (host, method, phase)
+        if (histogram := self._histograms.get(key, None)) is None:
+            histogram = self._histograms[key] = LatencyHistogram(self._relative_precision)
+        return histogram
@@ -0,0 +1,226 @@
+import asyncio
+import collections
+import dataclasses
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Dict, List, Optional, Callable, Any
+
+from plugp100.instrumentation.histogram import LatencyHistogram
+
+_LOGGER = logging.getLogger("LoopMonitor")
+
+# origins of tasks created by the library, part of task names
+TRACKER = "tracker"
+DISPATCHER = "dispatcher"
+DISCOVERY = "discovery"
+PROTOCOL = "protocol"
+MONITOR = "monitor"
+OTHER = "other"
+
+_TASK_PREFIX = "plugp100."
+_PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROTOCOL_PATH = os.path.join(_PACKAGE_PATH, "protocol")
+
+
+def task_name(origin: str, name: str) -> str:
+    """
+    @return: name of a task created by the library, counted by `LoopMonitor.task_census`
+    under its origin
+    """
+    return f"{_TASK_PREFIX}{origin}.{name}"
+
+
+@dataclasses.dataclass
+class LoopStall:
+    """
+    The event loop was blocked by a synchronous step for `duration` seconds. `stack` is
+    the stack of the loop thread while blocked, `library_frame` the innermost frame of
+    this library in it, when the watchdog caught the stall.
+    """
+
+    duration: float
+    stack: List[str] = dataclasses.field(default_factory=list)
+    library_frame: Optional[str] = None
+
+
+StallListener = Callable[[LoopStall], Any]
+
+
+class LoopMonitor:
+    """
+    Measure the lag of the event loop, count live tasks by origin and catch synchronous
+    steps blocking the loop for longer than `stall_threshold_seconds`.
+
+    Lag is measured by a task sleeping for `interval_seconds`. A watchdog thread takes
+    the stack of the loop thread while it is blocked, so stalls are attributed to the
+    step which caused them, e.g. a key generation; stalls are logged as warnings and
+    notified to listeners once the loop runs again.
+
+    Usage::
+
+        monitor = LoopMonitor(stall_threshold_seconds=0.05)
+        monitor.start()
+        ...
+        print(monitor.lag.percentile(99), monitor.task_census())
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.1,
+        stall_threshold_seconds: float = 0.1,
+        watchdog: bool = True,
+        max_stalls: int = 100,
+        logger: logging.Logger = None,
+    ):
+        self._interval = interval_seconds
+        self._threshold = stall_threshold_seconds
+        self._watchdog_enabled = watchdog
+        self._logger = logger if logger is not None else _LOGGER
+        self._listeners: List[StallListener] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = 0.0
+        self._caught_stall: Optional[LoopStall] = None
+        self.lag = LatencyHistogram()
+        self.max_lag = 0.0
+        self.stalls_count = 0
+        self.stalls: collections.deque[LoopStall] = collections.deque(maxlen=max_stalls)
+
+    @property
+    def is_running(self) -> bool:
+        return self._heartbeat_task is not None
+
+    def start(self) -> "LoopMonitor":
+        """Start monitoring the running event loop."""
+        if self._heartbeat_task is None:
+            self._loop_thread_id = threading.get_ident()
+            self._last_tick = time.monotonic()
+            self._heartbeat_task = asyncio.create_task(
+                self._heartbeat(), name=task_name(MONITOR, "heartbeat")
+            )
+            if self._watchdog_enabled:
+                self._stopped.clear()
+                self._watchdog = threading.Thread(
+                    target=self._watch, name="plugp100-loop-watchdog", daemon=True
+                )
+                self._watchdog.start()
+        return self
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        if self._watchdog is not None:
+            self._stopped.set()
+            self._watchdog.join()
+            self._watchdog = None
+
+    def subscribe(self, listener: StallListener) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        def _unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _unsubscribe
+
+    def reset(self):
+        self.lag = LatencyHistogram()
+        self.max_lag = 0.0
+        self.stalls_count = 0
+        self.stalls.clear()
+
+    @staticmethod
+    def task_census() -> Dict[str, int]:
+        """
+        @return: number of live tasks by origin: tasks created by the library are counted
+        by the origin in their name, other tasks awaiting a protocol as `protocol`,
+        all the remaining ones as `other`
+        """
+        census: Dict[str, int] = {}
+        for task in asyncio.all_tasks():
+            origin = _task_origin(task)
+            census[origin] = census.get(origin, 0) + 1
+        return census
+
+    async def _heartbeat(self):
+        while True:
+            started_at = time.monotonic()
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started_at - self._interval)
+            self._last_tick = now
+            self.lag.record(lag)
+            self.max_lag = max(self.max_lag, lag)
+            stall, self._caught_stall = self._caught_stall, None
+            if stall is None and lag >= self._threshold:
+                stall = LoopStall(lag)
+                self._logger.warning(f"Event loop was blocked for {lag:.3f}s")
+            if stall is not None:
+                stall.duration = max(stall.duration, lag)
+                self.stalls_count += 1
+                self.stalls.append(stall)
+                for listener in list(self._listeners):
+                    try:
+                        listener(stall)
+                    except Exception as e:
+                        self._logger.warning(f"Stall listener failed: {e}")
+
+    def _watch(self):
+        check_interval = min(self._interval, self._threshold) / 2
+        caught_tick = None
+        while not self._stopped.wait(check_interval):
+            last_tick = self._last_tick
+            blocked_for = time.monotonic() - last_tick - self._interval
+            if blocked_for < self._threshold or caught_tick == last_tick:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id, None)
+            if frame is None:
+                continue
+            caught_tick = last_tick
+            stall = LoopStall(
+                duration=blocked_for,
+                stack=traceback.format_stack(frame),
+                library_frame=_innermost_library_frame(frame),
+            )
+            self._caught_stall = stall
+            self._logger.warning(
+                f"Event loop blocked for more than {blocked_for:.3f}s in "
+                f"{stall.library_frame or 'code outside plugp100'}:\n"
+                + "".join(stall.stack[-5:])
+            )
+
+
+def _task_origin(task: asyncio.Task) -> str:
+    name = task.get_name()
+    if name.startswith(_TASK_PREFIX):
+        return name[len(_TASK_PREFIX) :].split(".", 1)[0]
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is not None and frame.f_code.co_filename.startswith(_PROTOCOL_PATH):
+            return PROTOCOL
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+    return OTHER
+
+
+def _innermost_library_frame(frame: Optional[FrameType]) -> Optional[str]:
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PACKAGE_PATH) and filename != __file__:
+            relative = os.path.relpath(filename, os.path.dirname(_PACKAGE_PATH))
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
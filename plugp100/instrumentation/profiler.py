@@ -0,0 +1,170 @@
+import cProfile
+import dataclasses
+import io
+import logging
+import os
+import pstats
+import re
+from typing import Dict, Optional, List
+
+_LOGGER = logging.getLogger("SamplingProfiler")
+
+
+@dataclasses.dataclass
+class SampledProfile:
+    """
+    Profile of the calls of a key, e.g. a device class: `calls` made and `samples`
+    run under the profiler, whose statistics are merged into `stats`.
+    """
+
+    calls: int = 0
+    samples: int = 0
+    stats: Optional[pstats.Stats] = None
+
+
+class _Sample:
+    def __init__(self, profiler: "SamplingProfiler", key: str):
+        self._profiler = profiler
+        self._key = key
+        self._profile: Optional[cProfile.Profile] = None
+
+    async def __aenter__(self):
+        self._profile = self._profiler._start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._profile is not None:
+            self._profiler._stop(self._key, self._profile)
+
+
+class _DisabledSample:
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+_DISABLED_SAMPLE = _DisabledSample()
+
+
+class SamplingProfiler:
+    """
+    Profile one in `sample_every` calls of `TapoDevice.update` and `TapoClient`
+    requests under cProfile, and merge statistics by key: device class name for updates,
+    `TapoClient.<method>` for requests. Disabled by default; when disabled, calls are
+    neither counted nor profiled.
+
+    A single call is profiled at a time: when a sampled call starts while another one is
+    profiled, e.g. a request of a sampled update, the sample moves to the next call.
+    While a sampled call awaits, other tasks running on the event loop are profiled too:
+    statistics attribute cpu time of the whole loop during the sample.
+
+    Usage::
+
+        PROFILER.enable(sample_every=50)
+        ...
+        print(PROFILER.report("TapoHub", limit=20))
+        PROFILER.dump("profiles")  # a .prof file by key, for snakeviz or pstats
+    """
+
+    def __init__(self):
+        self._sample_every = 0
+        self._profiles: Dict[str, SampledProfile] = {}
+        self._until_next_sample: Dict[str, int] = {}
+        self._active = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._sample_every > 0
+
+    def enable(self, sample_every: int = 100):
+        """
+        @param sample_every: profile one call every `sample_every` calls of each key
+        """
+        if sample_every <= 0:
+            raise ValueError("sample_every must be positive")
+        self._sample_every = sample_every
+
+    def disable(self):
+        self._sample_every = 0
+
+    def sample(self, key: str):
+        """
+        @return: an async context manager profiling its body when the call is sampled
+        """
+        if self._sample_every <= 0:
+            return _DISABLED_SAMPLE
+        self._profiles.setdefault(key, SampledProfile()).calls += 1
+        if (remaining := self._until_next_sample.get(key, 0)) > 0:
+            self._until_next_sample[key] = remaining - 1
+            return _DISABLED_SAMPLE
+        if self._active:
+            return _DISABLED_SAMPLE
+        self._until_next_sample[key] = self._sample_every - 1
+        return _Sample(self, key)
+
+    @property
+    def keys(self) -> List[str]:
+        return sorted(self._profiles)
+
+    def get(self, key: str) -> SampledProfile:
+        return self._profiles.get(key, SampledProfile())
+
+    def report(self, key: str, sort: str = "cumulative", limit: int = 30) -> str:
+        """
+        @return: pstats report of the samples of key, empty when there are none
+        """
+        profile = self.get(key)
+        if profile.stats is None:
+            return ""
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.add(profile.stats).sort_stats(sort).print_stats(limit)
+        return f"{key}: {profile.samples} samples of {profile.calls} calls\n" + (
+            stream.getvalue()
+        )
+
+    def dump(self, directory: str) -> List[str]:
+        """
+        Write the statistics of each key as a `<key>.prof` file, readable with pstats.
+        @return: paths of the written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for key, profile in sorted(self._profiles.items()):
+            if profile.stats is not None:
+                file_name = re.sub(r"[^\w.-]", "_", key)
+                path = os.path.join(directory, f"{file_name}.prof")
+                profile.stats.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def reset(self):
+        self._profiles.clear()
+        self._until_next_sample.clear()
+
+    def _start(self) -> Optional[cProfile.Profile]:
+        if self._active:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # another profiler is already active on this thread
+            _LOGGER.debug(f"Skipping sample: {e}")
+            return None
+        self._active = True
+        return profile
+
+    def _stop(self, key: str, profile: cProfile.Profile):
+        profile.disable()
+        self._active = False
+        sampled = self._profiles.setdefault(key, SampledProfile())
+        sampled.samples += 1
+        if sampled.stats is None:
+            sampled.stats = pstats.Stats(profile)
+        else:
+            sampled.stats.add(profile)
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,430 @@
+import bisect
+import dataclasses
+import logging
+from typing import Dict, Tuple, List, Optional, Callable, Sequence, Any
+
+from aiohttp import web
+
+from plugp100.instrumentation.loop_monitor import LoopMonitor
+from plugp100.instrumentation.request_instrumentation import (
+    RequestEvent,
+    RequestInstrumentation,
+    INSTRUMENTATION,
+    HANDSHAKE,
+)
+from plugp100.new.components.energy_component import EnergyComponent
+from plugp100.new.components.trigger_log_component import TriggerLogComponent
+from plugp100.new.event_polling.poll_tracker import PollTracker
+from plugp100.new.tapodevice import TapoDevice
+
+_LOGGER = logging.getLogger("PrometheusExporter")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+@dataclasses.dataclass
+class _RequestMetrics:
+    bucket_counts: List[int]
+    count: int = 0
+    total: float = 0.0
+    errors: int = 0
+    retries: int = 0
+    handshakes: int = 0
+
+
+class _MetricWriter:
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, labels: Labels, value: float):
+        label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+        self._lines.append(
+            f"{name}{{{label_text}}} {_format_value(value)}"
+            if label_text
+            else f"{name} {_format_value(value)}"
+        )
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+class PrometheusExporter:
+    """
+    Exposes protocol and fleet health in the Prometheus text format: request counts and
+    latency buckets per method and protocol, handshakes, session reuse, retries, per host
+    circuit state, poll lag of registered trackers, event loop lag and tasks of a
+    registered `LoopMonitor`, and the values last reported by registered devices.
+    Device values come from the state already fetched by the application, so scraping
+    never sends requests to devices.
+
+    Usage::
+
+        exporter = PrometheusExporter().attach()
+        exporter.register_device(device)
+        await exporter.start(port=9100)  # serves http://127.0.0.1:9100/metrics
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        failure_threshold: int = 3,
+        logger: logging.Logger = None,
+    ):
+        """
+        @param buckets: upper bounds in seconds of request latency buckets
+        @param failure_threshold: consecutive failed requests after which the circuit of
+        a host is reported open, until a request succeeds
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._failure_threshold = failure_threshold
+        self._logger = logger if logger is not None else _LOGGER
+        self._requests: Dict[Tuple[str, str], _RequestMetrics] = {}
+        self._consecutive_failures: Dict[str, int] = {}
+        self._devices: List[TapoDevice] = []
+        self._poll_trackers: Dict[str, PollTracker] = {}
+        self._loop_monitor: Optional[LoopMonitor] = None
+        self._unsubscribe = None
+        self._runner: Optional[web.AppRunner] = None
+        self.host: Optional[str] = None
+        self.port: Optional[int] = None
+
+    def attach(
+        self, instrumentation: RequestInstrumentation = INSTRUMENTATION
+    ) -> "PrometheusExporter":
+        self.detach()
+        self._unsubscribe = instrumentation.subscribe(self.record)
+        return self
+
+    def detach(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def record(self, event: RequestEvent):
+        key = (event.method, event.protocol)
+        if (metrics := self._requests.get(key, None)) is None:
+            metrics = self._requests[key] = _RequestMetrics([0] * len(self._buckets))
+        index = bisect.bisect_left(self._buckets, event.duration)
+        if index < len(self._buckets):
+            metrics.bucket_counts[index] += 1
+        metrics.count += 1
+        metrics.total += event.duration
+        metrics.retries += event.retries
+        metrics.errors += 0 if event.success else 1
+        metrics.handshakes += 1 if HANDSHAKE in event.phases else 0
+        self._consecutive_failures[event.host] = (
+            0 if event.success else self._consecutive_failures.get(event.host, 0) + 1
+        )
+
+    def register_device(self, device: TapoDevice) -> Callable[[], None]:
+        """
+        Export rssi, signal level, power and energy of the device, hub children included,
+        and the lag of its poll trackers, trigger log trackers of children included.
+
+        @return: the function to unregister the device
+        """
+        self._devices.append(device)
+
+        def _unregister():
+            if device in self._devices:
+                self._devices.remove(device)
+
+        return _unregister
+
+    def register_poll_tracker(
+        self, name: str, tracker: PollTracker
+    ) -> Callable[[], None]:
+        """
+        @param name: value of the `tracker` label
+        @return: the function to unregister the tracker
+        """
+        self._poll_trackers[name] = tracker
+
+        def _unregister():
+            if self._poll_trackers.get(name, None) is tracker:
+                del self._poll_trackers[name]
+
+        return _unregister
+
+    def register_loop_monitor(self, monitor: LoopMonitor):
+        """
+        Export event loop lag, stalls and live tasks by origin measured by the monitor.
+        """
+        self._loop_monitor = monitor
+
+    def render(self) -> str:
+        writer = _MetricWriter()
+        self._render_requests(writer)
+        self._render_circuits(writer)
+        self._render_poll_trackers(writer)
+        self._render_loop(writer)
+        self._render_devices(writer)
+        return writer.text()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 9100
+    ) -> "PrometheusExporter":
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.host, self.port = self._runner.addresses[0][:2]
+        self._logger.debug(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "PrometheusExporter":
+        return await self.start() if self._runner is None else self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    def _render_requests(self, writer: _MetricWriter):
+        requests = sorted(self._requests.items())
+        writer.family(
+            "plugp100_request_duration_seconds",
+            "histogram",
+            "Duration of requests sent to devices, retries included.",
+        )
+        for (method, protocol), metrics in requests:
+            labels = (("method", method), ("protocol", protocol))
+            cumulative = 0
+            for upper_bound, count in zip(self._buckets, metrics.bucket_counts):
+                cumulative += count
+                writer.sample(
+                    "plugp100_request_duration_seconds_bucket",
+                    labels + (("le", _format_value(upper_bound)),),
+                    cumulative,
+                )
+            writer.sample(
+                "plugp100_request_duration_seconds_bucket",
+                labels + (("le", "+Inf"),),
+                metrics.count,
+            )
+            writer.sample("plugp100_request_duration_seconds_sum", labels, metrics.total)
+            writer.sample(
+                "plugp100_request_duration_seconds_count", labels, metrics.count
+            )
+        for name, help_text, field in [
+            ("plugp100_requests_total", "Requests sent to devices.", "count"),
+            ("plugp100_request_errors_total", "Requests that failed.", "errors"),
+            ("plugp100_request_retries_total", "Retries of requests.", "retries"),
+            (
+                "plugp100_handshakes_total",
+                "Requests that needed a handshake.",
+                "handshakes",
+            ),
+        ]:
+            writer.family(name, "counter", help_text)
+            for (method, protocol), metrics in requests:
+                writer.sample(
+                    name,
+                    (("method", method), ("protocol", protocol)),
+                    getattr(metrics, field),
+                )
+        writer.family(
+            "plugp100_session_reuse_ratio",
+            "gauge",
+            "Share of requests sent on an already established session.",
+        )
+        for protocol in sorted({protocol for _, protocol in self._requests}):
+            count = sum(m.count for (_, p), m in requests if p == protocol)
+            handshakes = sum(m.handshakes for (_, p), m in requests if p == protocol)
+            writer.sample(
+                "plugp100_session_reuse_ratio",
+                (("protocol", protocol),),
+                (count - handshakes) / count if count > 0 else 0,
+            )
+
+    def _render_circuits(self, writer: _MetricWriter):
+        failures = sorted(self._consecutive_failures.items())
+        writer.family(
+            "plugp100_host_consecutive_failures",
+            "gauge",
+            "Requests to the host that failed since the last success.",
+        )
+        for host, count in failures:
+            writer.sample("plugp100_host_consecutive_failures", (("host", host),), count)
+        writer.family(
+            "plugp100_host_circuit_open",
+            "gauge",
+            f"1 when the last {self._failure_threshold} requests to the host failed.",
+        )
+        for host, count in failures:
+            writer.sample(
+                "plugp100_host_circuit_open",
+                (("host", host),),
+                1 if count >= self._failure_threshold else 0,
+            )
+
+    def _render_poll_trackers(self, writer: _MetricWriter):
+        trackers = dict(self._poll_trackers)
+        for device in self._devices:
+            for name, tracker in _device_poll_trackers(device):
+                trackers.setdefault(name, tracker)
+        trackers = sorted(trackers.items())
+        for name, metric_type, help_text, value_of in [
+            (
+                "plugp100_poll_lag_seconds",
+                "gauge",
+                "Delay of the last poll over the polling interval.",
+                lambda tracker: tracker.poll_lag,
+            ),
+            (
+                "plugp100_poll_interval_seconds",
+                "gauge",
+                "Polling interval.",
+                lambda tracker: tracker.interval_millis / 1000,
+            ),
+            (
+                "plugp100_polls_total",
+                "counter",
+                "Polls done.",
+                lambda tracker: tracker.polls,
+            ),
+        ]:
+            writer.family(name, metric_type, help_text)
+            for tracker_name, tracker in trackers:
+                writer.sample(name, (("tracker", tracker_name),), value_of(tracker))
+
+    def _render_loop(self, writer: _MetricWriter):
+        if (monitor := self._loop_monitor) is None:
+            return
+        writer.family(
+            "plugp100_event_loop_lag_seconds",
+            "summary",
+            "Delay of the event loop in running a ready task.",
+        )
+        for quantile in [0.5, 0.99]:
+            writer.sample(
+                "plugp100_event_loop_lag_seconds",
+                (("quantile", _format_value(quantile)),),
+                monitor.lag.percentile(quantile * 100) or 0.0,
+            )
+        writer.sample("plugp100_event_loop_lag_seconds_sum", (), monitor.lag.total)
+        writer.sample("plugp100_event_loop_lag_seconds_count", (), monitor.lag.count)
+        writer.family(
+            "plugp100_event_loop_max_lag_seconds", "gauge", "Max event loop lag."
+        )
+        writer.sample("plugp100_event_loop_max_lag_seconds", (), monitor.max_lag)
+        writer.family(
+            "plugp100_event_loop_stalls_total",
+            "counter",
+            "Synchronous steps which blocked the event loop over the threshold.",
+        )
+        writer.sample("plugp100_event_loop_stalls_total", (), monitor.stalls_count)
+        writer.family("plugp100_tasks", "gauge", "Live asyncio tasks by origin.")
+        for origin, count in sorted(monitor.task_census().items()):
+            writer.sample("plugp100_tasks", (("origin", origin),), count)
+
+    def _render_devices(self, writer: _MetricWriter):
+        samples: Dict[str, List[Tuple[Labels, float]]] = {}
+        for device in self._devices:
+            for name, labels, value in _device_samples(device):
+                samples.setdefault(name, []).append((labels, value))
+        for name, help_text in _DEVICE_METRICS:
+            writer.family(name, "gauge", help_text)
+            for labels, value in samples.get(name, []):
+                writer.sample(name, labels, value)
+
+
+_DEVICE_METRICS = [
+    ("plugp100_device_rssi_dbm", "Wifi rssi reported by the device."),
+    ("plugp100_device_signal_level", "Wifi signal level reported by the device."),
+    ("plugp100_device_current_power_watts", "Current power reported by the device."),
+    ("plugp100_device_today_energy_wh", "Energy used today."),
+    ("plugp100_device_month_energy_wh", "Energy used this month."),
+    ("plugp100_device_today_runtime_minutes", "Runtime today."),
+    ("plugp100_device_month_runtime_minutes", "Runtime this month."),
+]
+
+
+def _device_poll_trackers(device: TapoDevice) -> List[Tuple[str, PollTracker]]:
+    trackers = []
+    if device.state_poll_tracker is not None:
+        trackers.append((f"{device.host}/state", device.state_poll_tracker))
+    if (association := getattr(device, "association_poll_tracker", None)) is not None:
+        trackers.append((f"{device.host}/association", association))
+    if (event_logs := getattr(device, "event_logs_poll_tracker", None)) is not None:
+        trackers.append((f"{device.host}/event_logs", event_logs))
+    for child in [device, *(getattr(device, "children", None) or [])]:
+        trigger_log = child.get_component(TriggerLogComponent)
+        if trigger_log is not None and trigger_log.poll_tracker is not None:
+            trackers.append(
+                (
+                    f"{device.host}/{trigger_log.device_id}/trigger_logs",
+                    trigger_log.poll_tracker,
+                )
+            )
+    return trackers
+
+
+def _device_samples(device: TapoDevice) -> List[Tuple[str, Labels, float]]:
+    try:
+        info = device.device_info
+    except AttributeError:
+        # devices not updated yet have no state to report
+        return []
+    labels = (
+        ("host", device.host),
+        ("device_id", info.device_id),
+        ("model", info.model),
+    )
+    values: List[Tuple[str, Any]] = [
+        ("plugp100_device_rssi_dbm", info.rssi),
+        ("plugp100_device_signal_level", info.signal_level),
+    ]
+    if (energy := device.get_component(EnergyComponent)) is not None:
+        if energy.power_info is not None:
+            values.append(
+                ("plugp100_device_current_power_watts", energy.power_info.current_power)
+            )
+        if energy.energy_info is not None:
+            values += [
+                ("plugp100_device_today_energy_wh", energy.energy_info.today_energy),
+                ("plugp100_device_month_energy_wh", energy.energy_info.month_energy),
+                (
+                    "plugp100_device_today_runtime_minutes",
+                    energy.energy_info.today_runtime,
+                ),
+                (
+                    "plugp100_device_month_runtime_minutes",
+                    energy.energy_info.month_runtime,
+                ),
+            ]
+    # values not reported by the device are skipped
+    samples = [(name, labels, value) for name, value in values if value is not None]
+    for child in getattr(device, "children", None) or []:
+        samples += _device_samples(child)
+    return samples
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
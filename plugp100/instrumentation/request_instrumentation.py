@@ -0,0 +1,146 @@
+import dataclasses
+import logging
+import time
+from typing import Callable, Dict, Optional, Any, List
+
+from plugp100.common.functional.tri import Try
+
+_LOGGER = logging.getLogger("RequestInstrumentation")
+
+QUEUE_WAIT = "queue_wait"
+HANDSHAKE = "handshake"
+ENCRYPT = "encrypt"
+HTTP = "http"
+DECRYPT = "decrypt"
+PARSE = "parse"
+
+
+@dataclasses.dataclass
+class RequestEvent:
+    """
+    A request sent to a device. Phases are in seconds: queue_wait, handshake,
+    encrypt (serialization included), http, decrypt and parse; a phase is missing
+    when it didn't happen, e.g. handshake when the session is reused.
+    """
+
+    host: str
+    method: str
+    protocol: str
+    duration: float
+    phases: Dict[str, float]
+    retries: int
+    success: bool
+    error: Optional[Exception] = None
+
+    @property
+    def error_code(self) -> Optional[int]:
+        return getattr(self.error, "error_code", None)
+
+
+RequestListener = Callable[[RequestEvent], Any]
+
+
+class RequestTimer:
+    """
+    Times the phases of a single request. Each call to `phase` assigns the time elapsed
+    since the previous call to the given phase.
+    """
+
+    def __init__(
+        self,
+        instrumentation: "RequestInstrumentation",
+        host: str,
+        method: str,
+        protocol: str,
+    ):
+        self._instrumentation = instrumentation
+        self._host = host
+        self._method = method
+        self._protocol = protocol
+        self._start = self._last = time.perf_counter()
+        self._phases: Dict[str, float] = {}
+        self._retries = 0
+
+    def phase(self, name: str):
+        now = time.perf_counter()
+        self._phases[name] = self._phases.get(name, 0) + now - self._last
+        self._last = now
+
+    def retry(self):
+        self._retries += 1
+        self._last = time.perf_counter()
+
+    def finish(self, response: Optional[Try[Any]]) -> Optional[Try[Any]]:
+        success = response is not None and response.is_success()
+        self._instrumentation.emit(
+            RequestEvent(
+                host=self._host,
+                method=self._method,
+                protocol=self._protocol,
+                duration=time.perf_counter() - self._start,
+                phases=self._phases,
+                retries=self._retries,
+                success=success,
+                error=response.error() if response is not None and not success else None,
+            )
+        )
+        return response
+
+
+class _DisabledRequestTimer(RequestTimer):
+    def __init__(self):
+        pass
+
+    def phase(self, name: str):
+        pass
+
+    def retry(self):
+        pass
+
+    def finish(self, response: Optional[Try[Any]]) -> Optional[Try[Any]]:
+        return response
+
+
+DISABLED_TIMER = _DisabledRequestTimer()
+
+
+class RequestInstrumentation:
+    """
+    Registry of listeners of requests sent by protocols. When there are no listeners,
+    requests are not timed at all and a shared no-op timer is used.
+
+    Usage::
+
+        unsubscribe = INSTRUMENTATION.subscribe(lambda event: print(event))
+    """
+
+    def __init__(self):
+        self._listeners: List[RequestListener] = []
+
+    @property
+    def enabled(self) -> bool:
+        return len(self._listeners) > 0
+
+    def subscribe(self, listener: RequestListener) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        def _unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _unsubscribe
+
+    def start_request(self, host: str, method: str, protocol: str) -> RequestTimer:
+        if not self._listeners:
+            return DISABLED_TIMER
+        return RequestTimer(self, host, method, protocol)
+
+    def emit(self, event: RequestEvent):
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                _LOGGER.warning(f"Request listener failed: {e}")
+
+
+INSTRUMENTATION = RequestInstrumentation()
@@ -0,0 +1,7 @@
+from .load_generator import LoadGenerator, LoadProfile, LoadReport
+
+__all__ = [
+    "LoadGenerator",
+    "LoadProfile",
+    "LoadReport",
+]
@@ -0,0 +1,75 @@
+"""
+Soak test the library against emulated devices.
+
+Usage::
+
+    python -m plugp100.loadgen --devices 500 --duration 300 --poll-rate 200
+    python -m plugp100.loadgen --fixture tests/fixtures/h100.json --error-rate 0.05
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+from typing import Optional, List
+
+from plugp100.loadgen.load_generator import LoadGenerator, LoadProfile
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="plugp100 load generator")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--poll-rate", type=float, default=50, help="updates/s")
+    parser.add_argument("--command-rate", type=float, default=5, help="commands/s")
+    parser.add_argument(
+        "--subscribed", type=float, default=0.2, help="share of subscribed devices"
+    )
+    parser.add_argument("--subscription-interval", type=int, default=5000, help="ms")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--latency", type=float, default=0, help="device latency ms")
+    parser.add_argument("--jitter", type=float, default=0, help="device jitter ms")
+    parser.add_argument("--encryption", default="klap", choices=["klap", "aes"])
+    parser.add_argument("--report-interval", type=float, default=5, help="seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--fixture", help="json fixture of emulated devices")
+    parser.add_argument("--output", help="write reports as json")
+    options = parser.parse_args(args)
+    # failures injected by emulated devices are expected, and counted as errors
+    logging.basicConfig(level=logging.ERROR)
+
+    fixture = None
+    if options.fixture:
+        with open(options.fixture) as f:
+            fixture = json.load(f)
+    profile = LoadProfile(
+        devices=options.devices,
+        duration_seconds=options.duration,
+        poll_rate=options.poll_rate,
+        command_rate=options.command_rate,
+        subscribed_fraction=options.subscribed,
+        subscription_interval_millis=options.subscription_interval,
+        error_rate=options.error_rate,
+        latency_millis=options.latency,
+        jitter_millis=options.jitter,
+        encryption_type=options.encryption,
+        report_interval_seconds=options.report_interval,
+        max_in_flight=options.max_in_flight,
+        seed=options.seed,
+    )
+    reports = asyncio.run(LoadGenerator(profile, fixture, on_report=print).run())
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(
+                {
+                    "profile": dataclasses.asdict(profile),
+                    "reports": [dataclasses.asdict(report) for report in reports],
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import asyncio
+import dataclasses
+import logging
+import os
+import random
+import sys
+import time
+from typing import Optional, List, Callable, Any, Set, Dict
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.utils.json_utils import Json
+from plugp100.emulator import (
+    DeviceEmulator,
+    EmulatorFaults,
+    start_emulators,
+    stop_emulators,
+)
+from plugp100.instrumentation import LatencyHistogram, LoopMonitor
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapodevice import TapoDevice
+
+_LOGGER = logging.getLogger("LoadGenerator")
+
+CREDENTIALS = AuthCredential("loadgen@example.com", "loadgen")
+
+# a plug, used when no fixture is given
+DEFAULT_FIXTURE: Json = {
+    "component_nego": {
+        "component_list": [
+            {"id": "device", "ver_code": 2},
+            {"id": "on_off", "ver_code": 1},
+        ]
+    },
+    "get_device_info": {
+        "device_id": "80224632A3133FF55700884796D0C0401FA93225",
+        "fw_ver": "1.2.1 Build 230804 Rel.190922",
+        "hw_ver": "2.0",
+        "type": "SMART.TAPOPLUG",
+        "model": "P100",
+        "mac": "54-AF-97-61-3A-3B",
+        "hw_id": "4012E37933F469A8790D690E12080BB6",
+        "oem_id": "525FC9C0545B4C8BEF51FA66130E51DE",
+        "rssi": -15,
+        "signal_level": 3,
+        "nickname": "TG9hZCBQbHVn",
+        "device_on": False,
+        "overheated": False,
+    },
+}
+
+
+@dataclasses.dataclass
+class LoadProfile:
+    """
+    Load to generate against emulated devices.
+
+    @param poll_rate: device updates per second, over the whole fleet
+    @param command_rate: turn on/off commands per second, over the whole fleet
+    @param subscribed_fraction: share of devices subscribed to state changes
+    @param error_rate: probability of a device answering a request with an error
+    @param max_in_flight: operations running at the same time, further ones are dropped
+    """
+
+    devices: int = 10
+    duration_seconds: float = 30
+    poll_rate: float = 50
+    command_rate: float = 5
+    subscribed_fraction: float = 0.2
+    subscription_interval_millis: int = 5000
+    error_rate: float = 0
+    latency_millis: float = 0
+    jitter_millis: float = 0
+    encryption_type: str = "klap"
+    report_interval_seconds: float = 5
+    max_in_flight: int = 256
+    seed: Optional[int] = None
+
+
+@dataclasses.dataclass
+class LoadReport:
+    """Measures of a report interval; latencies are the ones of polls and commands."""
+
+    elapsed_seconds: float
+    operations: int
+    errors: int
+    dropped: int
+    throughput: float
+    p50_ms: Optional[float]
+    p99_ms: Optional[float]
+    max_loop_lag_ms: float
+    loop_stalls: int
+    max_poll_lag_ms: float
+    state_changes: int
+    tasks: Dict[str, int]
+    rss_bytes: int
+
+    def __str__(self):
+        return (
+            f"{self.elapsed_seconds:7.1f}s {self.throughput:9.1f} op/s  "
+            f"p50 {_millis(self.p50_ms)}  p99 {_millis(self.p99_ms)}  "
+            f"errors {self.errors:5}  dropped {self.dropped:5}  "
+            f"loop lag {self.max_loop_lag_ms:7.1f} ms  "
+            f"poll lag {self.max_poll_lag_ms:7.1f} ms  "
+            f"tasks {sum(self.tasks.values()):6}  "
+            f"rss {self.rss_bytes / 2**20:7.1f} MiB"
+        )
+
+
+class _IntervalMeasures:
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.errors = 0
+        self.dropped = 0
+        self.state_changes = 0
+
+
+class LoadGenerator:
+    """
+    Drive the library against a fleet of emulated devices, with a mix of polls,
+    commands and state subscriptions, while devices inject latency and errors.
+    Polls and commands are scheduled at fixed rates whatever the time they take, so
+    a saturated library shows up as growing latency, dropped operations and loop lag.
+
+    Usage::
+
+        reports = await LoadGenerator(LoadProfile(devices=100)).run()
+    """
+
+    def __init__(
+        self,
+        profile: LoadProfile,
+        fixture: Optional[Json] = None,
+        on_report: Optional[Callable[[LoadReport], Any]] = None,
+    ):
+        self._profile = profile
+        self._fixture = fixture if fixture is not None else DEFAULT_FIXTURE
+        self._on_report = on_report
+        self._random = random.Random(profile.seed)
+        self._measures = _IntervalMeasures()
+        self._operations: Set[asyncio.Task] = set()
+        self._devices: List[TapoDevice] = []
+
+    async def run(self) -> List[LoadReport]:
+        profile = self._profile
+        faults = EmulatorFaults(
+            latency_seconds=profile.latency_millis / 1000,
+            latency_jitter_seconds=profile.jitter_millis / 1000,
+            error_rate=profile.error_rate,
+        )
+        emulators = await start_emulators(
+            self._fixture,
+            CREDENTIALS,
+            profile.devices,
+            encryption_type=profile.encryption_type,
+            faults=faults,
+            seed=profile.seed,
+        )
+        unsubscribes = []
+        tasks = []
+        monitor = LoopMonitor(interval_seconds=0.05)
+        try:
+            self._devices = await self._connect_all(emulators)
+            subscribed = self._random.sample(
+                self._devices, round(len(self._devices) * profile.subscribed_fraction)
+            )
+            unsubscribes = [
+                device.subscribe_state_changes(
+                    self._on_state_change, profile.subscription_interval_millis
+                )
+                for device in subscribed
+            ]
+            commandable = [d for d in self._devices if hasattr(d, "turn_on")]
+            monitor.start()
+            if profile.poll_rate > 0 and self._devices:
+                tasks.append(
+                    asyncio.create_task(
+                        self._drive(profile.poll_rate, self._devices, _poll)
+                    )
+                )
+            if profile.command_rate > 0 and commandable:
+                tasks.append(
+                    asyncio.create_task(
+                        self._drive(profile.command_rate, commandable, self._command)
+                    )
+                )
+            return await self._report(subscribed, monitor)
+        finally:
+            await monitor.stop()
+            tasks += self._operations
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for unsubscribe in unsubscribes:
+                unsubscribe()
+            await asyncio.gather(
+                *[device.client.close() for device in self._devices],
+                return_exceptions=True,
+            )
+            await stop_emulators(emulators)
+
+    async def _connect_all(self, emulators: List[DeviceEmulator]) -> List[TapoDevice]:
+        semaphore = asyncio.Semaphore(self._profile.max_in_flight)
+        device_type = self._fixture.get("get_device_info", {}).get("type")
+
+        async def _connect(emulator: DeviceEmulator) -> TapoDevice:
+            async with semaphore:
+                device = await connect(
+                    DeviceConnectConfiguration(
+                        emulator.host,
+                        emulator.port,
+                        CREDENTIALS,
+                        device_type=device_type,
+                        encryption_type=emulator.encryption_type,
+                        encryption_version=emulator.encryption_version,
+                    )
+                )
+                # the first update negotiates components, retried on injected errors
+                for attempt in range(10):
+                    try:
+                        await device.update()
+                        break
+                    except Exception as e:
+                        if attempt == 9:
+                            raise e
+                return device
+
+        return list(await asyncio.gather(*[_connect(e) for e in emulators]))
+
+    async def _drive(
+        self,
+        rate: float,
+        devices: List[TapoDevice],
+        operation: Callable[[TapoDevice], Any],
+    ):
+        interval = 1 / rate
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            if len(self._operations) >= self._profile.max_in_flight:
+                self._measures.dropped += 1
+            else:
+                task = asyncio.create_task(
+                    self._timed(operation, self._random.choice(devices))
+                )
+                self._operations.add(task)
+                task.add_done_callback(self._operations.discard)
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    async def _timed(self, operation: Callable[[TapoDevice], Any], device: TapoDevice):
+        measures = self._measures
+        started_at = time.perf_counter()
+        try:
+            await operation(device)
+            measures.latencies.record(time.perf_counter() - started_at)
+        except Exception as e:
+            _LOGGER.debug(f"Operation on {device.host} failed: {e}")
+            measures.errors += 1
+
+    async def _command(self, device: TapoDevice):
+        if self._random.random() < 0.5:
+            await device.turn_on()
+        else:
+            await device.turn_off()
+
+    def _on_state_change(self, _):
+        self._measures.state_changes += 1
+
+    async def _report(
+        self, subscribed: List[TapoDevice], monitor: LoopMonitor
+    ) -> List[LoadReport]:
+        profile = self._profile
+        reports = []
+        started_at = last_report_at = time.monotonic()
+        while (elapsed := time.monotonic() - started_at) < profile.duration_seconds:
+            await asyncio.sleep(
+                min(profile.report_interval_seconds, profile.duration_seconds - elapsed)
+            )
+            now = time.monotonic()
+            measures, self._measures = self._measures, _IntervalMeasures()
+            report = LoadReport(
+                elapsed_seconds=now - started_at,
+                operations=measures.latencies.count + measures.errors,
+                errors=measures.errors,
+                dropped=measures.dropped,
+                throughput=measures.latencies.count / (now - last_report_at),
+                p50_ms=_to_millis(measures.latencies.percentile(50)),
+                p99_ms=_to_millis(measures.latencies.percentile(99)),
+                max_loop_lag_ms=monitor.max_lag * 1000,
+                loop_stalls=monitor.stalls_count,
+                max_poll_lag_ms=max(
+                    [
+                        device.state_poll_tracker.poll_lag * 1000
+                        for device in subscribed
+                        if device.state_poll_tracker is not None
+                    ],
+                    default=0.0,
+                ),
+                state_changes=measures.state_changes,
+                tasks=monitor.task_census(),
+                rss_bytes=rss_bytes(),
+            )
+            monitor.reset()
+            last_report_at = now
+            reports.append(report)
+            if self._on_report is not None:
+                self._on_report(report)
+        return reports
+
+
+async def _poll(device: TapoDevice):
+    await device.update()
+
+
+def rss_bytes() -> int:
+    """
+    @return: resident memory of the process, the peak one where the current is unknown
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on macOS
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _to_millis(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
+
+
+def _millis(value: Optional[float]) -> str:
+    return f"{value:8.2f} ms" if value is not None else "       - ms"
@@ -3,7 +3,6 @@ from typing import Optional, Any, Callable
 
 from plugp100.api.requests.set_device_info.set_trv_info_params import TRVDeviceInfoParams
 from plugp100.api.requests.tapo_request import TapoRequest
-from plugp100.api.requests.trigger_logs_params import GetTriggerLogsParams
 from plugp100.api.tapo_client import TapoClient
 from plugp100.common.functional.tri import Try
 from plugp100.common.utils.json_utils import dataclass_encode_json
@@ -20,22 +19,24 @@ from plugp100.new.components.temperature_humidity_records import (
 from plugp100.new.components.trigger_log_component import TriggerLogComponent
 from plugp100.new.components.water_leak_component import WaterLeakComponent
 from plugp100.new.device_type import DeviceType
+from plugp100.new.event_polling.change_stream import ChangeStream
 from plugp100.new.event_polling.event_subscription import (
     EventSubscriptionOptions,
-    EventLogsStateTracker,
+    EventLogsChange,
 )
-from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
+from plugp100.new.event_polling.poll_tracker import PollSubscription
 from plugp100.new.tapodevice import TapoDevice, C
 from plugp100.responses.components import Components
 from plugp100.responses.hub_childs.ke100_device_state import KE100DeviceState, TRVState
 from plugp100.responses.hub_childs.s200b_device_state import (
     S200BEvent,
+    parse_s200b_event,
 )
 from plugp100.responses.hub_childs.t100_device_state import (
     T100Event,
     parse_t100_event,
 )
-from plugp100.responses.hub_childs.t110_device_state import T110Event
+from plugp100.responses.hub_childs.t110_device_state import T110Event, parse_t110_event
 from plugp100.responses.hub_childs.t31x_device_state import (
     TemperatureHumidityRecordsRaw,
 )
@@ -44,6 +45,8 @@ from plugp100.responses.temperature_unit import TemperatureUnit
 
 
 class TapoHubChildDevice(TapoDevice):
+    __slots__ = ("_parent_device_id",)
+
     def __init__(
         self,
         host: str,
@@ -76,6 +79,8 @@ class TapoHubChildDevice(TapoDevice):
 
 
 class KE100Device(TapoHubChildDevice):
+    __slots__ = ("_last_state",)
+
     def __init__(
         self,
         host: str,
@@ -175,7 +180,7 @@ TriggerLogsSubscription = Callable[[], Any]
 
 
 class TriggerButtonDevice(TapoHubChildDevice):
-    _DEFAULT_POLLING_PAGE_SIZE = 5
+    __slots__ = ("_logger",)
 
     def __init__(
         self,
@@ -188,12 +193,15 @@ class TriggerButtonDevice(TapoHubChildDevice):
     ):
         super().__init__(host, port, client, child_id, parent_device_id, device_type)
         self._logger = logging.getLogger(f"ButtonDevice[${child_id}]")
-        self._poll_tracker: Optional[PollTracker] = None
 
     def _get_components_to_activate(self, components: Components) -> list[C]:
         active_components = []
         if components.has("trigger_log"):
-            active_components.append(TriggerLogComponent(self.client, self._child_id))
+            active_components.append(
+                TriggerLogComponent(
+                    self.client, self._child_id, parse_s200b_event, self._logger
+                )
+            )
         return super()._get_components_to_activate(components) + active_components
 
     async def get_event_logs(
@@ -213,28 +221,29 @@ class TriggerButtonDevice(TapoHubChildDevice):
 
     def subscribe_event_logs(
         self,
-        callback: Callable[[S200BEvent], Any],
+        callback: Callable[[EventLogsChange[S200BEvent]], Any],
         event_subscription_options: EventSubscriptionOptions,
     ) -> PollSubscription:
-        if self._poll_tracker is None:
-            self._poll_tracker = PollTracker(
-                state_provider=self._poll_event_logs,
-                state_tracker=EventLogsStateTracker(
-                    event_subscription_options.debounce_millis, logger=self._logger
-                ),
-                interval_millis=event_subscription_options.polling_interval_millis,
-                logger=self._logger,
-            )
-        return self._poll_tracker.subscribe(callback)
+        return self.get_component(TriggerLogComponent).subscribe(
+            callback, event_subscription_options
+        )
 
-    async def _poll_event_logs(
-        self, last_state: Optional[TriggerLogResponse[S200BEvent]]
-    ):
-        response = await self.get_event_logs(self._DEFAULT_POLLING_PAGE_SIZE, 0)
-        return response.get_or_else(TriggerLogResponse(0, 0, []))
+    def events(
+        self,
+        event_subscription_options: EventSubscriptionOptions,
+        max_buffer_size: int = 100,
+    ) -> ChangeStream[EventLogsChange[S200BEvent]]:
+        """
+        Stream new trigger log events, polling stops when the stream is closed.
+        """
+        return self.get_component(TriggerLogComponent).stream(
+            event_subscription_options, max_buffer_size
+        )
 
 
 class SwitchChildDevice(TapoHubChildDevice):
+    __slots__ = ()
+
     def __init__(
         self,
         host: str,
@@ -263,6 +272,8 @@ class SwitchChildDevice(TapoHubChildDevice):
 
 
 class MotionSensor(TapoHubChildDevice):
+    __slots__ = ("_logger",)
+
     def __init__(
         self,
         host: str,
@@ -273,20 +284,46 @@ class MotionSensor(TapoHubChildDevice):
         device_type: DeviceType = DeviceType.Sensor,
     ):
         super().__init__(host, port, client, child_id, parent_device_id, device_type)
+        self._logger = logging.getLogger(f"MotionSensor[${child_id}]")
 
     def _get_components_to_activate(self, components: Components) -> list[C]:
-        return super()._get_components_to_activate(components) + [MotionSensorComponent()]
+        active_components = [MotionSensorComponent()]
+        if components.has("trigger_log"):
+            active_components.append(
+                TriggerLogComponent(
+                    self.client, self._child_id, parse_t100_event, self._logger
+                )
+            )
+        return super()._get_components_to_activate(components) + active_components
 
     async def get_event_logs(
         self,
         page_size: int,
         start_id: int = 0,
     ) -> Try[TriggerLogResponse[T100Event]]:
-        request = TapoRequest.get_child_event_logs(
-            GetTriggerLogsParams(page_size, start_id)
+        return await self.get_component(TriggerLogComponent).get_event_logs(
+            page_size, start_id
         )
-        return (await self.client.control_child(self._device_id, request)).flat_map(
-            lambda x: TriggerLogResponse[T100Event].try_from_json(x, parse_t100_event)
+
+    def subscribe_event_logs(
+        self,
+        callback: Callable[[EventLogsChange[T100Event]], Any],
+        event_subscription_options: EventSubscriptionOptions,
+    ) -> PollSubscription:
+        return self.get_component(TriggerLogComponent).subscribe(
+            callback, event_subscription_options
+        )
+
+    def events(
+        self,
+        event_subscription_options: EventSubscriptionOptions,
+        max_buffer_size: int = 100,
+    ) -> ChangeStream[EventLogsChange[T100Event]]:
+        """
+        Stream new trigger log events, polling stops when the stream is closed.
+        """
+        return self.get_component(TriggerLogComponent).stream(
+            event_subscription_options, max_buffer_size
         )
 
     @property
@@ -295,6 +332,8 @@ class MotionSensor(TapoHubChildDevice):
 
 
 class SmartDoorSensor(TapoHubChildDevice):
+    __slots__ = ("_logger",)
+
     def __init__(
         self,
         host: str,
@@ -305,25 +344,52 @@ class SmartDoorSensor(TapoHubChildDevice):
         device_type: DeviceType = DeviceType.Sensor,
     ):
         super().__init__(host, port, client, child_id, parent_device_id, device_type)
+        self._logger = logging.getLogger(f"SmartDoorSensor[${child_id}]")
 
     def _get_components_to_activate(self, components: Components) -> list[C]:
-        return super()._get_components_to_activate(components) + [SmartDoorComponent()]
+        active_components = [SmartDoorComponent()]
+        if components.has("trigger_log"):
+            active_components.append(
+                TriggerLogComponent(
+                    self.client, self._child_id, parse_t110_event, self._logger
+                )
+            )
+        return super()._get_components_to_activate(components) + active_components
 
     async def get_event_logs(
         self,
         page_size: int,
         start_id: int = 0,
     ) -> Try[TriggerLogResponse[T110Event]]:
-        request = TapoRequest.get_child_event_logs(
-            GetTriggerLogsParams(page_size, start_id)
+        return await self.get_component(TriggerLogComponent).get_event_logs(
+            page_size, start_id
         )
-        response = await self.client.control_child(self._device_id, request)
-        return response.flat_map(
-            lambda x: TriggerLogResponse[T110Event].try_from_json(x, parse_t100_event)
+
+    def subscribe_event_logs(
+        self,
+        callback: Callable[[EventLogsChange[T110Event]], Any],
+        event_subscription_options: EventSubscriptionOptions,
+    ) -> PollSubscription:
+        return self.get_component(TriggerLogComponent).subscribe(
+            callback, event_subscription_options
+        )
+
+    def events(
+        self,
+        event_subscription_options: EventSubscriptionOptions,
+        max_buffer_size: int = 100,
+    ) -> ChangeStream[EventLogsChange[T110Event]]:
+        """
+        Stream new trigger log events, polling stops when the stream is closed.
+        """
+        return self.get_component(TriggerLogComponent).stream(
+            event_subscription_options, max_buffer_size
         )
 
 
 class TemperatureHumiditySensor(TapoHubChildDevice):
+    __slots__ = ()
+
     def __init__(
         self,
         host: str,
@@ -376,6 +442,8 @@ class TemperatureHumiditySensor(TapoHubChildDevice):
 
 
 class WaterLeakSensor(TapoHubChildDevice):
+    __slots__ = ()
+
     def __init__(
         self,
         host: str,
@@ -9,6 +9,8 @@ from plugp100.responses.device_state import DeviceInfo
 
 
 class TapoStripSocket(TapoDevice):
+    __slots__ = ("_parent_info",)
+
     def __init__(
         self,
         host: str,
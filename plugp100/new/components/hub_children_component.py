@@ -37,6 +37,7 @@ class HubChildrenComponent(DeviceComponent):
             for child in children.get_children_base_info():
                 child_device = _hub_child_create(self._parent_device, self._client, child)
                 if child_device is not None:
+                    child_device.keep_raw_state = self._parent_device.keep_raw_state
                     self._children.append(child_device)
                 else:
                     _LOGGER.warning(
@@ -32,5 +32,6 @@ class SocketChildrenComponent(DeviceComponent):
                     parent_device=self._parent_device.device_info,
                     child_id=socket.device_id,
                 )
+                socket_device.keep_raw_state = self._parent_device.keep_raw_state
                 self._children_socket.append(socket_device)
                 await socket_device.update()
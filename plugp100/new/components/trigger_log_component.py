@@ -1,28 +1,68 @@
-from typing import Any
+import logging
+from typing import Any, Callable, Generic, TypeVar, Optional
 
 from plugp100.api.requests.tapo_request import TapoRequest
 from plugp100.api.requests.trigger_logs_params import GetTriggerLogsParams
 from plugp100.api.tapo_client import TapoClient
 from plugp100.common.functional.tri import Try
 from plugp100.new.components.device_component import DeviceComponent
-from plugp100.responses.hub_childs.s200b_device_state import S200BEvent, parse_s200b_event
+from plugp100.new.event_polling.change_stream import ChangeStream
+from plugp100.new.event_polling.event_logs_cursor import (
+    EventLogsBatch,
+    fetch_event_logs_since,
+)
+from plugp100.new.event_polling.event_subscription import (
+    EventSubscriptionOptions,
+    EventLogsStateTracker,
+    EventLogsChange,
+    EventLogsDispatcher,
+    restore_last_event_id,
+)
+from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
+from plugp100.responses.hub_childs.s200b_device_state import parse_s200b_event
 from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
 
+T = TypeVar("T")
 
-# TODO: actually is too specific for s200b events. Generalize it
-class TriggerLogComponent(DeviceComponent):
+
+class TriggerLogComponent(DeviceComponent, Generic[T]):
     async def update(self, current_state: dict[str, Any] | None = None):
         pass
 
-    def __init__(self, client: TapoClient, device_id: str | None = None):
+    def __init__(
+        self,
+        client: TapoClient,
+        device_id: str | None = None,
+        parse_log_item: Callable[[dict[str, Any]], T] = parse_s200b_event,
+        logger: logging.Logger = None,
+    ):
         self._client = client
         self._device_id = device_id
+        self._parse_log_item = parse_log_item
+        self._logger = logger
+        self._poll_tracker: Optional[PollTracker] = None
+        self._tracker_subscription: Optional[PollSubscription] = None
+        self._dispatcher: Optional[EventLogsDispatcher] = None
+
+    @property
+    def device_id(self) -> str | None:
+        return self._device_id
+
+    @property
+    def poll_tracker(self) -> Optional[PollTracker]:
+        """
+        @return: tracker polling the logs of this component, None until first subscription
+        """
+        return self._poll_tracker
+
+    def parse_event_logs(self, json: dict[str, Any]) -> Try[TriggerLogResponse[T]]:
+        return TriggerLogResponse[T].try_from_json(json, self._parse_log_item)
 
     async def get_event_logs(
         self,
         page_size: int,
         start_id: int = 0,
-    ) -> Try[TriggerLogResponse[S200BEvent]]:
+    ) -> Try[TriggerLogResponse[T]]:
         """
         Use start_id = 0 to get latest page_size events
         @param page_size: the number of max event returned
@@ -33,5 +73,84 @@ class TriggerLogComponent(DeviceComponent):
             GetTriggerLogsParams(page_size, start_id)
         )
         return (await self._client.control_child(self._device_id, request)).flat_map(
-            lambda x: TriggerLogResponse[S200BEvent].try_from_json(x, parse_s200b_event)
+            self.parse_event_logs
+        )
+
+    async def get_event_logs_since(
+        self,
+        last_event_id: Optional[int],
+        page_size: int = 10,
+        max_pages: int = 5,
+    ) -> Try[EventLogsBatch[T]]:
+        """
+        Get all events newer than last_event_id, paging over older events when needed.
+        Use last_event_id = None to only fetch the current cursor.
+        @param last_event_id: id of the last processed event
+        @param page_size: the number of max event returned by each page
+        @param max_pages: max number of pages requested
+        @return: New events with updated cursor or Error
+        """
+        return await fetch_event_logs_since(
+            self.get_event_logs, last_event_id, page_size, max_pages
+        )
+
+    def subscribe(
+        self,
+        callback: Callable[[EventLogsChange], Any],
+        event_subscription_options: EventSubscriptionOptions,
+    ) -> PollSubscription:
+        """
+        Subscribe to new trigger log events. Besides events, callback receives an
+        `EventLogsGap` when some events were lost, see `EventSubscriptionOptions`.
+        Polling options are taken from the first subscription.
+        @return: The function to unsubscribe.
+        """
+        if self._poll_tracker is None:
+            self._dispatcher = EventLogsDispatcher(
+                self._device_id, event_subscription_options, self._logger
+            )
+            self._poll_tracker = PollTracker(
+                state_provider=self._poll_event_logs,
+                state_tracker=EventLogsStateTracker(logger=self._logger),
+                interval_millis=event_subscription_options.polling_interval_millis,
+                logger=self._logger,
+            )
+        self._dispatcher.callbacks.append(callback)
+        if self._tracker_subscription is None:
+            self._tracker_subscription = self._poll_tracker.subscribe(
+                self._dispatcher.dispatch
+            )
+
+        def unsubscribe():
+            if callback in self._dispatcher.callbacks:
+                self._dispatcher.callbacks.remove(callback)
+            if len(self._dispatcher.callbacks) == 0 and self._tracker_subscription:
+                self._tracker_subscription()
+                self._tracker_subscription = None
+
+        return unsubscribe
+
+    def stream(
+        self,
+        event_subscription_options: EventSubscriptionOptions,
+        max_buffer_size: int = 100,
+    ) -> ChangeStream[EventLogsChange]:
+        return ChangeStream(
+            lambda callback: self.subscribe(callback, event_subscription_options),
+            max_buffer_size,
+            self._logger,
+            pause=lambda: self._poll_tracker.pause(),
+        )
+
+    async def _poll_event_logs(
+        self, last_state: Optional[EventLogsBatch[T]]
+    ) -> Optional[EventLogsBatch[T]]:
+        options = self._dispatcher.options
+        response = await self.get_event_logs_since(
+            await restore_last_event_id(
+                self._device_id, last_state, options, self._logger
+            ),
+            options.page_size,
+            options.max_pages,
         )
+        return response.get_or_else(None)
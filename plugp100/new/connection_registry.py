@@ -0,0 +1,156 @@
+import asyncio
+import dataclasses
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+import aiohttp
+
+from plugp100.common.utils.json_file import JsonFile
+from plugp100.new.device_factory import DeviceConnectConfiguration, connect
+from plugp100.new.tapobulb import TapoBulb
+from plugp100.new.tapodevice import TapoDevice
+from plugp100.new.tapohub import TapoHub
+from plugp100.new.tapoplug import TapoPlug
+from plugp100.protocol.klap.klap_protocol import KlapProtocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.protocol.tapo_protocol import TapoProtocol
+from plugp100.protocol.traffic_capture import RecordingProtocol
+
+_LOGGER = logging.getLogger("ConnectionRegistry")
+
+_DEVICE_CLASS_TYPES = {
+    TapoPlug: "SMART.TAPOPLUG",
+    TapoBulb: "SMART.TAPOBULB",
+    TapoHub: "SMART.TAPOHUB",
+}
+
+# errors meaning the device was not reached, so the recorded configuration is kept
+_UNREACHABLE_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError, OSError)
+
+
+class ConnectionRegistry:
+    """
+    Record the effective configuration of connected devices, with the negotiated protocol
+    and device type, so they can be connected on restart without discovery and protocol
+    probing. When a path is given the records are persisted into a json file.
+    Credentials are never recorded.
+
+    Usage::
+
+        registry = ConnectionRegistry("connections.json")
+        device = await registry.connect(DeviceConnectConfiguration(host, credentials=credentials))
+    """
+
+    def __init__(self, path: Optional[str] = None, logger: logging.Logger = None):
+        self._records: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = asyncio.Lock()
+        self._logger = logger if logger is not None else _LOGGER
+        self._file = JsonFile(path, self._logger) if path is not None else None
+
+    async def get(self, host: str) -> Optional[DeviceConnectConfiguration]:
+        record = (await self._load()).get(host, None)
+        if record is None:
+            return None
+        return DeviceConnectConfiguration(
+            **{
+                field.name: record.get(field.name, None)
+                for field in dataclasses.fields(DeviceConnectConfiguration)
+                if field.name != "credentials"
+            }
+        )
+
+    async def get_device_class(self, host: str) -> Optional[str]:
+        record = (await self._load()).get(host, None)
+        return record.get("device_class", None) if record is not None else None
+
+    async def record(self, device: TapoDevice, config: DeviceConnectConfiguration):
+        """
+        Record the configuration of a connected device. Encryption and device type are
+        taken from the protocol and the device class actually in use.
+        """
+        encryption_type, encryption_version = _get_protocol_encryption(
+            device.client.protocol
+        ) or (config.encryption_type, config.encryption_version)
+        effective = dataclasses.replace(
+            config,
+            host=device.host,
+            port=device.port if device.port is not None else config.port,
+            credentials=None,
+            device_type=_DEVICE_CLASS_TYPES.get(type(device), config.device_type)
+            or _get_raw_device_type(device),
+            encryption_type=encryption_type,
+            encryption_version=encryption_version,
+        )
+        record = {**dataclasses.asdict(effective), "device_class": type(device).__name__}
+        del record["credentials"]
+        await self._update(lambda records: records.__setitem__(effective.host, record))
+
+    async def invalidate(self, host: str):
+        await self._update(lambda records: records.pop(host, None))
+
+    async def connect(
+        self,
+        config: DeviceConnectConfiguration,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> TapoDevice:
+        """
+        Connect and update a device, using the recorded configuration when available.
+        The record is invalidated only when the device rejects it, then the device is
+        connected again from the given configuration and the new one is recorded.
+        @return: the connected device, already updated
+        """
+        recorded = await self.get(config.host)
+        if recorded is not None:
+            device = await connect(
+                dataclasses.replace(recorded, credentials=config.credentials), session
+            )
+            try:
+                await device.update()
+                return device
+            except _UNREACHABLE_ERRORS:
+                await device.client.close()
+                raise
+            except Exception as e:
+                self._logger.warning(
+                    f"Recorded configuration of {config.host} rejected, {e}"
+                )
+                await device.client.close()
+                await self.invalidate(config.host)
+
+        device = await connect(config, session)
+        try:
+            await device.update()
+        except Exception:
+            await device.client.close()
+            raise
+        await self.record(device, config)
+        return device
+
+    async def _update(self, update):
+        async with self._lock:
+            records = await self._load()
+            update(records)
+            if self._file is not None:
+                await self._file.write(records)
+
+    async def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._records is None:
+            self._records = await self._file.read() if self._file is not None else {}
+        return self._records
+
+
+def _get_protocol_encryption(protocol: TapoProtocol) -> Optional[Tuple[str, int]]:
+    if isinstance(protocol, RecordingProtocol):
+        protocol = protocol.protocol
+    if isinstance(protocol, KlapProtocol):
+        return "klap", 2 if protocol.name == "Klap V2" else 1
+    elif isinstance(protocol, PassthroughProtocol):
+        return "aes", None
+    return None
+
+
+def _get_raw_device_type(device: TapoDevice) -> Optional[str]:
+    try:
+        return device.device_info.type
+    except AttributeError:
+        return None
@@ -16,6 +16,7 @@ from ..api.requests.tapo_request import TapoRequest
 from ..api.tapo_client import TapoClient
 from ..protocol.klap import klap_handshake_v1, klap_handshake_v2
 from ..protocol.tapo_protocol import TapoProtocol
+from ..protocol.traffic_capture import RecordingProtocol, TrafficRecorder
 from ..responses.device_state import DeviceInfo
 
 _LOGGER = logging.getLogger("DeviceFactory")
@@ -37,8 +38,17 @@ class DeviceConnectConfiguration:
 
 
 async def connect(
-    config: DeviceConnectConfiguration, session: Optional[aiohttp.ClientSession] = None
+    config: DeviceConnectConfiguration,
+    session: Optional[aiohttp.ClientSession] = None,
+    traffic_recorder: Optional[TrafficRecorder] = None,
+    keep_raw_state: bool = True,
 ):
+    """
+    @param traffic_recorder: when given, every request sent to the device is recorded
+    together with its response, see `ReplayProtocol` to replay them
+    @param keep_raw_state: False to drop the state received by updates once parsed,
+    see `TapoDevice.keep_raw_state`
+    """
     if config.device_type is None:
         protocol = await _get_or_guess_protocol(config, session)
         _LOGGER.debug(
@@ -54,8 +64,12 @@ async def connect(
         factory = _get_device_class_from_model_type(config.device_type)
         protocol = await _get_or_guess_protocol(config, session)
 
+    if traffic_recorder is not None:
+        protocol = RecordingProtocol(protocol, traffic_recorder, config.host)
     client = TapoClient(config.credentials, config.url, protocol, session)
-    return factory(config.host, config.port, client)
+    device = factory(config.host, config.port, client)
+    device.keep_raw_state = keep_raw_state
+    return device
 
 
 async def _get_or_guess_protocol(
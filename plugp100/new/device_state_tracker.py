@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any, Union, List, Optional, Iterable, FrozenSet
+
+from plugp100.new.event_polling.state_tracker import StateTracker
+
+DEFAULT_IGNORED_FIELDS: FrozenSet[str] = frozenset(
+    {
+        "rssi",
+        "signal_level",
+        "jamming_rssi",
+        "jamming_signal_level",
+        "local_time",
+        "on_time",
+    }
+)
+
+
+@dataclass
+class FieldAdded:
+    field: str
+    value: Any
+
+
+@dataclass
+class FieldRemoved:
+    field: str
+    value: Any
+
+
+@dataclass
+class FieldChanged:
+    field: str
+    old_value: Any
+    new_value: Any
+
+
+DeviceStateChange = Union[FieldAdded, FieldRemoved, FieldChanged]
+
+
+class DeviceStateTracker(StateTracker[dict[str, Any], DeviceStateChange]):
+    """
+    Diff successive device info payloads field by field. Nested objects are compared
+    recursively and reported with a dotted field path (e.g. `default_states.type`).
+    """
+
+    def __init__(
+        self,
+        ignored_fields: Iterable[str] = DEFAULT_IGNORED_FIELDS,
+        logger: Logger = None,
+    ):
+        super().__init__(logger=logger)
+        self._ignored_fields = frozenset(ignored_fields)
+
+    def _compute_state_changes(
+        self, new_state: dict[str, Any], last_state: Optional[dict[str, Any]]
+    ) -> List[DeviceStateChange]:
+        if last_state is None:
+            return []
+        return self._diff(last_state, new_state, "")
+
+    def _diff(
+        self, old: dict[str, Any], new: dict[str, Any], prefix: str
+    ) -> List[DeviceStateChange]:
+        changes = []
+        for key in old.keys() | new.keys():
+            field = f"{prefix}{key}"
+            if key in self._ignored_fields or field in self._ignored_fields:
+                continue
+            if key not in new:
+                changes.append(FieldRemoved(field, old[key]))
+            elif key not in old:
+                changes.append(FieldAdded(field, new[key]))
+            elif isinstance(old[key], dict) and isinstance(new[key], dict):
+                changes.extend(self._diff(old[key], new[key], f"{field}."))
+            elif old[key] != new[key]:
+                changes.append(FieldChanged(field, old[key], new[key]))
+        return sorted(changes, key=lambda change: change.field)
@@ -0,0 +1,147 @@
+import asyncio
+import collections
+import dataclasses
+import logging
+from logging import Logger
+from typing import TypeVar, Generic, Callable, Any, Optional, AsyncIterator, Deque, Union
+
+from plugp100.new.event_polling.poll_tracker import PollSubscription
+
+StateChange = TypeVar("StateChange")
+
+Subscribe = Callable[[Callable[[StateChange], Any]], PollSubscription]
+
+Pause = Callable[[], Callable[[], Any]]
+
+_CLOSED = object()
+
+
+@dataclasses.dataclass
+class ChangesDropped:
+    """
+    Yielded by a stream in place of the oldest changes, `count` of them, dropped because
+    its buffer was full.
+    """
+
+    count: int
+
+
+class ChangeStream(Generic[StateChange]):
+    """
+    Async iterator over the changes emitted by a subscription. Subscription starts on first
+    iteration and stops when the stream is closed: by `aclose`, by leaving `async with` block
+    or when an `async for` loop over the stream ends.
+
+    Changes are buffered up to `max_buffer_size`. When the buffer is full:
+    - with `pause`, e.g. trigger log events which must not be lost, backpressure is
+      applied: polling is paused until the consumer drains the buffer to half its size,
+      then resumed. Nothing is lost, pending changes stay in the tracker meanwhile.
+    - otherwise the oldest changes are dropped and a `ChangesDropped` is yielded in their
+      place, so the consumer knows it missed some.
+
+    Usage::
+
+        async with device.changes() as changes:
+            async for change in changes:
+                ...
+    """
+
+    def __init__(
+        self,
+        subscribe: Subscribe,
+        max_buffer_size: int = 100,
+        logger: Logger = None,
+        pause: Optional[Pause] = None,
+    ):
+        """
+        @param pause: function pausing the source of changes, it returns the function
+        resuming it
+        """
+        self._subscribe = subscribe
+        self._max_buffer_size = max_buffer_size
+        self._pause = pause
+        self._resume: Optional[Callable[[], Any]] = None
+        self._buffer: Deque[StateChange] = collections.deque()
+        self._ready = asyncio.Event()
+        self._unsubscribe: Optional[PollSubscription] = None
+        self._closed = False
+        self._dropped_changes = 0
+        self._not_yielded_drops = 0
+        self._logger = logger if logger is not None else logging.getLogger("ChangeStream")
+
+    @property
+    def dropped_changes(self) -> int:
+        return self._dropped_changes
+
+    def __aiter__(self) -> AsyncIterator[Union[StateChange, ChangesDropped]]:
+        return self._iterate()
+
+    async def __anext__(self) -> Union[StateChange, ChangesDropped]:
+        change = await self._next()
+        if change is _CLOSED:
+            raise StopAsyncIteration
+        return change
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            self._resume_source()
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+            self._buffer.clear()
+            self._ready.set()
+
+    async def __aenter__(self) -> "ChangeStream[StateChange]":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _iterate(self) -> AsyncIterator[Union[StateChange, ChangesDropped]]:
+        try:
+            while (change := await self._next()) is not _CLOSED:
+                yield change
+        finally:
+            await self.aclose()
+
+    async def _next(self) -> Any:
+        if self._closed:
+            return _CLOSED
+        if self._unsubscribe is None:
+            self._unsubscribe = self._subscribe(self._on_change)
+        while len(self._buffer) == 0 and self._not_yielded_drops == 0:
+            if self._closed:
+                return _CLOSED
+            self._ready.clear()
+            await self._ready.wait()
+        if self._closed:
+            return _CLOSED
+        if self._not_yielded_drops > 0:
+            dropped, self._not_yielded_drops = self._not_yielded_drops, 0
+            return ChangesDropped(dropped)
+        change = self._buffer.popleft()
+        if len(self._buffer) <= self._max_buffer_size // 2:
+            self._resume_source()
+        return change
+
+    def _resume_source(self):
+        if self._resume is not None:
+            resume, self._resume = self._resume, None
+            resume()
+
+    def _on_change(self, change: StateChange):
+        if self._closed:
+            return
+        self._buffer.append(change)
+        self._ready.set()
+        if len(self._buffer) >= self._max_buffer_size:
+            if self._pause is not None:
+                if self._resume is None:
+                    self._logger.debug("Change stream buffer is full, pausing source")
+                    self._resume = self._pause()
+            elif len(self._buffer) > self._max_buffer_size:
+                self._buffer.popleft()
+                self._dropped_changes += 1
+                self._not_yielded_drops += 1
+                self._logger.warning("Change stream buffer is full, dropping oldest")
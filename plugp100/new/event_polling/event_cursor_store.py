@@ -0,0 +1,57 @@
+import abc
+import asyncio
+from typing import Optional, Dict
+
+from plugp100.common.utils.json_file import JsonFile
+
+
+class EventCursorStore(abc.ABC):
+    """Store of the last processed event id of each device."""
+
+    @abc.abstractmethod
+    async def get_cursor(self, device_id: str) -> Optional[int]:
+        pass
+
+    @abc.abstractmethod
+    async def set_cursor(self, device_id: str, last_event_id: int):
+        pass
+
+
+class InMemoryEventCursorStore(EventCursorStore):
+    def __init__(self, cursors: Optional[Dict[str, int]] = None):
+        self._cursors = dict(cursors or {})
+
+    async def get_cursor(self, device_id: str) -> Optional[int]:
+        return self._cursors.get(device_id, None)
+
+    async def set_cursor(self, device_id: str, last_event_id: int):
+        self._cursors[device_id] = last_event_id
+
+
+class FileEventCursorStore(EventCursorStore):
+    """
+    Keep cursors into a json file. The file is read once and rewritten atomically
+    on each cursor update, outside the event loop.
+    """
+
+    def __init__(self, path: str):
+        self._file = JsonFile(path)
+        self._cursors: Optional[Dict[str, int]] = None
+        self._lock = asyncio.Lock()
+
+    async def get_cursor(self, device_id: str) -> Optional[int]:
+        return (await self._load()).get(device_id, None)
+
+    async def set_cursor(self, device_id: str, last_event_id: int):
+        async with self._lock:
+            cursors = await self._load()
+            if cursors.get(device_id, None) != last_event_id:
+                cursors[device_id] = last_event_id
+                await self._file.write(cursors)
+
+    async def _load(self) -> Dict[str, int]:
+        if self._cursors is None:
+            self._cursors = {
+                key: int(value) for key, value in (await self._file.read()).items()
+            }
+        return self._cursors
@@ -0,0 +1,106 @@
+import dataclasses
+from typing import TypeVar, Generic, List, Optional, Callable, Awaitable
+
+from plugp100.common.functional.tri import Try, Success
+from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
+
+T = TypeVar("T")
+
+EventLogsPageFetcher = Callable[[int, int], Awaitable[Try[TriggerLogResponse[T]]]]
+
+
+@dataclasses.dataclass
+class EventLogsGap:
+    """
+    Reported when some events between the cursor and the first fetched event
+    are no more available on device (e.g. overwritten or log reset).
+    """
+
+    last_event_id: int
+    first_event_id: int
+    log_reset: bool = False
+
+    @property
+    def missing_events(self) -> int:
+        return max(self.first_event_id - self.last_event_id - 1, 0)
+
+
+@dataclasses.dataclass
+class EventLogsBatch(Generic[T]):
+    last_event_id: int
+    events: List[T]  # ordered from oldest to newest
+    gap: Optional[EventLogsGap] = None
+
+
+async def fetch_event_logs_since(
+    fetch_page: EventLogsPageFetcher,
+    last_event_id: Optional[int],
+    page_size: int = 10,
+    max_pages: int = 5,
+) -> Try[EventLogsBatch[T]]:
+    """
+    Fetch all the events newer than last_event_id, paging backward from the latest one
+    until the cursor is reached. When there are more new events than max_pages can
+    fetch, only the oldest ones are fetched and the returned cursor stops at the newest
+    of them, so the next call continues from there instead of skipping events.
+
+    @param fetch_page: function accepting (page_size, start_id) which returns a trigger logs page
+    @param last_event_id: id of last processed event, None to just initialize the cursor
+    @param page_size: the number of events requested for each page
+    @param max_pages: max number of pages fetched for each call, besides the latest one
+    when the burst is too large
+    @return: new events since last_event_id and the updated cursor, or Error
+    """
+    head = await fetch_page(page_size, 0)
+    if head.is_failure():
+        return head
+    latest = head.get()
+    if last_event_id is None:
+        return Success(EventLogsBatch(latest.event_start_id, []))
+    if latest.event_start_id == last_event_id:
+        return Success(EventLogsBatch(last_event_id, []))
+
+    log_reset = latest.event_start_id < last_event_id
+    cursor = 0 if log_reset else last_event_id
+    # pages may overlap by one event, since start_id is the oldest id of previous page
+    budget = page_size + (max(1, max_pages) - 1) * (page_size - 1)
+    until_event_id = min(latest.event_start_id, cursor + budget)
+    page = latest
+    if until_event_id < latest.event_start_id:
+        # burst larger than the page budget, oldest events are returned first
+        oldest = await fetch_page(page_size, until_event_id)
+        if oldest.is_failure():
+            return oldest
+        page = oldest.get()
+    new_events = {e.id: e for e in page.events if cursor < e.id <= until_event_id}
+    fetched_pages = 1
+    while (
+        fetched_pages < max_pages
+        and len(page.events) >= page_size
+        and len(new_events) > 0
+        and min(new_events) > cursor + 1
+    ):
+        next_page = await fetch_page(page_size, min(e.id for e in page.events))
+        if next_page.is_failure():
+            return next_page
+        page, fetched_pages = next_page.get(), fetched_pages + 1
+        older_events = [
+            e for e in page.events if e.id > cursor and e.id not in new_events
+        ]
+        if len(older_events) == 0:
+            break
+        new_events.update({e.id: e for e in older_events})
+
+    first_event_id = min(new_events) if new_events else until_event_id + 1
+    gap = (
+        EventLogsGap(last_event_id, first_event_id, log_reset)
+        if log_reset or first_event_id > cursor + 1
+        else None
+    )
+    return Success(
+        EventLogsBatch(
+            last_event_id=until_event_id,
+            events=[new_events[event_id] for event_id in sorted(new_events)],
+            gap=gap,
+        )
+    )
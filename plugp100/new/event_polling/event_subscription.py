@@ -1,36 +1,171 @@
+import asyncio
 import dataclasses
 import logging
-from typing import Optional, List
+import warnings
+from asyncio import iscoroutinefunction
+from typing import Optional, List, TypeVar, Union, Callable, Any, Set
 
+from plugp100.instrumentation.loop_monitor import task_name, DISPATCHER
+
+from plugp100.new.event_polling.event_cursor_store import EventCursorStore
+from plugp100.new.event_polling.event_logs_cursor import EventLogsBatch, EventLogsGap
 from plugp100.new.event_polling.state_tracker import StateTracker
-from plugp100.responses.hub_childs.s200b_device_state import S200BEvent
-from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
+
+T = TypeVar("T")
+
+EventLogsChange = Union[T, EventLogsGap]
+
+
+@dataclasses.dataclass
+class EventLogsCheckpoint:
+    """
+    Emitted by event log trackers after the changes of a batch, never received by
+    subscribers: cursor is saved once these changes have been dispatched.
+    """
+
+    last_event_id: int
 
 
 @dataclasses.dataclass
 class EventSubscriptionOptions:
+    """
+    Options of trigger log subscriptions. Subscribers receive new events from the oldest
+    to the newest, detected by event id. When events were lost between two polls, e.g.
+    overwritten on device or after a log reset, an `EventLogsGap` is received before
+    the events fetched after it, so callbacks must accept both.
+
+    @param debounce_millis: deprecated and ignored, new events are detected by id
+    @param cursor_store: when set, subscriptions resume from the last processed event
+    after a restart. Cursor is saved once callbacks handled the events, coroutine
+    callbacks included. Nothing is persisted by default, use `FileEventCursorStore`
+    to keep cursors in a file of your choice
+    @param max_children_per_request: children polled by each hub request, when subscribed
+    through the hub. Taken from the first subscription, like the polling interval
+    """
+
     polling_interval_millis: int
-    debounce_millis: int = 500
+    debounce_millis: Optional[int] = None
+    page_size: int = 10
+    max_pages: int = 5
+    cursor_store: Optional[EventCursorStore] = None
+    max_children_per_request: int = 8
+
+    def __post_init__(self):
+        if self.debounce_millis is not None:
+            warnings.warn(
+                "debounce_millis is deprecated and ignored, new events are detected by id",
+                DeprecationWarning,
+                stacklevel=3,
+            )
 
 
-class EventLogsStateTracker(StateTracker[TriggerLogResponse[S200BEvent], S200BEvent]):
-    def __init__(self, debounce_millis: int, logger: logging.Logger = None):
+class EventLogsStateTracker(
+    StateTracker[EventLogsBatch[T], Union[EventLogsChange, EventLogsCheckpoint]]
+):
+    def __init__(self, logger: logging.Logger = None):
         super().__init__(logger=logger)
-        self._debounce_millis = debounce_millis
 
     def _compute_state_changes(
         self,
-        new_state: TriggerLogResponse[S200BEvent],
-        last_state: Optional[TriggerLogResponse[S200BEvent]],
-    ) -> List[S200BEvent]:
-        if last_state is None or len(last_state.events) == 0:
-            return []
-        last_event_id = last_state.event_start_id
-        last_event_timestamp = last_state.events[0].timestamp
-        return list(
-            filter(
-                lambda x: x.id > last_event_id
-                and x.timestamp - last_event_timestamp <= self._debounce_millis,
-                new_state.events,
+        new_state: EventLogsBatch[T],
+        last_state: Optional[EventLogsBatch[T]],
+    ) -> List[Union[EventLogsChange, EventLogsCheckpoint]]:
+        return event_logs_changes(new_state, last_state, self._logger)
+
+
+def event_logs_changes(
+    batch: EventLogsBatch[T],
+    last_batch: Optional[EventLogsBatch[T]],
+    logger: logging.Logger,
+) -> List[Union[EventLogsChange, EventLogsCheckpoint]]:
+    changes: List[Union[EventLogsChange, EventLogsCheckpoint]] = list(batch.events)
+    if batch.gap is not None:
+        logger.warning(
+            f"Lost {batch.gap.missing_events} events after id "
+            f"{batch.gap.last_event_id} (log reset: {batch.gap.log_reset})"
+        )
+        changes.insert(0, batch.gap)
+    if last_batch is None or last_batch.last_event_id != batch.last_event_id:
+        changes.append(EventLogsCheckpoint(batch.last_event_id))
+    return changes
+
+
+class EventLogsDispatcher:
+    """
+    Dispatch event log changes of a device to its callbacks, then save the cursor of each
+    checkpoint once the callbacks, coroutines included, handled the events before it.
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        options: EventSubscriptionOptions,
+        logger: logging.Logger,
+    ):
+        self.device_id = device_id
+        self.options = options
+        self.callbacks: List[Callable[[EventLogsChange], Any]] = []
+        self._logger = logger
+        self._pending: Set[asyncio.Task] = set()
+        self._last_save: Optional[asyncio.Task] = None
+
+    def dispatch(self, change: Union[EventLogsChange, EventLogsCheckpoint]):
+        if isinstance(change, EventLogsCheckpoint):
+            if self.options.cursor_store is not None:
+                self._save_after_pending(change.last_event_id)
+            return
+        for callback in self.callbacks:
+            if iscoroutinefunction(callback):
+                task = asyncio.create_task(
+                    callback(change), name=task_name(DISPATCHER, "event_logs_callback")
+                )
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+            else:
+                callback(change)
+
+    def _save_after_pending(self, last_event_id: int):
+        # saves are chained, so an older cursor never overwrites a newer one
+        pending = set(self._pending)
+        if self._last_save is not None and not self._last_save.done():
+            pending.add(self._last_save)
+
+        async def save():
+            if len(pending) > 0:
+                await asyncio.wait(pending)
+            await save_last_event_id(
+                self.device_id, last_event_id, self.options, self._logger
             )
+
+        self._last_save = asyncio.create_task(
+            save(), name=task_name(DISPATCHER, "event_cursor")
         )
+
+
+async def restore_last_event_id(
+    device_id: str,
+    last_state: Optional[EventLogsBatch],
+    options: EventSubscriptionOptions,
+    logger: logging.Logger,
+) -> Optional[int]:
+    if last_state is not None:
+        return last_state.last_event_id
+    if options.cursor_store is not None:
+        try:
+            return await options.cursor_store.get_cursor(device_id)
+        except Exception as e:
+            logger.warning(f"Failed to restore event cursor of {device_id}: {e}")
+    return None
+
+
+async def save_last_event_id(
+    device_id: str,
+    last_event_id: int,
+    options: EventSubscriptionOptions,
+    logger: logging.Logger,
+):
+    if options.cursor_store is not None:
+        try:
+            await options.cursor_store.set_cursor(device_id, last_event_id)
+        except Exception as e:
+            logger.warning(f"Failed to save event cursor of {device_id}: {e}")
@@ -0,0 +1,205 @@
+import dataclasses
+import logging
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from plugp100.api.requests.tapo_request import TapoRequest
+from plugp100.api.requests.trigger_logs_params import GetTriggerLogsParams
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.functional.tri import Try, Failure
+from plugp100.common.utils.json_utils import Json
+from plugp100.new.components.trigger_log_component import TriggerLogComponent
+from plugp100.new.event_polling.event_logs_cursor import (
+    EventLogsBatch,
+    fetch_event_logs_since,
+)
+from plugp100.new.event_polling.event_subscription import (
+    EventLogsChange,
+    EventLogsCheckpoint,
+    EventLogsDispatcher,
+    EventSubscriptionOptions,
+    event_logs_changes,
+    restore_last_event_id,
+)
+from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
+from plugp100.new.event_polling.state_tracker import StateTracker
+from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
+
+HubEventLogsState = Dict[str, EventLogsBatch]
+
+
+@dataclasses.dataclass
+class ChildEventLogsChange:
+    child_id: str
+    change: Union[EventLogsChange, EventLogsCheckpoint]
+
+
+@dataclasses.dataclass
+class _ChildSubscription:
+    component: TriggerLogComponent
+    dispatcher: EventLogsDispatcher
+
+    @property
+    def options(self) -> EventSubscriptionOptions:
+        return self.dispatcher.options
+
+    @property
+    def callbacks(self) -> List[Callable[[EventLogsChange], Any]]:
+        return self.dispatcher.callbacks
+
+
+class HubEventLogsStateTracker(StateTracker[HubEventLogsState, ChildEventLogsChange]):
+    def __init__(self, logger: Logger = None):
+        super().__init__({}, logger)
+
+    def forget_child(self, child_id: str):
+        """
+        Drop the last batch of an unsubscribed child, so a new subscription starts from
+        the cursor store instead of a stale cursor.
+        """
+        if self._last_state is not None:
+            self._last_state.pop(child_id, None)
+
+    def _compute_state_changes(
+        self, new_state: HubEventLogsState, last_state: Optional[HubEventLogsState]
+    ) -> List[ChildEventLogsChange]:
+        last_state = last_state or {}
+        return [
+            ChildEventLogsChange(child_id, change)
+            for child_id, batch in new_state.items()
+            for change in event_logs_changes(
+                batch, last_state.get(child_id, None), self._logger
+            )
+        ]
+
+
+class HubEventLogsPoller:
+    """
+    Poll trigger logs of all subscribed hub children using multipleRequests of at most
+    `max_children_per_request` children for each tick, since firmware rejects too large
+    requests, then dispatch new events to the subscribers of each child.
+    """
+
+    def __init__(
+        self,
+        client: TapoClient,
+        interval_millis: int,
+        logger: Logger = None,
+        max_children_per_request: int = 8,
+    ):
+        self._client = client
+        self._max_children_per_request = max(1, max_children_per_request)
+        self._logger = (
+            logger if logger is not None else logging.getLogger("HubEventLogsPoller")
+        )
+        self._subscriptions: Dict[str, _ChildSubscription] = {}
+        self._tracker_subscription: Optional[PollSubscription] = None
+        self._state_tracker = HubEventLogsStateTracker(self._logger)
+        self._poll_tracker = PollTracker(
+            state_provider=self._poll_event_logs,
+            state_tracker=self._state_tracker,
+            interval_millis=interval_millis,
+            logger=self._logger,
+        )
+
+    @property
+    def poll_tracker(self) -> PollTracker:
+        return self._poll_tracker
+
+    def subscribe(
+        self,
+        component: TriggerLogComponent,
+        callback: Callable[[EventLogsChange], Any],
+        event_subscription_options: EventSubscriptionOptions,
+    ) -> PollSubscription:
+        child_id = component.device_id
+        if child_id not in self._subscriptions:
+            self._subscriptions[child_id] = _ChildSubscription(
+                component,
+                EventLogsDispatcher(child_id, event_subscription_options, self._logger),
+            )
+        self._subscriptions[child_id].callbacks.append(callback)
+        if self._tracker_subscription is None:
+            self._tracker_subscription = self._poll_tracker.subscribe(self._dispatch)
+
+        def unsubscribe():
+            subscription = self._subscriptions.get(child_id)
+            if subscription is not None and callback in subscription.callbacks:
+                subscription.callbacks.remove(callback)
+                if len(subscription.callbacks) == 0:
+                    del self._subscriptions[child_id]
+                    self._state_tracker.forget_child(child_id)
+            if len(self._subscriptions) == 0 and self._tracker_subscription:
+                self._tracker_subscription()
+                self._tracker_subscription = None
+
+        return unsubscribe
+
+    def _dispatch(self, child_change: ChildEventLogsChange):
+        if subscription := self._subscriptions.get(child_change.child_id):
+            subscription.dispatcher.dispatch(child_change.change)
+
+    async def _poll_event_logs(
+        self, last_state: Optional[HubEventLogsState]
+    ) -> Optional[HubEventLogsState]:
+        subscriptions = list(self._subscriptions.items())
+        if len(subscriptions) == 0:
+            return None
+        responses: List[Try[Json]] = []
+        failed_children = 0
+        for start in range(0, len(subscriptions), self._max_children_per_request):
+            chunk = subscriptions[start : start + self._max_children_per_request]
+            chunk_responses = await self._client.control_children(
+                [
+                    (
+                        child_id,
+                        TapoRequest.get_child_event_logs(
+                            GetTriggerLogsParams(subscription.options.page_size, 0)
+                        ),
+                    )
+                    for child_id, subscription in chunk
+                ]
+            )
+            if chunk_responses.is_failure():
+                self._logger.warning(
+                    f"Failed to poll children logs {chunk_responses.error()}"
+                )
+                failed_children += len(chunk)
+                responses += [Failure(chunk_responses.error())] * len(chunk)
+            else:
+                responses += chunk_responses.get()
+        if failed_children == len(subscriptions):
+            return None
+
+        last_state = last_state or {}
+        new_state: HubEventLogsState = {}
+        for (child_id, subscription), response in zip(subscriptions, responses):
+            if self._subscriptions.get(child_id, None) is not subscription:
+                continue  # unsubscribed while polling
+            last_batch = last_state.get(child_id, None)
+            batch = await fetch_event_logs_since(
+                _head_or_fetch(
+                    response.flat_map(subscription.component.parse_event_logs),
+                    subscription.component,
+                ),
+                await restore_last_event_id(
+                    child_id, last_batch, subscription.options, self._logger
+                ),
+                subscription.options.page_size,
+                subscription.options.max_pages,
+            )
+            if batch.is_success():
+                new_state[child_id] = batch.get()
+            elif last_batch is not None:
+                self._logger.warning(f"Failed to poll {child_id} logs {batch.error()}")
+                new_state[child_id] = EventLogsBatch(last_batch.last_event_id, [])
+        return new_state
+
+
+def _head_or_fetch(head: Try[TriggerLogResponse], component: TriggerLogComponent):
+    async def fetch_page(page_size: int, start_id: int) -> Try[TriggerLogResponse]:
+        if start_id == 0:
+            return head
+        return await component.get_event_logs(page_size, start_id)
+
+    return fetch_page
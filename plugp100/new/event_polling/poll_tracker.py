@@ -1,8 +1,10 @@
 import asyncio
+import time
 from asyncio import iscoroutinefunction
 from logging import Logger
 from typing import TypeVar, List, Callable, Any, Generic, Optional
 
+from plugp100.instrumentation.loop_monitor import task_name, TRACKER, DISPATCHER
 from plugp100.new.event_polling.state_tracker import StateTracker
 
 State = TypeVar("State")
@@ -27,6 +29,32 @@ class PollTracker(Generic[State, StateChange]):
         self._interval_millis = interval_millis
         self._state_tracker = state_tracker
         self._logger = logger
+        self._polls = 0
+        self._poll_lag = 0.0
+        self._last_poll_started_at: Optional[float] = None
+        self._pauses = 0
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    @property
+    def is_tracking(self) -> bool:
+        return self._is_tracking
+
+    @property
+    def interval_millis(self) -> int:
+        return self._interval_millis
+
+    @property
+    def polls(self) -> int:
+        return self._polls
+
+    @property
+    def poll_lag(self) -> float:
+        """
+        @return: seconds the last poll started later than its interval, because of slow
+        state providers or a busy event loop
+        """
+        return self._poll_lag
 
     def subscribe(self, callback: Callable[[StateChange], Any]) -> PollSubscription:
         """
@@ -48,6 +76,27 @@ class PollTracker(Generic[State, StateChange]):
 
         return unsubscribe
 
+    def pause(self) -> Callable[[], None]:
+        """
+        Stop polling and emitting changes until the returned function is called, e.g. while
+        a consumer cannot keep up. Changes already detected are kept and emitted on resume.
+
+        @return: The function to resume tracking.
+        """
+        self._pauses += 1
+        self._resumed.clear()
+        resumed = False
+
+        def resume():
+            nonlocal resumed
+            if not resumed:
+                resumed = True
+                self._pauses -= 1
+                if self._pauses == 0:
+                    self._resumed.set()
+
+        return resume
+
     def _start_tracking(self):
         """
         The function `start_tracking` starts a background task that periodically polls for updates.
@@ -55,8 +104,12 @@ class PollTracker(Generic[State, StateChange]):
         if not self._is_tracking:
             self._is_tracking = True
             self._tracking_tasks = [
-                asyncio.create_task(self._poll(self._interval_millis)),
-                asyncio.create_task(self._poll_tracker()),
+                asyncio.create_task(
+                    self._poll(self._interval_millis), name=task_name(TRACKER, "poll")
+                ),
+                asyncio.create_task(
+                    self._poll_tracker(), name=task_name(TRACKER, "changes")
+                ),
             ]
 
     def _stop_tracking(self):
@@ -65,6 +118,7 @@ class PollTracker(Generic[State, StateChange]):
         """
         if self._is_tracking:
             self._is_tracking = False
+            self._last_poll_started_at = None
             for task in self._tracking_tasks:
                 task.cancel()
             self._tracking_tasks = []
@@ -72,12 +126,24 @@ class PollTracker(Generic[State, StateChange]):
     def _emit(self, state_change: StateChange):
         for sub in self._tracking_subscriptions:
             if iscoroutinefunction(sub):
-                asyncio.create_task(sub(state_change))
+                asyncio.create_task(
+                    sub(state_change), name=task_name(DISPATCHER, "callback")
+                )
             else:
                 sub(state_change)
 
     async def _poll(self, interval_millis: int):
         while self._is_tracking:
+            if not self._resumed.is_set():
+                await self._resumed.wait()
+                self._last_poll_started_at = None
+            started_at = time.monotonic()
+            if self._last_poll_started_at is not None:
+                self._poll_lag = max(
+                    0.0, started_at - self._last_poll_started_at - interval_millis / 1000
+                )
+            self._last_poll_started_at = started_at
+            self._polls += 1
             last_state = self._state_tracker.get_last_state()
             new_state = (
                 await self._state_provider(last_state)
@@ -93,4 +159,5 @@ class PollTracker(Generic[State, StateChange]):
     async def _poll_tracker(self):
         while self._is_tracking:
             state_change = await self._state_tracker.get_next_state_change()
+            await self._resumed.wait()
             self._emit(state_change)
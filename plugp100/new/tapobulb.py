@@ -11,6 +11,8 @@ from plugp100.responses.components import Components
 
 
 class TapoBulb(TapoDevice):
+    __slots__ = ()
+
     def __init__(self, host: str, port: Optional[int], client: TapoClient):
         super().__init__(host, port, client, DeviceType.Bulb)
 
@@ -1,14 +1,22 @@
 import dataclasses
 import logging
-from typing import Optional, TypeVar, Type, Dict, Any
+from typing import Optional, TypeVar, Type, Dict, Any, Callable, Iterable
 
 from plugp100.api.requests.tapo_request import TapoRequest
 from plugp100.api.tapo_client import TapoClient
 from plugp100.common.functional.tri import Try
+from plugp100.instrumentation.profiler import PROFILER
 from plugp100.new.components.countdown import Countdown
 from plugp100.new.components.device_component import DeviceComponent
 from plugp100.new.components.overheat_component import OverheatComponent
+from plugp100.new.device_state_tracker import (
+    DeviceStateTracker,
+    DeviceStateChange,
+    DEFAULT_IGNORED_FIELDS,
+)
 from plugp100.new.device_type import DeviceType
+from plugp100.new.event_polling.change_stream import ChangeStream
+from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
 from plugp100.responses.components import Components
 from plugp100.responses.device_state import DeviceInfo
 from plugp100.responses.firmware import LatestFirmware, FirmwareDownloadProgress
@@ -18,14 +26,28 @@ _LOGGER = logging.getLogger("TapoDevice")
 C = TypeVar("C", bound=DeviceComponent)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class LastUpdate:
     components: Components
     device_info: DeviceInfo
-    raw_state: dict[str, Any]
+    raw_state: Optional[dict[str, Any]]
 
 
 class TapoDevice:
+    # fleets hold thousands of devices, subclasses declare their own slots too
+    __slots__ = (
+        "host",
+        "port",
+        "client",
+        "_child_id",
+        "_last_update",
+        "_device_type",
+        "_active_components",
+        "_state_poll_tracker",
+        "_keep_raw_state",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         host: str,
@@ -41,6 +63,8 @@ class TapoDevice:
         self._last_update: LastUpdate | None = None
         self._device_type = device_type
         self._active_components: Dict[Type[DeviceComponent], DeviceComponent] = {}
+        self._state_poll_tracker: Optional[PollTracker] = None
+        self._keep_raw_state = True
 
     @property
     def get_device_components(self) -> [DeviceComponent]:
@@ -51,32 +75,114 @@ class TapoDevice:
         return self.client.protocol.name
 
     @property
-    def raw_state(self) -> dict[str, Any]:
+    def state_poll_tracker(self) -> Optional[PollTracker]:
+        return self._state_poll_tracker
+
+    @property
+    def raw_state(self) -> Optional[dict[str, Any]]:
+        """
+        @return: the state of the last update as received, None when `keep_raw_state`
+        is off
+        """
         return self._last_update.raw_state
 
+    @property
+    def keep_raw_state(self) -> bool:
+        """
+        When off, the state received by an update is dropped once parsed into device
+        info and components, `raw_state` is None. It saves memory on large fleets.
+        Children created by the device afterwards inherit it.
+        """
+        return self._keep_raw_state
+
+    @keep_raw_state.setter
+    def keep_raw_state(self, keep: bool):
+        self._keep_raw_state = keep
+        if not keep and self._last_update is not None:
+            self._last_update.raw_state = None
+
     async def update(self):
-        if self._last_update is None:
-            _LOGGER.debug("Initializing device...")
-            components = await self._negotiate_components()
-            await self._setup_components(components)
-        else:
-            components = self._last_update.components
+        await self._update()
+
+    async def _update(self) -> dict[str, Any]:
+        async with PROFILER.sample(type(self).__name__):
+            if self._last_update is None:
+                _LOGGER.debug("Initializing device...")
+                components = await self._negotiate_components()
+                await self._setup_components(components)
+            else:
+                components = self._last_update.components
+
+            if self._child_id:
+                state = (
+                    await self.client.control_child(
+                        child_id=self._child_id, request=TapoRequest.get_device_info()
+                    )
+                ).get_or_raise()
+            else:
+                state = (await self.client.get_device_info()).get_or_raise()
+            self._last_update = LastUpdate(
+                device_info=DeviceInfo(**state),
+                components=components,
+                raw_state=state if self._keep_raw_state else None,
+            )
+            await self._update_from_state(state)
+            _LOGGER.debug("Fetching component updates...")
+            for _, component in self._active_components.items():
+                await component.update(state)
+            return state
 
-        if self._child_id:
-            state = (
-                await self.client.control_child(
-                    child_id=self._child_id, request=TapoRequest.get_device_info()
-                )
-            ).get_or_raise()
-        else:
-            state = (await self.client.get_device_info()).get_or_raise()
-        self._last_update = LastUpdate(
-            device_info=DeviceInfo(**state), components=components, raw_state=state
+    def subscribe_state_changes(
+        self,
+        callback: Callable[[DeviceStateChange], Any],
+        polling_interval_millis: int = 10_000,
+        ignored_fields: Iterable[str] = DEFAULT_IGNORED_FIELDS,
+    ) -> PollSubscription:
+        """
+        Subscribe to field level changes of the device state. While subscribed, the device
+        is updated on each poll, so there is no need to call `update` separately.
+        Polling interval and ignored fields are taken from the first subscription.
+
+        @param callback: function called with each `FieldAdded`, `FieldRemoved` or `FieldChanged`
+        @param polling_interval_millis: interval between device updates
+        @param ignored_fields: noisy field names or dotted paths to exclude from diff
+        @return: The function to unsubscribe.
+        """
+        if self._state_poll_tracker is None:
+            self._state_poll_tracker = PollTracker(
+                state_provider=self._poll_device_state,
+                state_tracker=DeviceStateTracker(ignored_fields, logger=_LOGGER),
+                interval_millis=polling_interval_millis,
+                logger=_LOGGER,
+            )
+        return self._state_poll_tracker.subscribe(callback)
+
+    def changes(
+        self,
+        polling_interval_millis: int = 10_000,
+        ignored_fields: Iterable[str] = DEFAULT_IGNORED_FIELDS,
+        max_buffer_size: int = 100,
+    ) -> ChangeStream[DeviceStateChange]:
+        """
+        Stream field level changes of the device state, see `subscribe_state_changes`.
+        Polling stops when the stream is closed.
+        """
+        return ChangeStream(
+            lambda callback: self.subscribe_state_changes(
+                callback, polling_interval_millis, ignored_fields
+            ),
+            max_buffer_size,
+            _LOGGER,
         )
-        await self._update_from_state(state)
-        _LOGGER.debug("Fetching component updates...")
-        for _, component in self._active_components.items():
-            await component.update(state)
+
+    async def _poll_device_state(
+        self, last_state: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        try:
+            return await self._update()
+        except Exception as e:
+            _LOGGER.warning(f"Failed to update device {self.host}: {e}")
+            return None
 
     async def _update_from_state(self, state: dict[str, Any]):
         pass
@@ -6,7 +6,14 @@ from plugp100.api.tapo_client import TapoClient
 from plugp100.common.functional.tri import Try, Failure
 from plugp100.new.components.alarm_component import AlarmComponent
 from plugp100.new.components.hub_children_component import HubChildrenComponent
+from plugp100.new.components.trigger_log_component import TriggerLogComponent
 from plugp100.new.device_type import DeviceType
+from plugp100.new.event_polling.change_stream import ChangeStream
+from plugp100.new.event_polling.event_subscription import (
+    EventLogsChange,
+    EventSubscriptionOptions,
+)
+from plugp100.new.event_polling.hub_event_logs_poller import HubEventLogsPoller
 from plugp100.new.event_polling.poll_tracker import PollTracker, PollSubscription
 from plugp100.new.hub_device_tracker import HubConnectedDeviceTracker, HubDeviceEvent
 from plugp100.new.tapodevice import TapoDevice, C
@@ -19,6 +26,13 @@ subscription_polling_interval_millis: int = 5000
 
 
 class TapoHub(TapoDevice):
+    __slots__ = (
+        "_children",
+        "_tracker",
+        "_poll_tracker",
+        "_event_logs_poller",
+    )
+
     def __init__(self, host: str, port: Optional[int], client: TapoClient):
         super().__init__(host, port, client, DeviceType.Hub)
         self._children = []
@@ -29,12 +43,63 @@ class TapoHub(TapoDevice):
             interval_millis=subscription_polling_interval_millis,
             logger=_LOGGER,
         )
+        self._event_logs_poller: Optional[HubEventLogsPoller] = None
+
+    @property
+    def association_poll_tracker(self) -> PollTracker:
+        return self._poll_tracker
+
+    @property
+    def event_logs_poll_tracker(self) -> Optional[PollTracker]:
+        """
+        @return: tracker polling logs of children subscribed through the hub, None until
+        first subscription
+        """
+        if self._event_logs_poller is None:
+            return None
+        return self._event_logs_poller.poll_tracker
 
     def subscribe_device_association(
         self, callback: Callable[[HubDeviceEvent], Any]
     ) -> PollSubscription:
         return self._poll_tracker.subscribe(callback)
 
+    def association_changes(
+        self, max_buffer_size: int = 100
+    ) -> ChangeStream[HubDeviceEvent]:
+        """
+        Stream children added to or removed from the hub.
+        Polling stops when the stream is closed.
+        """
+        return ChangeStream(self.subscribe_device_association, max_buffer_size, _LOGGER)
+
+    def subscribe_event_logs(
+        self,
+        child: TapoDevice,
+        callback: Callable[[EventLogsChange], Any],
+        event_subscription_options: EventSubscriptionOptions,
+    ) -> PollSubscription:
+        """
+        Subscribe to trigger logs of a child device. Unlike child `subscribe_event_logs`, logs of all
+        children subscribed through the hub are polled together, up to
+        `max_children_per_request` for each request. The polling interval is the one of the
+        first subscription. Besides events, callback receives an `EventLogsGap` when some
+        events were lost, see `EventSubscriptionOptions`.
+        """
+        component = child.get_component(TriggerLogComponent)
+        if component is None:
+            raise Exception(f"Device {child.device_id} not support trigger logs")
+        if self._event_logs_poller is None:
+            self._event_logs_poller = HubEventLogsPoller(
+                self.client,
+                event_subscription_options.polling_interval_millis,
+                _LOGGER,
+                event_subscription_options.max_children_per_request,
+            )
+        return self._event_logs_poller.subscribe(
+            component, callback, event_subscription_options
+        )
+
     @property
     def is_alarm_on(self) -> bool:
         return self.get_component(AlarmComponent).is_alarm_on
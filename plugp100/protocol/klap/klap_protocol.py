@@ -16,6 +16,17 @@ from yarl import URL
 
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try, Failure
+from plugp100.instrumentation.request_instrumentation import (
+    INSTRUMENTATION,
+    DISABLED_TIMER,
+    RequestTimer,
+    QUEUE_WAIT,
+    HANDSHAKE,
+    ENCRYPT,
+    HTTP,
+    DECRYPT,
+    PARSE,
+)
 from plugp100.protocol.tapo_protocol import TapoProtocol
 from plugp100.api.requests.tapo_request import TapoRequest
 from plugp100.responses.tapo_response import TapoResponse
@@ -40,6 +51,7 @@ class KlapProtocol(TapoProtocol):
     ):
         super().__init__()
         self._base_url = url
+        self._host = URL(url).host
         self._auth_credential = auth_credential
         self._klap_strategy = klap_strategy
         self.local_auth_hash = self._klap_strategy.generate_auth_hash(
@@ -67,25 +79,40 @@ class KlapProtocol(TapoProtocol):
     async def send_request(
         self, request: TapoRequest, retry: int = 3
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        try:
-            async with self._request_lock:
-                if response := await self._send_request(request, retry):
-                    return TapoResponse.try_from_json(response)
-        except Exception as e:
-            if retry > 0:
-                return await self.send_request(request, retry - 1)
-            return Failure(e)
-
-    async def _send_request(self, request: TapoRequest, retry: int = 1) -> dict[str, Any]:
+        timer = INSTRUMENTATION.start_request(self._host, request.method, self.name)
+        while True:
+            try:
+                async with self._request_lock:
+                    timer.phase(QUEUE_WAIT)
+                    if response := await self._send_request(request, retry, timer):
+                        parsed = TapoResponse.try_from_json(response)
+                        timer.phase(PARSE)
+                        return timer.finish(parsed)
+                    return timer.finish(None)
+            except Exception as e:
+                # the device may have dropped the session, e.g. after a restart,
+                # so the retry starts with a new handshake
+                self._klap_session = None
+                if retry > 0:
+                    retry -= 1
+                    timer.retry()
+                    continue
+                return timer.finish(Failure(e))
+
+    async def _send_request(
+        self, request: TapoRequest, retry: int = 1, timer: RequestTimer = DISABLED_TIMER
+    ) -> dict[str, Any]:
         if (
             self._klap_session is None
             or self._klap_session.is_handshake_session_expired()
         ):
             self._klap_session = None
             self._klap_session = await self.perform_handshake()
+            timer.phase(HANDSHAKE)
 
         raw_request = jsons.dumps(request)
         payload, seq = self._klap_session.chiper.encrypt(raw_request)
+        timer.phase(ENCRYPT)
         url = f"{self._base_url}/request"
         cookies = (
             {KlapProtocol.TP_SESSION_COOKIE_NAME: self._klap_session.session_cookie}
@@ -98,10 +125,12 @@ class KlapProtocol(TapoProtocol):
             data=payload,
             cookies=cookies,
         )
+        timer.phase(HTTP)
         if response.status != 200:
             logger.error(
                 f"Query failed after successful authentication. Remaining attempts count is {retry}"
             )
+            self._klap_session = None
             if response.status == 403:
                 raise Exception("Forbidden error after completing handshake")
             else:
@@ -112,7 +141,9 @@ class KlapProtocol(TapoProtocol):
                     seq,
                 )
         else:
-            return jsons.loads(self._klap_session.chiper.decrypt(response_data))
+            decrypted = jsons.loads(self._klap_session.chiper.decrypt(response_data))
+            timer.phase(DECRYPT)
+            return decrypted
 
     async def close(self):
         self._klap_session = None
@@ -277,7 +308,7 @@ class KlapSession:
     session_cookie: str
 
     def is_handshake_session_expired(self) -> bool:
-        return (self.expire_at - (time.time() * 1000)) <= 40 * 1000
+        return (self.expire_at - time.time()) <= 40
 
 
 # The chiper is not thread safe and use sequence number to encrypt and decrypt data.
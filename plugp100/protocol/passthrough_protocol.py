@@ -3,10 +3,17 @@ from time import time
 from typing import Optional, Any
 
 import aiohttp
+from yarl import URL
 
 from plugp100.api.requests.tapo_request import TapoRequest
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try
+from plugp100.instrumentation.request_instrumentation import (
+    INSTRUMENTATION,
+    DISABLED_TIMER,
+    RequestTimer,
+    HANDSHAKE,
+)
 from plugp100.protocol.securepassthrough_transport import (
     Session,
     SecurePassthroughTransport,
@@ -28,6 +35,7 @@ class PassthroughProtocol(TapoProtocol):
     ):
         super().__init__()
         self._url = url
+        self._host = URL(url).host
         self._owns_http_session = http_session is None
         self._http = AsyncHttp(
             aiohttp.ClientSession() if self._owns_http_session else http_session
@@ -43,36 +51,42 @@ class PassthroughProtocol(TapoProtocol):
     async def send_request(
         self, request: TapoRequest, retry: int = 3
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        response = await self._send_request(request)
-        if retry > 0 and isinstance(response.error(), TapoException):
-            if response.error().error_code == TapoError.ERR_SESSION_TIMEOUT.value:
-                self._session.invalidate()
-                logger.warning(
-                    "Session timeout, invalidate it, retrying with new session"
-                )
-                return await self.send_request(request, retry - 1)
-            elif response.error().error_code == TapoError.ERR_DEVICE.value:
-                self._session.invalidate()
-                logger.warning(
-                    "Error device, probably exceeding rate limit, retrying with new session"
-                )
-                return await self.send_request(request, retry - 1)
-        return response
+        timer = INSTRUMENTATION.start_request(self._host, request.method, self.name)
+        while True:
+            response = await self._send_request(request, timer)
+            if retry > 0 and isinstance(response.error(), TapoException):
+                if response.error().error_code == TapoError.ERR_SESSION_TIMEOUT.value:
+                    self._session.invalidate()
+                    logger.warning(
+                        "Session timeout, invalidate it, retrying with new session"
+                    )
+                    retry -= 1
+                    timer.retry()
+                    continue
+                elif response.error().error_code == TapoError.ERR_DEVICE.value:
+                    self._session.invalidate()
+                    logger.warning(
+                        "Error device, probably exceeding rate limit, retrying with new session"
+                    )
+                    retry -= 1
+                    timer.retry()
+                    continue
+            return timer.finish(response)
 
     async def _send_request(
-        self, request: TapoRequest
+        self, request: TapoRequest, timer: RequestTimer = DISABLED_TIMER
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        login_session = (
-            await self._login_with_version(self._credential)
-            if self._session is None or self._session.token is None
-            else Try.of(self._session)
-        )
+        if self._session is None or self._session.token is None:
+            login_session = await self._login_with_version(self._credential)
+            timer.phase(HANDSHAKE)
+        else:
+            login_session = Try.of(self._session)
         if login_session.is_success():
             self._session = login_session.get()
             request.with_terminal_uuid(
                 self._session.terminal_uuid
             ).with_request_time_millis(round(time() * 1000))
-            return await self._passthrough.send(request, self._session)
+            return await self._passthrough.send(request, self._session, timer)
         return login_session
 
     async def close(self):
@@ -17,6 +17,14 @@ from plugp100.common.utils.http_client import AsyncHttp
 from plugp100.common.utils.json_utils import Json
 from plugp100.encryption.key_pair import KeyPair
 from plugp100.encryption.tp_link_cipher import TpLinkCipher, TpLinkCipherCryptography
+from plugp100.instrumentation.request_instrumentation import (
+    DISABLED_TIMER,
+    RequestTimer,
+    ENCRYPT,
+    HTTP,
+    DECRYPT,
+    PARSE,
+)
 from plugp100.responses.tapo_response import TapoResponse
 
 
@@ -108,7 +116,7 @@ class SecurePassthroughTransport:
             return response_or_error
 
     async def send(
-        self, request: TapoRequest, session: Session
+        self, request: TapoRequest, session: Session, timer: RequestTimer = DISABLED_TIMER
     ) -> Try[TapoResponse[Json]]:
         request.with_request_id(
             self._request_id_generator.generate_id()
@@ -119,6 +127,7 @@ class SecurePassthroughTransport:
         logger.debug(f"Raw request: {raw_request}")
 
         encrypted_request = session.chiper.encrypt(raw_request)
+        timer.phase(ENCRYPT)
         passthrough_request = TapoRequest.secure_passthrough(
             SecurePassthroughParams(encrypted_request)
         )
@@ -134,18 +143,18 @@ class SecurePassthroughTransport:
         )
         response_as_dict: dict = await response_encrypted.json(content_type=None)
         logger.debug(f"Device responded with: {response_as_dict}")
+        timer.phase(HTTP)
 
-        response_json = (
-            TapoResponse.try_from_json(response_as_dict)
-            .map(
-                lambda response: jsons.loads(
-                    session.chiper.decrypt(response.result["response"])
-                )
-            )
-            .flat_map(
-                lambda decrypted_response: TapoResponse.try_from_json(decrypted_response)
+        decrypted_json = TapoResponse.try_from_json(response_as_dict).map(
+            lambda response: jsons.loads(
+                session.chiper.decrypt(response.result["response"])
             )
         )
+        timer.phase(DECRYPT)
+        response_json = decrypted_json.flat_map(
+            lambda decrypted_response: TapoResponse.try_from_json(decrypted_response)
+        )
+        timer.phase(PARSE)
         logger.debug(f"Decrypted response: {response_json}")
 
         return response_json
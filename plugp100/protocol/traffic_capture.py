@@ -0,0 +1,263 @@
+import asyncio
+import dataclasses
+import gzip
+import json
+import logging
+import time
+from typing import Any, Optional, List, Dict, Tuple
+
+import jsons
+
+from plugp100.api.requests.tapo_request import TapoRequest
+from plugp100.common.functional.tri import Try, Failure
+from plugp100.common.utils.json_utils import Json
+from plugp100.protocol.tapo_protocol import TapoProtocol
+from plugp100.responses.tapo_exception import TapoException
+from plugp100.responses.tapo_response import TapoResponse
+
+_LOGGER = logging.getLogger("TrafficCapture")
+
+# fields that change on each request and must not be part of the replay key
+_VOLATILE_REQUEST_FIELDS = {"requestID", "request_time_milis", "terminal_uuid"}
+
+
+@dataclasses.dataclass
+class TrafficRecord:
+    """
+    A decrypted request with its response, as seen by the protocol. `response` holds
+    error_code, result and msg of the device response; `error` the message of an
+    exception raised before a response was available, e.g. a connection error.
+    """
+
+    timestamp: float
+    duration: float
+    host: str
+    protocol: str
+    request: Json
+    response: Optional[Json] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Json:
+        data = {
+            "t": round(self.timestamp, 6),
+            "d": round(self.duration, 6),
+            "h": self.host,
+            "p": self.protocol,
+            "q": self.request,
+        }
+        if self.response is not None:
+            data["r"] = self.response
+        if self.error is not None:
+            data["e"] = self.error
+        return data
+
+    @staticmethod
+    def from_dict(data: Json) -> "TrafficRecord":
+        return TrafficRecord(
+            timestamp=data["t"],
+            duration=data["d"],
+            host=data["h"],
+            protocol=data["p"],
+            request=data["q"],
+            response=data.get("r", None),
+            error=data.get("e", None),
+        )
+
+    @property
+    def method(self) -> str:
+        return self.request.get("method", "")
+
+
+class TrafficRecorder:
+    """
+    Append traffic records to a file, one compact json object for each line, gzip
+    compressed when the path ends with `.gz`. Records are buffered and written outside
+    the event loop every `flush_every` records and on `close`.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self._path = path
+        self._flush_every = flush_every
+        self._pending: List[str] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    async def append(self, record: TrafficRecord):
+        self._pending.append(json.dumps(record.as_dict(), separators=(",", ":")))
+        if len(self._pending) >= self._flush_every:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            lines, self._pending = self._pending, []
+            if lines:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+    async def close(self):
+        await self.flush()
+
+    def _write(self, lines: List[str]):
+        text = "".join(f"{line}\n" for line in lines)
+        if self._path.endswith(".gz"):
+            # each flush is a gzip member, readers decode concatenated members
+            with gzip.open(self._path, "at", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(text)
+
+
+def load_traffic(path: str, host: Optional[str] = None) -> List[TrafficRecord]:
+    """
+    @param path: file written by `TrafficRecorder`
+    @param host: keep only records of this host, all when None
+    @return: records in the order they were recorded
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = TrafficRecord.from_dict(json.loads(line))
+                if host is None or record.host == host:
+                    records.append(record)
+    return records
+
+
+class RecordingProtocol(TapoProtocol):
+    """
+    Protocol decorator which records each request sent through the wrapped protocol,
+    after decryption, with its duration.
+    """
+
+    def __init__(self, protocol: TapoProtocol, recorder: TrafficRecorder, host: str):
+        self._protocol = protocol
+        self._recorder = recorder
+        self._host = host
+
+    @property
+    def name(self) -> str:
+        return self._protocol.name
+
+    @property
+    def protocol(self) -> TapoProtocol:
+        return self._protocol
+
+    async def send_request(
+        self, request: TapoRequest, retry: int = 3
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        timestamp = time.time()
+        started_at = time.perf_counter()
+        response = await self._protocol.send_request(request, retry)
+        duration = time.perf_counter() - started_at
+        record = TrafficRecord(
+            timestamp=timestamp,
+            duration=duration,
+            host=self._host,
+            protocol=self._protocol.name,
+            request=jsons.dump(request),
+        )
+        if response.is_success():
+            record.response = dataclasses.asdict(response.get())
+        elif isinstance(error := response.error(), TapoException):
+            record.response = {"error_code": error.error_code, "msg": str(error)}
+        else:
+            record.error = str(error)
+        try:
+            await self._recorder.append(record)
+        except Exception as e:
+            _LOGGER.warning(f"Failed to record request {request.method}: {e}")
+        return response
+
+    async def close(self):
+        await self._recorder.flush()
+        await self._protocol.close()
+
+
+class ReplayProtocol(TapoProtocol):
+    """
+    Protocol which answers with recorded responses, without network nor encryption.
+    Requests are matched on method and params; the responses of equal requests are
+    served in the recorded order, starting again from the first when `loop` is True.
+
+    Usage::
+
+        protocol = ReplayProtocol(load_traffic("hub.jsonl"), latency_scale=0)
+        hub = TapoHub("127.0.0.1", 80, TapoClient(credentials, "", protocol))
+    """
+
+    def __init__(
+        self,
+        records: List[TrafficRecord],
+        latency_scale: float = 1.0,
+        loop: bool = True,
+    ):
+        """
+        @param latency_scale: multiplier of recorded durations, 0 to answer immediately
+        @param loop: serve responses again once all the recorded ones were used
+        """
+        self._latency_scale = latency_scale
+        self._loop = loop
+        self._name = records[0].protocol if records else "Replay"
+        self._responses: Dict[str, List[TrafficRecord]] = {}
+        self._by_method: Dict[str, List[TrafficRecord]] = {}
+        self._next: Dict[Tuple[bool, str], int] = {}
+        for record in records:
+            self._responses.setdefault(_request_key(record.request), []).append(record)
+            self._by_method.setdefault(record.method, []).append(record)
+        self.served = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def send_request(
+        self, request: TapoRequest, retry: int = 3
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        dumped = jsons.dump(request)
+        record = self._take(True, _request_key(dumped), self._responses) or self._take(
+            False, request.method, self._by_method
+        )
+        if record is None:
+            return Failure(Exception(f"No recorded response for {request.method}"))
+        if self._latency_scale > 0:
+            await asyncio.sleep(record.duration * self._latency_scale)
+        self.served += 1
+        if record.response is None:
+            return Failure(Exception(record.error))
+        return TapoResponse.try_from_json(record.response)
+
+    async def close(self):
+        pass
+
+    def _take(
+        self, exact: bool, key: str, records: Dict[str, List[TrafficRecord]]
+    ) -> Optional[TrafficRecord]:
+        if not (candidates := records.get(key, None)):
+            return None
+        index = self._next.get((exact, key), 0)
+        if index >= len(candidates):
+            if not self._loop:
+                return None
+            index = 0
+        self._next[(exact, key)] = index + 1
+        return candidates[index]
+
+
+def _request_key(request: Json) -> str:
+    return json.dumps(_without_volatile_fields(request), sort_keys=True)
+
+
+def _without_volatile_fields(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: _without_volatile_fields(item)
+            for key, item in value.items()
+            if key not in _VOLATILE_REQUEST_FIELDS
+        }
+    elif isinstance(value, list):
+        return [_without_volatile_fields(item) for item in value]
+    return value
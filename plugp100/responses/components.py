@@ -1,8 +1,10 @@
 import dataclasses
 from typing import Any, Optional
 
+from plugp100.common.utils.json_utils import intern_str
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class Components:
     component_list: dict[str, Any]
 
@@ -10,7 +12,7 @@ class Components:
     def try_from_json(data: dict[str, Any]) -> "Components":
         if "component_list" in data:
             components = data.get("component_list", [])
-            return Components({c["id"]: c["ver_code"] for c in components})
+            return Components({intern_str(c["id"]): c["ver_code"] for c in components})
         return Components({})
 
     def __contains__(self, item):
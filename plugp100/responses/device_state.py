@@ -6,13 +6,14 @@ import semantic_version
 
 from plugp100.api.light_effect import LightEffect
 from plugp100.common.functional.tri import Try
+from plugp100.common.utils.json_utils import intern_str
 
 
 class DeviceState:
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class PlugDeviceState(DeviceState):
     info: "DeviceInfo"
     device_on: bool
@@ -39,7 +40,7 @@ class PlugDeviceState(DeviceState):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class LightDeviceState(DeviceState):
     info: "DeviceInfo"
     device_on: bool
@@ -65,7 +66,7 @@ class LightDeviceState(DeviceState):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class LedStripDeviceState(DeviceState):
     info: "DeviceInfo"
     device_on: bool
@@ -125,20 +126,48 @@ class DeviceInfo:
 
     is_hardware_v2: bool = property(lambda self: self.hardware_version == "2.0")
 
+    # one per device and per update: no instance dict, fields shared by devices of a
+    # same model are interned
+    __slots__ = (
+        "device_id",
+        "hardware_id",
+        "oem_id",
+        "firmware_version",
+        "hardware_version",
+        "ip",
+        "mac",
+        "nickname",
+        "model",
+        "type",
+        "overheated",
+        "ssid",
+        "signal_level",
+        "rssi",
+        "friendly_name",
+        "has_set_location_info",
+        "latitude",
+        "longitude",
+        "timezone",
+        "time_difference",
+        "language",
+    )
+
     def __init__(self, **kwargs):
         self.device_id = kwargs["device_id"]
-        self.hardware_id = kwargs["hw_id"]
-        self.oem_id = kwargs["oem_id"]
-        self.firmware_version = kwargs["fw_ver"]
-        self.hardware_version = kwargs["hw_ver"]
+        self.hardware_id = intern_str(kwargs["hw_id"])
+        self.oem_id = intern_str(kwargs["oem_id"])
+        self.firmware_version = intern_str(kwargs["fw_ver"])
+        self.hardware_version = intern_str(kwargs["hw_ver"])
         self.mac = kwargs["mac"]
         self.nickname = base64.b64decode(kwargs["nickname"]).decode("UTF-8")
-        self.model = kwargs["model"]
-        self.type = kwargs["type"]
+        self.model = intern_str(kwargs["model"])
+        self.type = intern_str(kwargs["type"])
         self.overheated = kwargs.get("overheated", False)
         self.ip = kwargs.get("ip")
         self.ssid = (
-            base64.b64decode(kwargs["ssid"]).decode() if "ssid" in kwargs else None
+            intern_str(base64.b64decode(kwargs["ssid"]).decode())
+            if "ssid" in kwargs
+            else None
         )
         self.signal_level = kwargs.get("signal_level", 0)
         self.rssi = kwargs.get("rssi", 0)
@@ -147,9 +176,9 @@ class DeviceInfo:
         self.has_set_location_info = kwargs.get("has_set_location_info", False)
         self.latitude = kwargs.get("latitude")
         self.longitude = kwargs.get("longitude")
-        self.timezone = kwargs.get("region")
+        self.timezone = intern_str(kwargs.get("region"))
         self.time_difference = kwargs.get("time_diff")
-        self.language = kwargs.get("lang")
+        self.language = intern_str(kwargs.get("lang"))
 
     def get_semantic_firmware_version(self) -> semantic_version.Version:
         pieces = self.firmware_version.split("Build")
@@ -162,7 +191,7 @@ class DeviceInfo:
             return semantic_version.Version("0.0.0")
 
 
-@dataclass
+@dataclass(slots=True)
 class HubDeviceState(DeviceState):
     info: "DeviceInfo"
     in_alarm: bool
@@ -4,6 +4,7 @@ from typing import Any
 import semantic_version
 
 from plugp100.common.functional.tri import Try
+from plugp100.common.utils.json_utils import intern_str
 
 
 class HubChildBaseInfo:
@@ -21,19 +22,35 @@ class HubChildBaseInfo:
     nickname: str
     last_onboarding_timestamp: int
 
+    __slots__ = (
+        "hardware_version",
+        "firmware_version",
+        "device_id",
+        "parent_device_id",
+        "mac",
+        "type",
+        "model",
+        "status",
+        "rssi",
+        "signal_level",
+        "at_low_battery",
+        "nickname",
+        "last_onboarding_timestamp",
+    )
+
     @staticmethod
     def from_json(kwargs: dict[str, Any]) -> Try["HubChildBaseInfo"]:
         return Try.of(lambda: HubChildBaseInfo(**kwargs))
 
     def __init__(self, **kwargs):
-        self.firmware_version = kwargs["fw_ver"]
-        self.hardware_version = kwargs["hw_ver"]
+        self.firmware_version = intern_str(kwargs["fw_ver"])
+        self.hardware_version = intern_str(kwargs["hw_ver"])
         self.device_id = kwargs["device_id"]
-        self.parent_device_id = kwargs["parent_device_id"]
+        self.parent_device_id = intern_str(kwargs["parent_device_id"])
         self.mac = kwargs["mac"]
-        self.type = kwargs["type"]
-        self.model = kwargs["model"]
-        self.status = kwargs.get("status", False)
+        self.type = intern_str(kwargs["type"])
+        self.model = intern_str(kwargs["model"])
+        self.status = intern_str(kwargs.get("status", False))
         self.rssi = kwargs.get("rssi", 0)
         self.signal_level = kwargs.get("signal_level", 0)
         self.at_low_battery = kwargs.get("at_low_battery", False)
@@ -12,7 +12,7 @@ class TRVState(Enum):
     OFF = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class KE100DeviceState:
     base_info: HubChildBaseInfo
 
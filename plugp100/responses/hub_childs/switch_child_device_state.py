@@ -5,7 +5,7 @@ from plugp100.common.functional.tri import Try
 from plugp100.responses.hub_childs.hub_child_base_info import HubChildBaseInfo
 
 
-@dataclass
+@dataclass(slots=True)
 class SwitchChildDeviceState:
     base_info: HubChildBaseInfo
     device_on: bool
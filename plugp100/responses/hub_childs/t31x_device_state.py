@@ -7,7 +7,7 @@ from plugp100.responses.hub_childs.hub_child_base_info import HubChildBaseInfo
 from plugp100.responses.temperature_unit import TemperatureUnit
 
 
-@dataclass
+@dataclass(slots=True)
 class T31DeviceState:
     base_info: HubChildBaseInfo
     report_interval_seconds: int  # Seconds between each report
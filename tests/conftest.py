@@ -1,3 +1,4 @@
+import copy
 import json
 from pathlib import Path
 from typing import Any, cast
@@ -103,6 +104,8 @@ class FakeProtocol(TapoProtocol):
             return _tapo_response_of({})
         elif method.startswith("control_child"):
             return await self._control_child(request)
+        elif method == "multipleRequest":
+            return await self._multiple_request(request)
         elif method.startswith("play_alarm"):
             self._data["get_device_info"]["in_alarm"] = True
             return _tapo_response_of({})
@@ -115,7 +118,7 @@ class FakeProtocol(TapoProtocol):
                 response = self._data.get(f"{method}_{page_index}", None)
             else:
                 response = self._data.get(method, {})
-            return _tapo_response_of(response)
+            return _tapo_response_of(copy.deepcopy(response))
 
     async def close(self):
         pass
@@ -135,6 +138,21 @@ class FakeProtocol(TapoProtocol):
             lambda x: _tapo_response_child_of(x.result)
         )
 
+    async def _multiple_request(
+        self, request: TapoRequest
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        responses = []
+        for nested_request in cast(MultipleRequestParams, request.params).requests:
+            response = await self.send_request(nested_request)
+            responses.append(
+                {
+                    "method": nested_request.method,
+                    "result": response.get().result,
+                    "error_code": 0,
+                }
+            )
+        return _tapo_response_of({"responses": responses})
+
 
 def _tapo_response_of(payload: dict[str, any]) -> Try[TapoResponse]:
     return Try.of(TapoResponse(error_code=0, result=payload, msg=""))
@@ -58,7 +58,7 @@ class SensorT310Test(unittest.IsolatedAsyncioTestCase):
 
     async def test_should_poll_button_events(self):
         unsub = self._device.subscribe_event_logs(
-            lambda event: print(event), EventSubscriptionOptions(2000, 500)
+            lambda event: print(event), EventSubscriptionOptions(2000)
         )
         await asyncio.sleep(60)
         unsub()
@@ -1,9 +1,15 @@
+import asyncio
 from typing import cast
+from unittest.mock import patch
 
 import pytest
 
+from plugp100.instrumentation.prometheus_exporter import PrometheusExporter
 from plugp100.new.child.tapohubchildren import TriggerButtonDevice
+from plugp100.new.components.trigger_log_component import TriggerLogComponent
 from plugp100.new.device_type import DeviceType
+from plugp100.new.event_polling.event_cursor_store import FileEventCursorStore
+from plugp100.new.event_polling.event_subscription import EventSubscriptionOptions
 from plugp100.new.tapohub import TapoHub
 
 button = pytest.mark.parametrize(
@@ -37,3 +43,70 @@ async def test_should_get_trigger_logs(device: TapoHub):
     assert len(events.events) <= 10
     assert events.event_start_id == 25
     assert events.size == events.event_start_id
+
+
+@button
+async def test_should_get_trigger_logs_cursor(device: TapoHub):
+    child = cast(TriggerButtonDevice, device.children[0])
+    batch = (
+        await child.get_component(TriggerLogComponent).get_event_logs_since(None)
+    ).get_or_raise()
+    assert batch.last_event_id == 25
+    assert len(batch.events) == 0
+
+
+@button
+async def test_hub_should_poll_children_logs_with_single_request(device: TapoHub):
+    child = cast(TriggerButtonDevice, device.children[0])
+    logs = device.client.protocol._data[f"get_trigger_logs_{child.device_id}"]
+    received = []
+    with patch.object(
+        device.client, "control_child", wraps=device.client.control_child
+    ) as control_child:
+        unsubscribe = device.subscribe_event_logs(
+            child, received.append, EventSubscriptionOptions(polling_interval_millis=10)
+        )
+        await asyncio.sleep(0.05)
+        logs["start_id"] = logs["sum"] = 26
+        logs["logs"].insert(0, {"timestamp": 1, "event": "singleClick", "id": 26})
+        await asyncio.sleep(0.05)
+        unsubscribe()
+
+    assert [event.id for event in received] == [26]
+    control_child.assert_not_called()
+
+
+@button
+async def test_should_resume_trigger_logs_from_stored_cursor(device: TapoHub, tmp_path):
+    child = cast(TriggerButtonDevice, device.children[0])
+    store = FileEventCursorStore(str(tmp_path / "cursors.json"))
+    await store.set_cursor(child.device_id, 23)
+    options = EventSubscriptionOptions(polling_interval_millis=10, cursor_store=store)
+    async with child.events(options) as events:
+        received = [await asyncio.wait_for(events.__anext__(), 1) for _ in range(2)]
+
+    assert [event.id for event in received] == [24, 25]
+    restarted_store = FileEventCursorStore(str(tmp_path / "cursors.json"))
+    assert await restarted_store.get_cursor(child.device_id) == 25
+
+
+@button
+async def test_should_export_trigger_logs_poll_trackers(device: TapoHub):
+    child = cast(TriggerButtonDevice, device.children[0])
+    options = EventSubscriptionOptions(polling_interval_millis=10_000)
+    unsubscribe_child = child.subscribe_event_logs(lambda _: None, options)
+    unsubscribe_hub = device.subscribe_event_logs(child, lambda _: None, options)
+    exporter = PrometheusExporter()
+    exporter.register_device(device)
+    text = exporter.render()
+    unsubscribe_child()
+    unsubscribe_hub()
+
+    host = device.host
+    assert f'{{tracker="{host}/{child.device_id}/trigger_logs"}} 10.0' in text
+    assert f'{{tracker="{host}/event_logs"}} 10.0' in text
+
+
+def test_debounce_option_should_be_deprecated():
+    with pytest.warns(DeprecationWarning):
+        EventSubscriptionOptions(polling_interval_millis=10, debounce_millis=500)
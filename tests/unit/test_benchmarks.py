@@ -0,0 +1,59 @@
+import json
+
+from benchmarks import e2e, memory, micro
+from benchmarks.runner import BenchmarkResult, compare_results
+
+
+def test_benchmark_result_should_compute_percentiles():
+    result = BenchmarkResult.from_samples("sample", [0.001 * i for i in range(1, 101)])
+    assert result.iterations == 100
+    assert 50 <= round(result.p50_ms) <= 51
+    assert 95 <= round(result.p95_ms) <= 96
+    assert round(result.ops_per_second) == round(100 / 5.05)
+
+
+def test_e2e_benchmarks_should_write_json_results(tmp_path):
+    output = str(tmp_path / "e2e.json")
+    e2e.main(
+        [
+            "--output",
+            output,
+            "--iterations",
+            "1",
+            "--fleet-sizes",
+            "2",
+            "--fleet-iterations",
+            "1",
+            "--encryption",
+            "klap",
+        ]
+    )
+    with open(output) as f:
+        report = json.load(f)
+    names = [result["name"] for result in report["results"]]
+    assert "update.hub.klap" in names
+    assert "hub.child_device_list.klap" in names
+    assert "hub.update_with_children.klap" in names
+    assert "fleet.poll.2.klap" in names
+    assert "replay.update.hub" in names
+    assert "replay.hub.update_with_children" in names
+    assert len(compare_results(output, output)) == len(names)
+
+
+def test_micro_benchmarks_should_write_json_results(tmp_path):
+    output = str(tmp_path / "micro.json")
+    micro.main(["--output", output, "--iterations", "2"])
+    with open(output) as f:
+        names = [result["name"] for result in json.load(f)["results"]]
+    assert "crypto.klap.encrypt.child_list_page" in names
+    assert "parse.trigger_logs.s200" in names
+
+
+def test_memory_benchmarks_should_write_json_results(tmp_path):
+    output = str(tmp_path / "memory.json")
+    memory.main(["--output", output, "--devices", "2"])
+    with open(output) as f:
+        results = {result["name"]: result for result in json.load(f)["results"]}
+    assert results["memory.fleet.plug"]["devices"] == 2
+    assert results["memory.fleet.plug"]["bytes_per_device"] > 0
+    assert "memory.fleet.hub_many_children.no_raw_state" in results
@@ -0,0 +1,126 @@
+import asyncio
+
+from plugp100.new.device_state_tracker import FieldChanged, DeviceStateTracker
+from plugp100.new.event_polling.change_stream import ChangeStream, ChangesDropped
+from plugp100.new.event_polling.poll_tracker import PollTracker
+from plugp100.new.tapohub import TapoHub
+from plugp100.new.tapoplug import TapoPlug
+from tests.conftest import plug, hub_lot_devices
+
+
+class FakeSubscription:
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def emit(self, change):
+        for callback in list(self.callbacks):
+            callback(change)
+
+
+async def test_should_subscribe_on_first_iteration_and_unsubscribe_on_close():
+    subscription = FakeSubscription()
+    stream = ChangeStream(subscription.subscribe)
+    assert len(subscription.callbacks) == 0
+    next_change = asyncio.create_task(stream.__anext__())
+    await asyncio.sleep(0)
+    subscription.emit("change")
+    assert await next_change == "change"
+    await stream.aclose()
+    assert len(subscription.callbacks) == 0
+    assert [change async for change in stream] == []
+
+
+async def test_should_drop_oldest_changes_when_buffer_is_full():
+    subscription = FakeSubscription()
+    async with ChangeStream(subscription.subscribe, max_buffer_size=2) as stream:
+        next_change = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0)
+        subscription.emit("first")
+        assert await next_change == "first"
+        for i in range(4):
+            subscription.emit(i)
+        assert await stream.__anext__() == ChangesDropped(2)
+        assert await stream.__anext__() == 2
+        assert await stream.__anext__() == 3
+        assert stream.dropped_changes == 2
+    assert len(subscription.callbacks) == 0
+
+
+async def test_should_pause_source_while_buffer_is_full():
+    subscription = FakeSubscription()
+    resumed = []
+
+    def pause():
+        return lambda: resumed.append(True)
+
+    async with ChangeStream(
+        subscription.subscribe, max_buffer_size=4, pause=pause
+    ) as stream:
+        next_change = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0)
+        for i in range(5):
+            subscription.emit(i)
+        assert await next_change == 0
+        assert [await stream.__anext__() for _ in range(2)] == [1, 2]
+        assert resumed == [True]
+        assert await stream.__anext__() == 3
+        assert stream.dropped_changes == 0
+    assert resumed == [True]
+
+
+async def test_poll_tracker_should_not_poll_while_paused():
+    polls = []
+    tracker = PollTracker(
+        state_provider=lambda last_state: polls.append(last_state) or 1,
+        state_tracker=DeviceStateTracker(),
+        interval_millis=10,
+    )
+    unsubscribe = tracker.subscribe(lambda change: None)
+    resume = tracker.pause()
+    await asyncio.sleep(0.05)
+    assert len(polls) <= 1
+    resume()
+    await asyncio.sleep(0.05)
+    unsubscribe()
+    assert len(polls) > 1
+
+
+async def test_should_unsubscribe_when_async_for_ends():
+    subscription = FakeSubscription()
+    stream = ChangeStream(subscription.subscribe)
+
+    async def _consume():
+        async for change in stream:
+            if change == "stop":
+                break
+
+    consumer = asyncio.create_task(_consume())
+    await asyncio.sleep(0)
+    assert len(subscription.callbacks) == 1
+    subscription.emit("stop")
+    await asyncio.wait_for(consumer, 1)
+    assert len(subscription.callbacks) == 0
+
+
+@plug
+async def test_should_stream_device_changes(device: TapoPlug):
+    await device.turn_off()
+    async with device.changes(polling_interval_millis=10) as changes:
+        next_change = asyncio.create_task(changes.__anext__())
+        await asyncio.sleep(0.03)
+        await device.turn_on()
+        assert await asyncio.wait_for(next_change, 1) == FieldChanged(
+            "device_on", False, True
+        )
+    assert device._state_poll_tracker._is_tracking is False
+
+
+@hub_lot_devices
+async def test_should_stream_hub_association_changes(device: TapoHub):
+    async with device.association_changes() as changes:
+        first_change = await asyncio.wait_for(changes.__anext__(), 1)
+        assert first_change.device_id in {child.device_id for child in device.children}
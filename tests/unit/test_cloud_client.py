@@ -0,0 +1,106 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from plugp100.discovery import DiscoveredDevice
+from plugp100.discovery.cloud_client import CloudClient
+from tests.conftest import load_fixture
+
+
+class FakeCloud:
+    def __init__(self):
+        self.logins = 0
+        self.expired_tokens = set()
+        self.runner = None
+        self.url = None
+
+    async def start(self) -> "FakeCloud":
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/"
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if body["method"] == "login":
+            self.logins += 1
+            await asyncio.sleep(0.1)
+            return web.json_response(
+                {"error_code": 0, "result": {"token": f"token-{self.logins}"}}
+            )
+        if request.query.get("token") in self.expired_tokens:
+            return web.json_response({"error_code": -20651, "msg": "Token expired"})
+        device = {"deviceMac": "AABBCCDDEEFF", "deviceId": "1", "role": 0, "status": 1}
+        return web.json_response({"error_code": 0, "result": {"deviceList": [device]}})
+
+
+async def test_cloud_client_should_reuse_token_and_refresh_when_expired():
+    cloud = await FakeCloud().start()
+    client = CloudClient(url=cloud.url)
+    async with aiohttp.ClientSession() as session:
+        await client.get_devices("user", "pass", session)
+        await client.get_devices("user", "pass", session)
+        assert cloud.logins == 1
+
+        cloud.expired_tokens.add("token-1")
+        devices = await client.get_devices("user", "pass", session)
+    await cloud.stop()
+    assert cloud.logins == 2
+    assert devices.get_or_raise()[0].deviceMac == "AABBCCDDEEFF"
+
+
+async def test_cloud_devices_should_be_merged_with_local_discovery():
+    cloud = await FakeCloud().start()
+
+    async def scan():
+        await asyncio.sleep(0.1)
+        return [
+            DiscoveredDevice.from_dict(
+                {**load_fixture("discovery.json"), "mac": "AA-BB-CC-DD-EE-FF"}
+            )
+        ]
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    async with aiohttp.ClientSession() as session:
+        devices = await CloudClient(url=cloud.url).get_devices_with_local_address(
+            "user", "pass", session, scan=scan
+        )
+    await cloud.stop()
+    assert loop.time() - start < 0.2
+    assert devices.get_or_raise()[0].ipAddress == "1.2.3.4"
+
+
+async def test_cloud_devices_should_be_returned_when_local_discovery_fails():
+    cloud = await FakeCloud().start()
+
+    async def scan():
+        raise PermissionError("broadcast not permitted")
+
+    async with aiohttp.ClientSession() as session:
+        devices = await CloudClient(url=cloud.url).get_devices_with_local_address(
+            "user", "pass", session, scan=scan
+        )
+    await cloud.stop()
+    assert devices.get_or_raise()[0].deviceMac == "AABBCCDDEEFF"
+    assert devices.get_or_raise()[0].ipAddress is None
+
+
+async def test_cloud_client_should_login_again_when_password_changes():
+    cloud = await FakeCloud().start()
+    client = CloudClient(url=cloud.url)
+    async with aiohttp.ClientSession() as session:
+        await client.get_devices("user", "pass", session)
+        await client.get_devices("user", "wrong", session)
+        await client.get_devices("user", "wrong", session)
+    await cloud.stop()
+    assert cloud.logins == 2
@@ -0,0 +1,54 @@
+from unittest.mock import patch, AsyncMock
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Failure
+from plugp100.new.connection_registry import ConnectionRegistry
+from plugp100.new.device_factory import DeviceConnectConfiguration
+from plugp100.new.tapoplug import TapoPlug
+from tests.conftest import FakeProtocol, load_fixture
+
+
+class RejectingProtocol(FakeProtocol):
+    async def send_request(self, request, retry=3):
+        return Failure(Exception("handshake rejected"))
+
+
+async def test_registry_should_record_effective_configuration(tmp_path):
+    path = str(tmp_path / "connections.json")
+    config = DeviceConnectConfiguration(
+        host="1.2.3.4",
+        credentials=AuthCredential("user", "pass"),
+        encryption_type="klap",
+        encryption_version=2,
+    )
+    with patch("plugp100.new.device_factory._get_or_guess_protocol") as mock:
+        mock.side_effect = AsyncMock(return_value=FakeProtocol(load_fixture("p100.json")))
+        device = await ConnectionRegistry(path).connect(config)
+
+    recorded = await ConnectionRegistry(path).get("1.2.3.4")
+    assert isinstance(device, TapoPlug)
+    assert recorded == DeviceConnectConfiguration(
+        host="1.2.3.4",
+        port=80,
+        device_type="SMART.TAPOPLUG",
+        encryption_type="klap",
+        encryption_version=2,
+    )
+    assert await ConnectionRegistry(path).get_device_class("1.2.3.4") == "TapoPlug"
+
+
+async def test_registry_should_invalidate_rejected_configuration():
+    registry = ConnectionRegistry()
+    config = DeviceConnectConfiguration(host="1.2.3.4", device_type="SMART.TAPOPLUG")
+    plug_data = load_fixture("p100.json")
+    with patch("plugp100.new.device_factory._get_or_guess_protocol") as mock:
+        mock.side_effect = AsyncMock(return_value=FakeProtocol(plug_data))
+        await registry.connect(config)
+        mock.side_effect = AsyncMock(
+            side_effect=[RejectingProtocol(plug_data), FakeProtocol(plug_data)]
+        )
+        await registry.connect(
+            DeviceConnectConfiguration(host="1.2.3.4", device_type="SMART.TAPOBULB")
+        )
+
+    assert (await registry.get("1.2.3.4")).device_type == "SMART.TAPOBULB"
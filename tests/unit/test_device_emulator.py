@@ -0,0 +1,151 @@
+import time
+
+import aiohttp
+import pytest
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import (
+    DeviceEmulator,
+    EmulatorFaults,
+    start_emulators,
+    stop_emulators,
+)
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapohub import TapoHub
+from plugp100.new.tapoplug import TapoPlug
+from tests.conftest import load_fixture
+
+credentials = AuthCredential("user@example.com", "password")
+
+
+@pytest.mark.parametrize(
+    "encryption_type, encryption_version, protocol_version",
+    [("klap", 2, "Klap V2"), ("klap", 1, "Klap V1"), ("aes", None, "Passthrough")],
+)
+async def test_should_connect_to_emulated_device(
+    encryption_type, encryption_version, protocol_version
+):
+    async with DeviceEmulator(
+        load_fixture("p100.json"),
+        credentials,
+        encryption_type=encryption_type,
+        encryption_version=encryption_version or 2,
+    ) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                encryption_type=encryption_type,
+                encryption_version=encryption_version,
+            )
+        )
+        await device.update()
+        await device.turn_on()
+        await device.update()
+        await device.client.close()
+
+    assert isinstance(device, TapoPlug)
+    assert device.protocol_version == protocol_version
+    assert device.is_on is True
+
+
+async def test_should_guess_protocol_of_emulated_hub():
+    async with DeviceEmulator(
+        load_fixture("h100_lot_devices.json"), credentials
+    ) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(emulator.host, emulator.port, credentials)
+        )
+        await device.update()
+        await device.client.close()
+
+    assert isinstance(device, TapoHub)
+    assert device.protocol_version == "Klap V2"
+    assert len(device.children) > 0
+
+
+async def test_should_reject_wrong_credentials():
+    async with DeviceEmulator(
+        load_fixture("p100.json"), credentials
+    ) as emulator, aiohttp.ClientSession(
+        cookie_jar=aiohttp.CookieJar(unsafe=True)
+    ) as session:
+        with pytest.raises(Exception):
+            await connect(
+                DeviceConnectConfiguration(
+                    emulator.host,
+                    emulator.port,
+                    AuthCredential("user@example.com", "wrong"),
+                    encryption_type="klap",
+                    encryption_version=2,
+                ),
+                session,
+            )
+
+
+async def test_should_inject_latency_and_errors():
+    faults = EmulatorFaults(latency_seconds=0.05, error_rate=1)
+    async with DeviceEmulator(
+        load_fixture("p100.json"), credentials, encryption_type="aes", faults=faults
+    ) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                device_type="SMART.TAPOPLUG",
+                encryption_type="aes",
+            )
+        )
+        start = time.monotonic()
+        response = await device.client.get_device_info()
+        await device.client.close()
+
+    assert time.monotonic() - start >= 0.1
+    assert response.is_failure()
+    assert emulator.stats.injected_errors > 0
+
+
+async def test_should_rate_limit_requests():
+    faults = EmulatorFaults(max_requests_per_second=2)
+    async with DeviceEmulator(
+        load_fixture("p100.json"), credentials, faults=faults
+    ) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                device_type="SMART.TAPOPLUG",
+                encryption_type="klap",
+                encryption_version=2,
+            )
+        )
+        responses = [await device.client.get_device_info() for _ in range(3)]
+        await device.client.close()
+
+    assert [response.is_success() for response in responses] == [True, True, False]
+    assert emulator.stats.rate_limited == 1
+
+
+async def test_should_start_many_emulators():
+    emulators = await start_emulators(load_fixture("p100.json"), credentials, count=20)
+    try:
+        assert len({emulator.port for emulator in emulators}) == 20
+    finally:
+        await stop_emulators(emulators)
+
+
+@pytest.mark.parametrize("encryption_type", ["klap", "aes"])
+async def test_should_reject_requests_without_session_cookie(encryption_type):
+    async with DeviceEmulator(
+        load_fixture("p100.json"), credentials, encryption_type=encryption_type
+    ) as emulator, aiohttp.ClientSession() as session:
+        if encryption_type == "klap":
+            await session.post(f"{emulator.url}/handshake1", data=bytes(16))
+            url = f"{emulator.url}/handshake2"
+        else:
+            url = emulator.url
+        async with session.post(url, data=b'{"method": "securePassthrough"}') as r:
+            assert r.status == 403
@@ -0,0 +1,66 @@
+import asyncio
+
+from plugp100.new.device_state_tracker import (
+    DeviceStateTracker,
+    FieldChanged,
+    FieldAdded,
+    FieldRemoved,
+)
+from plugp100.new.tapoplug import TapoPlug
+from tests.conftest import plug
+
+
+async def test_should_not_emit_changes_on_first_state():
+    tracker = DeviceStateTracker()
+    await tracker.notify_state_update({"device_on": True})
+    assert tracker._change_queue.empty()
+
+
+async def test_should_diff_fields_and_skip_ignored_ones():
+    tracker = DeviceStateTracker()
+    await tracker.notify_state_update(
+        {"device_on": False, "rssi": -40, "nested": {"a": 1}, "removed": 1}
+    )
+    await tracker.notify_state_update(
+        {"device_on": True, "rssi": -60, "nested": {"a": 2}, "added": 2}
+    )
+    changes = [tracker._change_queue.get_nowait() for _ in range(4)]
+    assert changes == [
+        FieldAdded("added", 2),
+        FieldChanged("device_on", False, True),
+        FieldChanged("nested.a", 1, 2),
+        FieldRemoved("removed", 1),
+    ]
+    assert tracker._change_queue.empty()
+
+
+@plug
+async def test_should_subscribe_device_state_changes(device: TapoPlug):
+    changes = []
+    await device.turn_off()
+    unsubscribe = device.subscribe_state_changes(
+        changes.append, polling_interval_millis=10
+    )
+    await asyncio.sleep(0.03)
+    await device.turn_on()
+    await asyncio.sleep(0.03)
+    unsubscribe()
+    assert FieldChanged("device_on", False, True) in changes
+
+
+@plug
+async def test_should_track_changes_when_raw_state_is_dropped(device: TapoPlug):
+    device.keep_raw_state = False
+    assert device.raw_state is None
+    changes = []
+    await device.turn_off()
+    unsubscribe = device.subscribe_state_changes(
+        changes.append, polling_interval_millis=10
+    )
+    await asyncio.sleep(0.03)
+    await device.turn_on()
+    await asyncio.sleep(0.03)
+    unsubscribe()
+    assert FieldChanged("device_on", False, True) in changes
+    assert device.is_on is True
+    assert device.raw_state is None
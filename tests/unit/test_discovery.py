@@ -1,7 +1,19 @@
-from unittest.mock import patch, AsyncMock
+import asyncio
+import time
+from contextlib import aclosing
+from unittest.mock import patch, AsyncMock, MagicMock
 
 from plugp100.common.credentials import AuthCredential
-from plugp100.discovery import DiscoveredDevice
+from plugp100.discovery import (
+    DiscoveredDevice,
+    TapoDiscovery,
+    RSASessionProvider,
+    DiscoveryTarget,
+)
+from plugp100.discovery.tapo_discovery import (
+    _build_packet_for_payload_json,
+    PKT_ONBOARD_RESPONSE,
+)
 from plugp100.new.tapobulb import TapoBulb
 from tests.conftest import load_fixture
 
@@ -42,3 +54,248 @@ async def test_should_not_get_device_info_if_discovery_has_type():
         )
         send_request.assert_not_called()
         assert device is not None
+
+
+class FakeDiscoverableDevice(asyncio.DatagramProtocol):
+    def __init__(self, discovery_result: dict, delay: float = 0):
+        self.discovery_result = discovery_result
+        self.delay = delay
+        self.received_packets = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received_packets += 1
+        response = _build_packet_for_payload_json(
+            {"error_code": 0, "result": self.discovery_result},
+            PKT_ONBOARD_RESPONSE,
+            data[8:12],
+        )
+        asyncio.get_running_loop().call_later(
+            self.delay, self.transport.sendto, response, addr
+        )
+
+    @property
+    def port(self) -> int:
+        return self.transport.get_extra_info("sockname")[1]
+
+
+async def start_fake_device(
+    discovery_result: dict, delay: float = 0, host="127.0.0.1", port: int = 0
+):
+    _, device = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: FakeDiscoverableDevice(discovery_result, delay), local_addr=(host, port)
+    )
+    return device
+
+
+async def test_should_scan_devices():
+    fake_device = await start_fake_device(load_fixture("discovery.json"))
+    devices = await TapoDiscovery.scan(
+        timeout=0.2, broadcast="127.0.0.1", port=fake_device.port
+    )
+    fake_device.transport.close()
+    assert devices == [DiscoveredDevice.from_dict(load_fixture("discovery.json"))]
+
+
+async def test_single_scan_should_return_as_soon_as_device_answers():
+    fake_device = await start_fake_device(load_fixture("discovery.json"))
+    start = time.monotonic()
+    device = await TapoDiscovery.single_scan(
+        "127.0.0.1", timeout=5, port=fake_device.port
+    )
+    fake_device.transport.close()
+    assert device.mac == load_fixture("discovery.json")["mac"]
+    assert time.monotonic() - start < 5
+
+
+async def test_scan_should_be_cancellable():
+    scan = asyncio.create_task(TapoDiscovery.scan(timeout=5, broadcast="127.0.0.1"))
+    await asyncio.sleep(0.1)
+    scan.cancel()
+    await asyncio.gather(scan, return_exceptions=True)
+    assert scan.cancelled()
+
+
+async def test_stream_should_yield_devices_before_timeout():
+    fake_device = await start_fake_device(load_fixture("discovery.json"))
+    start = time.monotonic()
+    async with aclosing(
+        TapoDiscovery.stream(timeout=5, broadcast="127.0.0.1", port=fake_device.port)
+    ) as stream:
+        async for discovered in stream:
+            assert discovered.mac == load_fixture("discovery.json")["mac"]
+            assert time.monotonic() - start < 5
+            break
+    fake_device.transport.close()
+
+
+async def test_scan_and_connect_should_connect_while_discovering():
+    fake_device = await start_fake_device(load_fixture("discovery.json"))
+    results = [
+        result
+        async for result in TapoDiscovery.scan_and_connect(
+            AuthCredential("test", "test"),
+            timeout=0.2,
+            broadcast="127.0.0.1",
+            port=fake_device.port,
+            update_state=False,
+        )
+    ]
+    fake_device.transport.close()
+    assert len(results) == 1
+    discovered, device = results[0]
+    assert discovered.ip == "1.2.3.4"
+    assert isinstance(device.get_or_raise(), TapoBulb)
+
+
+async def test_scan_and_connect_should_close_devices_not_yielded():
+    discovered = [
+        DiscoveredDevice.from_dict({**load_fixture("discovery.json"), "ip": f"1.2.3.{i}"})
+        for i in range(3)
+    ]
+    devices = []
+
+    async def _stream(*args):
+        for device in discovered:
+            yield device
+        await asyncio.sleep(1)
+
+    async def _get_tapo_device(*args):
+        devices.append(MagicMock(client=MagicMock(close=AsyncMock())))
+        return devices[-1]
+
+    with patch.object(TapoDiscovery, "stream", _stream), patch.object(
+        DiscoveredDevice, "get_tapo_device", side_effect=_get_tapo_device
+    ):
+        async with aclosing(
+            TapoDiscovery.scan_and_connect(
+                AuthCredential("test", "test"), update_state=False
+            )
+        ) as results:
+            async for _, device in results:
+                first = device.get_or_raise()
+                await asyncio.sleep(0.05)
+                break
+
+    assert len(devices) == 3
+    others = [device for device in devices if device is not first]
+    assert [device.client.close.await_count for device in others] == [1, 1]
+    first.client.close.assert_not_awaited()
+
+
+async def test_rsa_session_should_be_generated_once_and_reused():
+    provider = RSASessionProvider(lifetime_seconds=3600)
+    sessions = await asyncio.gather(*[provider.get_session() for _ in range(3)])
+    assert all(session is sessions[0] for session in sessions)
+    assert await provider.get_session() is sessions[0]
+
+
+async def test_rsa_session_should_be_regenerated_when_expired():
+    provider = RSASessionProvider(lifetime_seconds=0)
+    first = await provider.get_session()
+    assert await provider.get_session() is not first
+
+
+async def test_rsa_session_should_be_generated_again_after_failure():
+    provider = RSASessionProvider(lifetime_seconds=3600)
+    with patch(
+        "plugp100.discovery.rsa_session.RSASession", side_effect=ValueError("no entropy")
+    ):
+        results = await asyncio.gather(
+            provider.get_session(), provider.get_session(), return_exceptions=True
+        )
+    assert all(isinstance(result, ValueError) for result in results)
+    session = await provider.get_session()
+    assert await provider.get_session() is session
+
+
+async def test_scan_networks_should_merge_devices_by_mac():
+    discovery_data = load_fixture("discovery.json")
+    other_device_data = {**discovery_data, "mac": "AA-BB-CC-DD-EE-FF", "ip": "1.2.3.5"}
+    first = await start_fake_device(discovery_data, delay=0.05)
+    same_device = await start_fake_device(
+        discovery_data, host="127.0.0.2", port=first.port
+    )
+    other_device = await start_fake_device(
+        other_device_data, host="127.0.0.3", port=first.port
+    )
+    start = time.monotonic()
+    devices = await TapoDiscovery.scan_networks(
+        timeout=0.3,
+        targets=["127.0.0.1", DiscoveryTarget("127.0.0.2"), "127.0.0.3"],
+        port=first.port,
+    )
+    for fake_device in [first, same_device, other_device]:
+        fake_device.transport.close()
+    assert time.monotonic() - start < 0.6
+    assert sorted(device.mac for device in devices) == sorted(
+        [discovery_data["mac"], other_device_data["mac"]]
+    )
+
+
+async def test_sweep_should_discover_devices_in_cidr_range():
+    discovery_data = load_fixture("discovery.json")
+    other_device_data = {**discovery_data, "mac": "AA-BB-CC-DD-EE-FF", "ip": "1.2.3.5"}
+    first = await start_fake_device(discovery_data)
+    other_device = await start_fake_device(
+        other_device_data, host="127.0.0.2", port=first.port
+    )
+    start = time.monotonic()
+    devices = await TapoDiscovery.sweep(
+        "127.0.0.0/29", timeout=0.2, port=first.port, packets_per_second=20
+    )
+    first.transport.close()
+    other_device.transport.close()
+    assert time.monotonic() - start >= 0.25  # 6 hosts paced at 20 packets/s
+    assert first.received_packets == 1
+    assert sorted(device.mac for device in devices) == sorted(
+        [discovery_data["mac"], other_device_data["mac"]]
+    )
+
+
+async def test_discover_should_count_malformed_packets():
+    class MalformedDevice(FakeDiscoverableDevice):
+        def datagram_received(self, data, addr):
+            self.transport.sendto(b"not a discovery packet", addr)
+
+    fake_device = await start_fake_device(load_fixture("discovery.json"))
+    _, malformed_device = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: MalformedDevice({}), local_addr=("127.0.0.2", fake_device.port)
+    )
+    found = []
+    stats = await TapoDiscovery(None, fake_device.port, 0.2, workers=2).discover(
+        found.append, addresses=["127.0.0.1", "127.0.0.2"]
+    )
+    fake_device.transport.close()
+    malformed_device.transport.close()
+    assert len(found) == 1
+    assert (stats.received, stats.decoded, stats.malformed, stats.dropped) == (2, 1, 1, 0)
+
+
+async def test_discover_should_keep_reporting_devices_after_callback_error():
+    discovery_data = load_fixture("discovery.json")
+    other_device_data = {**discovery_data, "mac": "AA-BB-CC-DD-EE-FF", "ip": "1.2.3.5"}
+    first = await start_fake_device(discovery_data)
+    other_device = await start_fake_device(
+        other_device_data, delay=0.05, host="127.0.0.2", port=first.port
+    )
+    found = []
+
+    def on_discovered(result: dict):
+        found.append(result)
+        if len(found) == 1:
+            raise ValueError("callback failure")
+
+    stats = await TapoDiscovery(None, first.port, 0.3, workers=1).discover(
+        on_discovered, addresses=["127.0.0.1", "127.0.0.2"]
+    )
+    first.transport.close()
+    other_device.transport.close()
+    assert [result["mac"] for result in found] == [
+        discovery_data["mac"],
+        other_device_data["mac"],
+    ]
+    assert stats.callback_errors == 1
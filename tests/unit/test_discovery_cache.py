@@ -0,0 +1,41 @@
+from plugp100.discovery import DiscoveredDevice, DiscoveryCache
+from tests.conftest import load_fixture
+
+
+def _device(mac: str, ip: str) -> DiscoveredDevice:
+    return DiscoveredDevice.from_dict(
+        {**load_fixture("discovery.json"), "mac": mac, "ip": ip}
+    )
+
+
+async def test_cache_should_be_restored_from_file(tmp_path):
+    path = str(tmp_path / "discovery.json")
+    await DiscoveryCache(path).update([_device("AA-BB", "10.0.0.1")])
+
+    restored = await DiscoveryCache(path).load()
+
+    assert restored == [_device("AA-BB", "10.0.0.1")]
+
+
+async def test_cache_should_expire_entries_by_ttl():
+    now = 1000.0
+    cache = DiscoveryCache(ttl_seconds=60, clock=lambda: now)
+    await cache.update([_device("AA", "10.0.0.1")])
+    now += 30
+    await cache.update([_device("BB", "10.0.0.2")])
+
+    assert await cache.get("aa") == _device("AA", "10.0.0.1")
+    now += 40
+    assert await cache.load() == [_device("BB", "10.0.0.2")]
+
+
+async def test_refresh_should_update_cached_devices():
+    cache = DiscoveryCache()
+    await cache.update([_device("AA", "10.0.0.1")])
+
+    async def scan():
+        return [_device("AA", "10.0.0.7")]
+
+    await cache.refresh(scan)
+
+    assert (await cache.get("AA")).ip == "10.0.0.7"
@@ -0,0 +1,38 @@
+import asyncio
+
+from plugp100.discovery import DiscoveredDevice
+from plugp100.discovery.discovery_monitor import (
+    DiscoveryMonitor,
+    DiscoveredDeviceAdded,
+    DiscoveredDeviceRemoved,
+    DiscoveredDeviceIpChanged,
+)
+from tests.conftest import load_fixture
+
+
+def _device(mac: str, ip: str) -> DiscoveredDevice:
+    return DiscoveredDevice.from_dict(
+        {**load_fixture("discovery.json"), "mac": mac, "ip": ip}
+    )
+
+
+async def test_should_emit_presence_changes_between_scans():
+    scans = [
+        [_device("AA", "10.0.0.1"), _device("BB", "10.0.0.2")],
+        [_device("AA", "10.0.0.5")],
+        [_device("AA", "10.0.0.5")],
+    ]
+
+    async def scan():
+        return scans.pop(0) if len(scans) > 1 else scans[0]
+
+    monitor = DiscoveryMonitor(scan, interval_millis=10, missed_scans_before_removal=2)
+    async with monitor.changes() as changes:
+        events = [await asyncio.wait_for(changes.__anext__(), 1) for _ in range(4)]
+
+    assert sorted(
+        e.device.mac for e in events[:2] if isinstance(e, DiscoveredDeviceAdded)
+    ) == ["AA", "BB"]
+    assert events[2] == DiscoveredDeviceIpChanged(_device("AA", "10.0.0.5"), "10.0.0.1")
+    assert events[3] == DiscoveredDeviceRemoved(_device("BB", "10.0.0.2"))
+    assert list(monitor.devices.keys()) == ["AA"]
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from unittest.mock import MagicMock, AsyncMock
+
+from plugp100.common.functional.tri import Try
+from plugp100.new.event_polling.event_logs_cursor import fetch_event_logs_since
+from plugp100.new.event_polling.hub_event_logs_poller import HubEventLogsPoller
+from plugp100.new.event_polling.event_cursor_store import InMemoryEventCursorStore
+from plugp100.new.event_polling.event_subscription import (
+    EventLogsStateTracker,
+    EventLogsCheckpoint,
+    EventLogsDispatcher,
+    EventSubscriptionOptions,
+)
+from plugp100.responses.hub_childs.s200b_device_state import SingleClickEvent
+from plugp100.responses.hub_childs.trigger_log_response import TriggerLogResponse
+
+
+class FakeEventLogs:
+    def __init__(self, last_event_id: int, capacity: int = 1000):
+        self.capacity = capacity
+        self.events = []
+        self.requests = []
+        self.push(last_event_id)
+
+    def push(self, count: int):
+        next_id = self.events[0].id + 1 if self.events else 1
+        new_events = [
+            SingleClickEvent(next_id + i, 1000 + next_id + i) for i in range(count)
+        ]
+        self.events = (list(reversed(new_events)) + self.events)[: self.capacity]
+
+    async def fetch(self, page_size: int, start_id: int) -> Try[TriggerLogResponse]:
+        self.requests.append((page_size, start_id))
+        latest_id = self.events[0].id if self.events else 0
+        events = [e for e in self.events if start_id == 0 or e.id <= start_id]
+        return Try.of(TriggerLogResponse(latest_id, latest_id, events[:page_size]))
+
+
+async def test_should_only_init_cursor_on_first_fetch():
+    logs = FakeEventLogs(25)
+    batch = (await fetch_event_logs_since(logs.fetch, None, page_size=5)).get_or_raise()
+    assert batch.last_event_id == 25
+    assert batch.events == []
+    assert batch.gap is None
+
+
+async def test_should_page_over_all_new_events():
+    logs = FakeEventLogs(25)
+    logs.push(12)
+    batch = (await fetch_event_logs_since(logs.fetch, 25, page_size=5)).get_or_raise()
+    assert [e.id for e in batch.events] == list(range(26, 38))
+    assert batch.last_event_id == 37
+    assert batch.gap is None
+    assert len(logs.requests) == 3
+
+
+async def test_should_not_fetch_more_pages_when_no_new_events():
+    logs = FakeEventLogs(25)
+    batch = (await fetch_event_logs_since(logs.fetch, 25, page_size=5)).get_or_raise()
+    assert batch.events == []
+    assert len(logs.requests) == 1
+
+
+async def test_should_report_gap_when_events_are_no_more_available():
+    logs = FakeEventLogs(25, capacity=10)
+    logs.push(15)
+    batch = (
+        await fetch_event_logs_since(logs.fetch, 25, page_size=5, max_pages=5)
+    ).get_or_raise()
+    assert [e.id for e in batch.events] == list(range(31, 41))
+    assert batch.gap.last_event_id == 25
+    assert batch.gap.missing_events == 5
+
+
+async def test_should_continue_from_oldest_events_after_burst_larger_than_pages():
+    logs = FakeEventLogs(25)
+    logs.push(40)
+    batches = []
+    cursor = 25
+    for _ in range(4):
+        batch = (
+            await fetch_event_logs_since(logs.fetch, cursor, page_size=5, max_pages=3)
+        ).get_or_raise()
+        batches.append(batch)
+        cursor = batch.last_event_id
+    assert [batch.last_event_id for batch in batches] == [38, 51, 64, 65]
+    assert [e.id for batch in batches for e in batch.events] == list(range(26, 66))
+    assert all(batch.gap is None for batch in batches)
+
+
+async def test_should_report_gap_when_log_is_reset():
+    logs = FakeEventLogs(3)
+    batch = (await fetch_event_logs_since(logs.fetch, 25, page_size=5)).get_or_raise()
+    assert [e.id for e in batch.events] == [1, 2, 3]
+    assert batch.gap.log_reset is True
+
+
+async def test_state_tracker_should_emit_gap_before_events():
+    logs = FakeEventLogs(25, capacity=5)
+    tracker = EventLogsStateTracker()
+    await tracker.notify_state_update(
+        (await fetch_event_logs_since(logs.fetch, None, page_size=5)).get_or_raise()
+    )
+    logs.push(7)
+    await tracker.notify_state_update(
+        (
+            await fetch_event_logs_since(
+                logs.fetch, tracker.get_last_state().last_event_id, page_size=5
+            )
+        ).get_or_raise()
+    )
+    assert await tracker.get_next_state_change() == EventLogsCheckpoint(25)
+    gap = await tracker.get_next_state_change()
+    assert gap.missing_events == 2
+    assert (await tracker.get_next_state_change()).id == 28
+
+
+async def test_dispatcher_should_save_cursor_after_callbacks_handled_events():
+    store = InMemoryEventCursorStore()
+    options = EventSubscriptionOptions(polling_interval_millis=10, cursor_store=store)
+    dispatcher = EventLogsDispatcher("child", options, logging.getLogger("test"))
+    handled = asyncio.Event()
+    received = []
+
+    async def callback(event):
+        await handled.wait()
+        received.append(event)
+
+    dispatcher.callbacks.append(callback)
+    dispatcher.dispatch(SingleClickEvent(id=26, timestamp=1))
+    dispatcher.dispatch(EventLogsCheckpoint(26))
+    await asyncio.sleep(0.01)
+    assert await store.get_cursor("child") is None
+    handled.set()
+    await asyncio.sleep(0.01)
+    assert len(received) == 1
+    assert await store.get_cursor("child") == 26
+
+
+def _fake_trigger_log_component(child_id: str):
+    return MagicMock(
+        device_id=child_id,
+        parse_event_logs=lambda json: Try.of(TriggerLogResponse(25, 25, [])),
+    )
+
+
+def _fake_hub_client():
+    client = MagicMock()
+    client.control_children = AsyncMock(
+        side_effect=lambda requests: Try.of([Try.of({})] * len(requests))
+    )
+    return client
+
+
+async def test_hub_poller_should_split_children_into_requests_of_max_size():
+    client = _fake_hub_client()
+    poller = HubEventLogsPoller(client, 60_000, max_children_per_request=2)
+    options = EventSubscriptionOptions(polling_interval_millis=60_000)
+    unsubscribes = [
+        poller.subscribe(
+            _fake_trigger_log_component(f"child{i}"), lambda _: None, options
+        )
+        for i in range(5)
+    ]
+    await asyncio.sleep(0.05)  # first poll
+    state = dict(poller.poll_tracker._state_tracker.get_last_state())
+    for unsubscribe in unsubscribes:
+        unsubscribe()
+
+    requests = client.control_children.await_args_list
+    assert [len(request.args[0]) for request in requests] == [2, 2, 1]
+    assert sorted(state) == [f"child{i}" for i in range(5)]
+
+
+async def test_hub_poller_should_forget_cursor_of_unsubscribed_child():
+    poller = HubEventLogsPoller(_fake_hub_client(), 60_000)
+    options = EventSubscriptionOptions(polling_interval_millis=60_000)
+    unsubscribe = poller.subscribe(
+        _fake_trigger_log_component("child"), lambda _: None, options
+    )
+    await asyncio.sleep(0.05)  # first poll
+    state_tracker = poller.poll_tracker._state_tracker
+    assert "child" in state_tracker.get_last_state()
+    unsubscribe()
+    assert "child" not in state_tracker.get_last_state()
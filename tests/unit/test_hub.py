@@ -1,5 +1,12 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from plugp100.new.child.tapohubchildren import MotionSensor, SmartDoorSensor
+from plugp100.new.components.trigger_log_component import TriggerLogComponent
 from plugp100.new.device_type import DeviceType
 from plugp100.new.tapohub import TapoHub
+from plugp100.responses.components import Components
 from tests.conftest import hub, hub_lot_devices
 
 
@@ -45,3 +52,31 @@ async def test_get_alarm_tones(device: TapoHub):
 @hub_lot_devices
 async def test_should_get_all_children(device: TapoHub):
     assert len(device.children) == 17
+
+
+@hub_lot_devices
+async def test_children_should_inherit_dropped_raw_state(device: TapoHub):
+    hub = TapoHub(device.host, device.port, device.client)
+    hub.keep_raw_state = False
+    await hub.update()
+
+    assert hub.raw_state is None
+    assert len(hub.children) == len(device.children)
+    assert all(child.raw_state is None for child in hub.children)
+    assert all(child.device_info.model is not None for child in hub.children)
+    assert not hasattr(hub.children[0], "__dict__")
+
+
+@pytest.mark.parametrize("device_class", [MotionSensor, SmartDoorSensor])
+def test_sensors_should_activate_trigger_log_only_when_supported(device_class):
+    sensor = device_class("127.0.0.1", None, MagicMock(), "child", "hub")
+    supported = Components({"trigger_log": 1})
+
+    def has_trigger_log(components: Components) -> bool:
+        return any(
+            isinstance(component, TriggerLogComponent)
+            for component in sensor._get_components_to_activate(components)
+        )
+
+    assert has_trigger_log(supported) is True
+    assert has_trigger_log(Components({})) is False
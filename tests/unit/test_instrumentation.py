@@ -0,0 +1,98 @@
+import pytest
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import DeviceEmulator
+from plugp100.instrumentation import (
+    INSTRUMENTATION,
+    LatencyHistogram,
+    RequestHistograms,
+    RequestInstrumentation,
+)
+from plugp100.instrumentation.request_instrumentation import DISABLED_TIMER
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from tests.conftest import load_fixture
+
+credentials = AuthCredential("user@example.com", "password")
+
+
+def test_histogram_percentiles_should_be_within_precision():
+    histogram = LatencyHistogram(relative_precision=0.01)
+    for value in range(1, 10001):
+        histogram.record(value / 1000)
+
+    assert histogram.count == 10000
+    assert histogram.percentile(50) == pytest.approx(5, rel=0.01)
+    assert histogram.percentile(99) == pytest.approx(9.9, rel=0.01)
+    assert histogram.percentile(100) == 10
+    assert histogram.mean == pytest.approx(5.0005)
+
+
+def test_disabled_instrumentation_should_not_time_requests():
+    instrumentation = RequestInstrumentation()
+    assert instrumentation.start_request("host", "method", "klap") is DISABLED_TIMER
+    unsubscribe = instrumentation.subscribe(lambda _: None)
+    assert instrumentation.start_request("host", "method", "klap") is not DISABLED_TIMER
+    unsubscribe()
+    assert not instrumentation.enabled
+
+
+@pytest.mark.parametrize("encryption_type", ["klap", "aes"])
+async def test_should_report_request_phases(encryption_type):
+    events = []
+    unsubscribe = INSTRUMENTATION.subscribe(events.append)
+    histograms = RequestHistograms().attach()
+    try:
+        async with DeviceEmulator(
+            load_fixture("p100.json"), credentials, encryption_type=encryption_type
+        ) as emulator:
+            device = await connect(
+                DeviceConnectConfiguration(
+                    emulator.host,
+                    emulator.port,
+                    credentials,
+                    device_type="SMART.TAPOPLUG",
+                    encryption_type=encryption_type,
+                    encryption_version=2,
+                )
+            )
+            for _ in range(3):
+                await device.client.get_device_info()
+            await device.client.close()
+    finally:
+        unsubscribe()
+        histograms.detach()
+
+    assert [event.method for event in events] == ["get_device_info"] * 3
+    assert all(event.success and event.host == "127.0.0.1" for event in events)
+    assert "handshake" in events[0].phases
+    assert "handshake" not in events[1].phases
+    assert {"encrypt", "http", "decrypt", "parse"} <= set(events[1].phases)
+    assert histograms.get_stats(host="127.0.0.1").requests == 3
+    assert histograms.get(method="get_device_info", phase="http").count == 3
+    assert histograms.get(method="other").count == 0
+
+
+async def test_should_report_retries_and_errors():
+    events = []
+    unsubscribe = INSTRUMENTATION.subscribe(events.append)
+    try:
+        async with DeviceEmulator(load_fixture("p100.json"), credentials) as emulator:
+            device = await connect(
+                DeviceConnectConfiguration(
+                    emulator.host,
+                    emulator.port,
+                    credentials,
+                    device_type="SMART.TAPOPLUG",
+                    encryption_type="klap",
+                    encryption_version=2,
+                )
+            )
+            await emulator.stop()
+            await device.client.get_device_info()
+            await device.client.close()
+    finally:
+        unsubscribe()
+
+    assert len(events) == 1
+    assert events[0].success is False
+    assert events[0].retries == 3
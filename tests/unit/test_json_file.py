@@ -0,0 +1,15 @@
+from plugp100.common.utils.json_file import JsonFile
+
+
+async def test_should_write_and_read_json_file(tmp_path):
+    path = tmp_path / "state.json"
+    await JsonFile(str(path)).write({"device": 1})
+    assert await JsonFile(str(path)).read() == {"device": 1}
+    assert not (tmp_path / "state.json.tmp").exists()
+
+
+async def test_should_read_missing_or_unreadable_file_as_empty(tmp_path):
+    path = tmp_path / "state.json"
+    assert await JsonFile(str(path)).read() == {}
+    path.write_text("{not json")
+    assert await JsonFile(str(path)).read() == {}
@@ -9,12 +9,14 @@ from plugp100.api.requests.tapo_request import TapoRequest
 from plugp100.api.tapo_client import TapoClient
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Success
+from plugp100.emulator import DeviceEmulator
 from plugp100.protocol.klap import (
     KlapHandshakeRevision,
     klap_handshake_v2,
     klap_handshake_v1,
 )
 from plugp100.protocol.klap.klap_protocol import KlapProtocol, KlapChiper
+from tests.conftest import load_fixture
 
 
 @pytest.mark.parametrize(
@@ -107,3 +109,20 @@ class MockResponse:
 
     async def __aenter__(self):
         return self
+
+
+async def test_should_handshake_again_after_device_restart():
+    credentials = AuthCredential("user@example.com", "password")
+    emulator = await DeviceEmulator(load_fixture("p100.json"), credentials).start()
+    protocol = KlapProtocol(credentials, emulator.url, klap_handshake_v2())
+    try:
+        assert (await protocol.send_request(TapoRequest.get_device_info())).is_success()
+        await emulator.stop()
+        await emulator.start(port=emulator.port)
+        response = await protocol.send_request(TapoRequest.get_device_info())
+        assert response.is_success()
+        assert (await protocol.send_request(TapoRequest.get_device_info())).is_success()
+        assert emulator.stats.handshakes == 2
+    finally:
+        await protocol.close()
+        await emulator.stop()
@@ -0,0 +1,60 @@
+import json
+
+from plugp100.loadgen import LoadGenerator, LoadProfile
+from plugp100.loadgen.__main__ import main
+from tests.conftest import load_fixture
+
+
+def test_loadgen_should_write_reports(tmp_path):
+    output = str(tmp_path / "loadgen.json")
+    main(
+        [
+            "--devices",
+            "5",
+            "--duration",
+            "1",
+            "--report-interval",
+            "0.5",
+            "--poll-rate",
+            "40",
+            "--command-rate",
+            "10",
+            "--subscribed",
+            "0.4",
+            "--subscription-interval",
+            "200",
+            "--seed",
+            "1",
+            "--output",
+            output,
+        ]
+    )
+    with open(output) as f:
+        result = json.load(f)
+
+    assert result["profile"]["devices"] == 5
+    assert len(result["reports"]) == 2
+    assert sum(report["operations"] for report in result["reports"]) > 20
+    assert all(report["rss_bytes"] > 0 for report in result["reports"])
+    assert all(report["tasks"]["tracker"] == 4 for report in result["reports"])
+    assert all(report["p99_ms"] >= report["p50_ms"] for report in result["reports"])
+
+
+async def test_loadgen_should_count_injected_errors_of_hub_fleet():
+    reports = await LoadGenerator(
+        LoadProfile(
+            devices=3,
+            duration_seconds=0.5,
+            poll_rate=60,
+            command_rate=10,
+            subscribed_fraction=0,
+            error_rate=0.5,
+            report_interval_seconds=0.5,
+            seed=3,
+        ),
+        fixture=load_fixture("h100.json"),
+    ).run()
+
+    assert len(reports) == 1
+    assert reports[0].errors > 0
+    assert reports[0].operations > reports[0].errors
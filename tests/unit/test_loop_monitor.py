@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import DeviceEmulator, EmulatorFaults
+from plugp100.instrumentation import LoopMonitor
+from plugp100.new.device_state_tracker import DeviceStateTracker
+from plugp100.new.event_polling.poll_tracker import PollTracker
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from tests.conftest import load_fixture
+
+credentials = AuthCredential("user@example.com", "password")
+
+
+def _blocking_state_provider(last_state):
+    time.sleep(0.3)
+    return {"device_on": not (last_state or {}).get("device_on", False)}
+
+
+async def test_should_attribute_stall_to_library_frame():
+    stalls = []
+    monitor = LoopMonitor(interval_seconds=0.02, stall_threshold_seconds=0.1).start()
+    monitor.subscribe(stalls.append)
+    tracker = PollTracker(_blocking_state_provider, DeviceStateTracker(), 60_000)
+    unsubscribe = tracker.subscribe(lambda _: None)
+    await asyncio.sleep(0.5)
+    unsubscribe()
+    await monitor.stop()
+
+    assert len(stalls) == 1
+    assert stalls[0].duration >= 0.25
+    assert "poll_tracker.py" in stalls[0].library_frame
+    assert "_blocking_state_provider" in "".join(stalls[0].stack)
+    assert monitor.stalls_count == 1
+    assert monitor.max_lag >= 0.25
+
+
+async def test_should_count_stalls_without_watchdog():
+    monitor = LoopMonitor(
+        interval_seconds=0.02, stall_threshold_seconds=0.1, watchdog=False
+    ).start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.2)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert monitor.stalls_count == 1
+    assert monitor.stalls[0].library_frame is None
+    assert monitor.lag.count > 2
+
+
+async def test_should_count_tasks_by_origin():
+    async def _async_callback(_):
+        await asyncio.sleep(0.2)
+
+    tracker = PollTracker(
+        lambda last: {"device_on": not (last or {}).get("device_on", False)},
+        DeviceStateTracker(),
+        20,
+    )
+    unsubscribe = tracker.subscribe(_async_callback)
+    await asyncio.sleep(0.05)
+    census = LoopMonitor.task_census()
+    unsubscribe()
+
+    assert census["tracker"] == 2
+    assert census["dispatcher"] >= 1
+
+    async with DeviceEmulator(
+        load_fixture("p100.json"),
+        credentials,
+        faults=EmulatorFaults(latency_seconds=0.3),
+    ) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                device_type="SMART.TAPOPLUG",
+                encryption_type="klap",
+                encryption_version=2,
+            )
+        )
+        request = asyncio.create_task(device.client.get_device_info())
+        await asyncio.sleep(0.1)
+        census = LoopMonitor.task_census()
+        await request
+        await device.client.close()
+
+    assert census["protocol"] == 1
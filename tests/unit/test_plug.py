@@ -17,6 +17,9 @@ async def test_must_expose_device_info(device: TapoDevice):
     assert device.device_info.friendly_name is not None
     assert device.device_info.signal_level is not None
     assert device.device_info.get_semantic_firmware_version() is not None
+    assert device.raw_state["device_id"] == device.device_id
+    assert not hasattr(device, "__dict__")
+    assert not hasattr(device.device_info, "__dict__")
 
 
 @plug
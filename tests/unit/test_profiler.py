@@ -0,0 +1,50 @@
+import os
+import pstats
+
+import pytest
+
+from plugp100.instrumentation import PROFILER, SamplingProfiler
+from plugp100.new.tapodevice import TapoDevice
+from tests.conftest import plug
+
+
+@pytest.fixture
+def profiler():
+    PROFILER.reset()
+    PROFILER.enable(sample_every=2)
+    yield PROFILER
+    PROFILER.disable()
+    PROFILER.reset()
+
+
+@plug
+async def test_should_sample_updates_by_device_class(
+    device: TapoDevice, profiler: SamplingProfiler, tmp_path
+):
+    for _ in range(5):
+        await device.update()
+    await device.client.get_device_info()
+
+    update = profiler.get("TapoPlug")
+    assert update.calls == 5
+    assert update.samples == 3
+    assert "tapo_client.py" in profiler.report("TapoPlug", limit=1000)
+    # requests of sampled updates are not profiled again, the next request is
+    assert profiler.get("TapoClient.get_device_info").calls == 6
+    assert profiler.get("TapoClient.get_device_info").samples == 3
+
+    paths = profiler.dump(str(tmp_path))
+    assert sorted(os.path.basename(path) for path in paths) == [
+        "TapoClient.get_device_info.prof",
+        "TapoPlug.prof",
+    ]
+    assert pstats.Stats(paths[1]).total_calls > 0
+
+
+@plug
+async def test_disabled_profiler_should_not_count_calls(device: TapoDevice):
+    profiler = SamplingProfiler()
+    assert profiler.sample("TapoPlug") is profiler.sample("TapoClient")
+    assert profiler.keys == []
+    with pytest.raises(ValueError):
+        profiler.enable(sample_every=0)
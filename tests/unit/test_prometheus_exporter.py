@@ -0,0 +1,136 @@
+import asyncio
+
+import aiohttp
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import DeviceEmulator
+from plugp100.instrumentation import RequestEvent, RequestInstrumentation, LoopMonitor
+from plugp100.instrumentation.prometheus_exporter import PrometheusExporter
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapodevice import TapoDevice
+from plugp100.new.tapoplug import TapoPlug
+from tests.conftest import load_fixture, plug
+
+credentials = AuthCredential("user@example.com", "password")
+
+
+def _event(duration: float, success: bool = True, phases=None) -> RequestEvent:
+    return RequestEvent(
+        host="10.0.0.1",
+        method="get_device_info",
+        protocol="Klap V2",
+        duration=duration,
+        phases=phases or {},
+        retries=0 if success else 2,
+        success=success,
+    )
+
+
+def test_should_render_request_histogram_and_counters():
+    exporter = PrometheusExporter(buckets=[0.01, 0.1], failure_threshold=2)
+    exporter.record(_event(0.005, phases={"handshake": 0.001}))
+    exporter.record(_event(0.05))
+    exporter.record(_event(0.5))
+    exporter.record(_event(1, success=False))
+
+    text = exporter.render()
+
+    labels = 'method="get_device_info",protocol="Klap V2"'
+    assert "# TYPE plugp100_request_duration_seconds histogram" in text
+    assert f'plugp100_request_duration_seconds_bucket{{{labels},le="0.01"}} 1' in text
+    assert f'plugp100_request_duration_seconds_bucket{{{labels},le="0.1"}} 2' in text
+    assert f'plugp100_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f"plugp100_request_duration_seconds_count{{{labels}}} 4" in text
+    assert f"plugp100_requests_total{{{labels}}} 4" in text
+    assert f"plugp100_request_errors_total{{{labels}}} 1" in text
+    assert f"plugp100_request_retries_total{{{labels}}} 2" in text
+    assert f"plugp100_handshakes_total{{{labels}}} 1" in text
+    assert 'plugp100_session_reuse_ratio{protocol="Klap V2"} 0.75' in text
+    assert 'plugp100_host_consecutive_failures{host="10.0.0.1"} 1' in text
+    assert 'plugp100_host_circuit_open{host="10.0.0.1"} 0' in text
+
+    exporter.record(_event(1, success=False))
+    assert 'plugp100_host_circuit_open{host="10.0.0.1"} 1' in exporter.render()
+
+
+def test_should_attach_to_instrumentation():
+    instrumentation = RequestInstrumentation()
+    exporter = PrometheusExporter().attach(instrumentation)
+    instrumentation.start_request("10.0.0.1", "get_device_info", "aes").finish(None)
+    exporter.detach()
+
+    assert not instrumentation.enabled
+    assert (
+        'plugp100_request_errors_total{method="get_device_info",protocol="aes"} 1'
+        in exporter.render()
+    )
+
+
+async def test_should_serve_device_values_without_requests():
+    fixture = load_fixture("p100.json")
+    fixture["component_nego"] = {
+        "component_list": [{"id": "energy_monitoring", "ver_code": 1}]
+    }
+    fixture["get_current_power"] = {"current_power": 12}
+    fixture["get_energy_usage"] = {"today_energy": 150, "month_energy": 3000}
+    async with DeviceEmulator(fixture, credentials) as emulator:
+        device = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                device_type="SMART.TAPOPLUG",
+                encryption_type="klap",
+                encryption_version=2,
+            )
+        )
+        await device.update()
+        unsubscribe = device.subscribe_state_changes(lambda _: None, 60_000)
+        await asyncio.sleep(0.1)  # first poll
+        requests = emulator.stats.requests
+        exporter = await PrometheusExporter().start(port=0)
+        exporter.register_device(device)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{exporter.port}/metrics") as r:
+                assert r.status == 200
+                assert r.headers["Content-Type"].startswith("text/plain")
+                text = await r.text()
+        await exporter.stop()
+        unsubscribe()
+        await device.client.close()
+
+    assert emulator.stats.requests == requests
+    labels = f'host="127.0.0.1",device_id="{device.device_id}",model="{device.model}"'
+    assert f"plugp100_device_rssi_dbm{{{labels}}} {device.device_info.rssi}" in text
+    assert f"plugp100_device_current_power_watts{{{labels}}} 12" in text
+    assert f"plugp100_device_today_energy_wh{{{labels}}} 150" in text
+    assert 'plugp100_poll_interval_seconds{tracker="127.0.0.1/state"} 60.0' in text
+
+
+async def test_should_render_loop_monitor():
+    monitor = LoopMonitor(interval_seconds=0.01, watchdog=False).start()
+    exporter = PrometheusExporter()
+    exporter.register_loop_monitor(monitor)
+    await asyncio.sleep(0.05)
+    text = exporter.render()
+    await monitor.stop()
+
+    assert "# TYPE plugp100_event_loop_lag_seconds summary" in text
+    assert 'plugp100_event_loop_lag_seconds{quantile="0.99"}' in text
+    assert "plugp100_event_loop_stalls_total 0" in text
+    assert 'plugp100_tasks{origin="monitor"} 1' in text
+
+
+@plug
+async def test_should_skip_device_values_not_reported(device: TapoDevice):
+    device.client.protocol._data["get_device_info"]["rssi"] = None
+    await device.update()
+    exporter = PrometheusExporter()
+    exporter.register_device(device)
+    exporter.register_device(TapoPlug("10.0.0.2", 80, device.client))
+
+    text = exporter.render()
+
+    assert "plugp100_device_rssi_dbm{" not in text
+    assert f'plugp100_device_signal_level{{host="",device_id="{device.device_id}"' in text
+    assert 'host="10.0.0.2"' not in text
@@ -0,0 +1,91 @@
+import pytest
+
+from plugp100.api.requests.tapo_request import TapoRequest
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.emulator import DeviceEmulator
+from plugp100.new.device_factory import connect, DeviceConnectConfiguration
+from plugp100.new.tapohub import TapoHub
+from plugp100.protocol.traffic_capture import (
+    TrafficRecorder,
+    ReplayProtocol,
+    TrafficRecord,
+    load_traffic,
+)
+from plugp100.responses.tapo_exception import TapoException
+from tests.conftest import load_fixture
+
+credentials = AuthCredential("user@example.com", "password")
+
+
+@pytest.mark.parametrize("file_name", ["hub.jsonl", "hub.jsonl.gz"])
+async def test_should_replay_recorded_hub_polling(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    recorder = TrafficRecorder(path, flush_every=3)
+    async with DeviceEmulator(
+        load_fixture("h100_lot_devices.json"), credentials
+    ) as emulator:
+        hub = await connect(
+            DeviceConnectConfiguration(
+                emulator.host,
+                emulator.port,
+                credentials,
+                device_type="SMART.TAPOHUB",
+                encryption_type="klap",
+                encryption_version=2,
+            ),
+            traffic_recorder=recorder,
+        )
+        await hub.update()
+        await hub.update()
+        await hub.client.close()
+
+    records = load_traffic(path)
+    assert len(records) > 0
+    assert all(record.host == "127.0.0.1" for record in records)
+    assert records[0].protocol == "Klap V2"
+
+    protocol = ReplayProtocol(records, latency_scale=0)
+    replayed = TapoHub("127.0.0.1", 80, TapoClient(credentials, "", protocol))
+    for _ in range(3):
+        await replayed.update()
+
+    assert replayed.protocol_version == "Klap V2"
+    assert replayed.device_id == hub.device_id
+    assert [child.device_id for child in replayed.children] == [
+        child.device_id for child in hub.children
+    ]
+    assert protocol.served > len(records)
+
+
+async def test_replay_should_serve_errors_and_fail_unknown_requests():
+    records = [
+        TrafficRecord(
+            timestamp=0,
+            duration=0.01,
+            host="10.0.0.1",
+            protocol="Klap V2",
+            request={"method": "get_device_info", "params": None},
+            response={"error_code": -1008, "msg": "error"},
+        ),
+        TrafficRecord(
+            timestamp=0,
+            duration=0.01,
+            host="10.0.0.1",
+            protocol="Klap V2",
+            request={"method": "get_device_usage", "params": None},
+            error="Connection reset",
+        ),
+    ]
+    protocol = ReplayProtocol(records, loop=False)
+
+    device_info = await protocol.send_request(TapoRequest.get_device_info())
+    device_usage = await protocol.send_request(TapoRequest.get_device_usage())
+    exhausted = await protocol.send_request(TapoRequest.get_device_info())
+    unknown = await protocol.send_request(TapoRequest.get_energy_usage())
+
+    assert isinstance(device_info.error(), TapoException)
+    assert device_info.error().error_code == -1008
+    assert str(device_usage.error()) == "Connection reset"
+    assert exhausted.is_failure()
+    assert unknown.is_failure()